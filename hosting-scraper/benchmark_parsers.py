@@ -0,0 +1,70 @@
+import os
+import time
+from typing import Dict, List
+
+from fixtures import load_fixtures, make_fixtures
+from scrape import BASE_URL, DEFAULT_PARSER, PARSERS, get_parser
+
+
+def available_parsers() -> List[str]:
+    """Return the names of the parsers whose library is installed"""
+    names = []
+    for name in PARSERS:
+        try:
+            get_parser(name)
+        except ImportError:
+            print(f'skip {name}, not installed')
+            continue
+        names.append(name)
+    return names
+
+
+def parse_all(pages: Dict[str, str], parser: str) -> List[dict]:
+    """Parse the overview pages and the isp pages they list with this parser and return the result rows"""
+    parse_overview_page, parse_isp_page = get_parser(parser)
+    rows = []
+    for path in sorted((p for p in pages if p.startswith('/overzicht/')), key=lambda p: int(p.rsplit('/', 1)[1])):
+        for isp in parse_overview_page(pages[path].encode('utf-8')):
+            rows.append(parse_isp_page(pages[isp['href'][len(BASE_URL):]].encode('utf-8'), isp))
+    return rows
+
+
+def benchmark_parsers(pages: Dict[str, str], iterations: int=5) -> Dict[str, dict]:
+    """Return a dict of parser name: best ms per page for the overview pages and for the isp pages"""
+    overview_pages = [c.encode('utf-8') for p, c in pages.items() if p.startswith('/overzicht/')]
+    isp_pages = [c.encode('utf-8') for p, c in pages.items() if p.startswith('/isp/')]
+    isp = dict(name='ISP', nsp=0)
+    results = {}
+    for name in available_parsers():
+        parse_overview_page, parse_isp_page = get_parser(name)
+        overview_times, isp_times = [], []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            for content in overview_pages:
+                parse_overview_page(content)
+            overview_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            for content in isp_pages:
+                parse_isp_page(content, isp)
+            isp_times.append(time.perf_counter() - start)
+        results[name] = dict(overview=1000 * min(overview_times) / len(overview_pages),
+                             isp=1000 * min(isp_times) / len(isp_pages))
+    return results
+
+
+if __name__ == '__main__':
+    iterations = 5
+    # fixtures recorded from the site with fixtures.record_fixtures, else pages are made from the rows of isps.csv
+    fixtures_filename = None
+
+    if fixtures_filename and os.path.exists(fixtures_filename):
+        pages = load_fixtures(fixtures_filename)
+    else:
+        pages = make_fixtures()
+    reference = parse_all(pages, DEFAULT_PARSER)
+    results = benchmark_parsers(pages, iterations)
+
+    print(f'\n===============\nRESULTS\npages: {len(pages)}, iterations: {iterations}')
+    for name, ms in results.items():
+        same = 'same rows' if parse_all(pages, name) == reference else f'rows differ from {DEFAULT_PARSER}'
+        print('{:<12} overview {:.2f} ms/page, isp {:.2f} ms/page, {}'.format(name, ms['overview'], ms['isp'], same))
@@ -0,0 +1,94 @@
+import contextlib
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from typing import Dict
+
+import scrape
+from benchmark_parsers import available_parsers, benchmark_parsers
+from fixtures import load_fixtures, make_fixtures
+from http_cache import HttpCache
+from standin import StandInServer
+
+
+def run_scrape(server: StandInServer, use_async: bool, parser: str, cached: bool=False, trace: bool=False) -> dict:
+    """Run scrape_isps end to end against the stand-in server, return the seconds it took, the number of requests and
+    the pages per second. With trace, also the peak memory (Python allocations only), tracing slows the run down.
+
+    The async crawl runs without rate limit: the stand-in doesn't need to be spared, this measures the crawl itself."""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'isps.csv')
+        with HttpCache(os.path.join(directory, 'cache.sqlite'), ttl=0) as cache:
+            if cached:
+                # fill the cache first, the timed run revalidates every page
+                with contextlib.redirect_stdout(io.StringIO()):
+                    scrape.scrape_isps(filename, use_async, parser=parser, cache=cache, rate=None)
+            requests = server.requests
+            if trace:
+                tracemalloc.start()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                scrape.scrape_isps(filename, use_async, parser=parser, cache=cache if cached else None,
+                                   rate=None)
+            seconds = time.perf_counter() - start
+            if trace:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+    requests = server.requests - requests
+    result = dict(seconds=seconds, requests=requests, pages_per_second=requests / seconds)
+    if trace:
+        result['peak_memory_bytes'] = peak
+    return result
+
+
+def benchmark(pages: Dict[str, str], latency: float=0.0, iterations: int=3) -> dict:
+    """Run scrape_isps sync and async with each available parser, with and without a cache, against a stand-in server
+    serving the pages, and time parsing alone per parser"""
+    results = {}
+    with StandInServer(pages, latency) as server:
+        base_url, scrape.BASE_URL = scrape.BASE_URL, server.url
+        try:
+            for parser in available_parsers():
+                for use_async in (False, True):
+                    for cached in (False, True):
+                        runs = [run_scrape(server, use_async, parser, cached) for _ in range(iterations)]
+                        best = min(runs, key=lambda r: r['seconds'])
+                        # run once more to find the peak memory use
+                        best['peak_memory_bytes'] = run_scrape(server, use_async, parser, cached,
+                                                               trace=True)['peak_memory_bytes']
+                        name = '{} {}{}'.format(parser, 'async' if use_async else 'sync', ' cached' if cached else '')
+                        results[name] = best
+        finally:
+            scrape.BASE_URL = base_url
+    return dict(
+        settings=dict(pages=len(pages), latency=latency, iterations=iterations),
+        platform=dict(python=platform.python_version(), machine=platform.machine()),
+        results=results,
+        parse_ms_per_page=benchmark_parsers(pages, iterations),
+    )
+
+
+if __name__ == '__main__':
+    # fixtures recorded from the site with fixtures.record_fixtures, else pages are made from the rows of isps.csv
+    fixtures_filename = None
+    results_filename = './benchmark_results.json'
+    iterations = 2
+    latency = 0.02  # seconds per request
+
+    pages = load_fixtures(fixtures_filename) if fixtures_filename else make_fixtures()
+    report = benchmark(pages, latency, iterations)
+    with open(results_filename, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f'\n===============\nRESULTS (best of {iterations}, latency {latency}s)')
+    for name, result in report['results'].items():
+        print('{:<25} {:.2f}s  {:>4} requests  {:6.1f} pages/s  {:.1f}MB'.format(
+            name, result['seconds'], result['requests'], result['pages_per_second'],
+            result['peak_memory_bytes'] / 1024 ** 2))
+    for parser, ms in report['parse_ms_per_page'].items():
+        print('parse {:<12} overview {:.2f} ms/page, isp {:.2f} ms/page'.format(parser, ms['overview'], ms['isp']))
+    print(f'written to {results_filename}')
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+
+__all__ = ['CrawlState']
+
+
+class CrawlState:
+    """Append-only crawl state (json lines) of the overview pages and isp pages that were finished during a crawl.
+
+    The first line holds a fingerprint of the search, every following line holds either the offset of an overview page
+    whose isps were all written, or the url of an isp page whose row was written. When a crawl is restarted with the
+    same search and state file, finished overview pages aren't fetched again and finished isps are skipped. A state
+    file with a different fingerprint is discarded and started anew.
+    """
+
+    def __init__(self, filename: str, search_params: dict):
+        self.filename = filename
+        self.fingerprint = self.make_fingerprint(search_params)
+        self.overviews = set()
+        self.isps = set()
+        self.resumed = os.path.exists(filename) and self.read()
+        if not self.resumed:
+            # new state or a state for some other search: start over
+            with open(filename, 'w') as f:
+                f.write(json.dumps({'fingerprint': self.fingerprint}) + '\n')
+        else:
+            print(f'resuming from crawl state {filename}: {len(self.overviews)} overview pages and '
+                  f'{len(self.isps)} isps already finished')
+        self.file = open(filename, 'a')
+
+    @staticmethod
+    def make_fingerprint(search_params: dict) -> str:
+        """Return a hash of the search, used to check that a crawl state belongs to this crawl"""
+        dump = json.dumps(search_params, sort_keys=True)
+        return hashlib.sha256(dump.encode('utf-8')).hexdigest()
+
+    def read(self) -> bool:
+        """Read the finished overview pages and isps from the state file, return False if it doesn't match the
+        search"""
+        with open(self.filename) as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                return False
+            if header.get('fingerprint') != self.fingerprint:
+                print(f'crawl state {self.filename} belongs to a different search, starting over')
+                return False
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # the last line may be incomplete if the previous crawl was killed while writing
+                    break
+                if 'overview' in entry:
+                    self.overviews.add(entry['overview'])
+                else:
+                    self.isps.add(entry['isp'])
+        return True
+
+    def record(self, entry: dict):
+        """Append an entry to the state file, flush right away so it survives a crash"""
+        self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
+
+    def finish_overview(self, offset: int):
+        self.overviews.add(offset)
+        self.record({'overview': offset})
+
+    def finish_isp(self, href: str):
+        self.isps.add(href)
+        self.record({'isp': href})
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,179 @@
+import csv
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+import os
+from typing import Iterable, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather
+    import pyarrow.parquet
+except ImportError:
+    # pyarrow is optional, only needed to write and read the typed export
+    pa = None
+
+__all__ = ['export_isps', 'read_isps', 'typed_row', 'load_exports', 'with_services', 'COLUMN_TYPES', 'SERVICES',
+           'FORMATS', 'DEFAULT_FORMAT']
+
+NOT_GIVEN = 'Geen opgave'  # what the site shows for a number the isp didn't give
+DATE_FORMAT = '%d-%m-%Y'  # how the site writes dates, e.g. yearFounded
+# the type of each column of isps.csv, in the order of scrape.COLUMNS
+COLUMN_TYPES = dict(
+    name='string',
+    streetAddress='string',
+    postalCode='string',
+    addressLocality='string',
+    yearFounded='date',
+    numberOfCustomers='int',
+    numberOfDomains='int',
+    numberOfServers='int',
+    numberOfFte='float',
+    netPromotorScore='int',
+    resellersSupported='bool',
+    estimatedRevenue='decimal',
+    servicesOffered='services',
+)
+# the services isps offer, each one a bit of the servicesMask column (in this order, so only ever add to the end)
+SERVICES = ('Domeinnaam', 'Domein reselling', 'Webhosting', 'Webhosting reselling', 'Dedicated server',
+            'Virtual Private Server', 'Managed server', 'Colocatie', 'SSL-Certificaat', 'E-mail hosting',
+            'Online backup', 'Netwerk connectiviteit', 'Streaming media', 'VoIP-telefonie', 'Breedband internet',
+            'Gameserver', 'Usenet toegang')
+DEFAULT_FORMAT = 'parquet'
+
+
+def to_int(value: str) -> Optional[int]:
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def to_float(value: str) -> Optional[float]:
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def to_decimal(value: str) -> Optional[Decimal]:
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        return None
+
+
+def to_date(value: str) -> Optional[date]:
+    try:
+        return datetime.strptime(value, DATE_FORMAT).date()
+    except ValueError:
+        return None
+
+
+def to_services(value: str) -> List[str]:
+    """Return the services of the comma separated list the site shows, e.g. 'Domeinnaam, Webhosting.'"""
+    return [service for service in value.rstrip('.').split(', ') if service]
+
+
+CONVERTERS = dict(
+    string=lambda value: value or None,
+    int=to_int,
+    float=to_float,
+    decimal=to_decimal,
+    date=to_date,
+    bool=lambda value: value == '1',
+    services=to_services,
+)
+
+
+def services_mask(services: Iterable[str]) -> int:
+    """Return the bitmask of the services: bit i is set if SERVICES[i] is offered, unknown services are left out"""
+    return sum(1 << SERVICES.index(service) for service in set(services) if service in SERVICES)
+
+
+def typed_row(row: dict, scraped: date=None) -> dict:
+    """Return the row of isps.csv (column name: text) with typed values: None for numbers and dates that weren't
+    given, real dates, the services as a list and as a bitmask (servicesMask), and the date it was scraped"""
+    typed = {name: CONVERTERS[type_](row.get(name) or '') for name, type_ in COLUMN_TYPES.items()}
+    typed['servicesMask'] = services_mask(typed['servicesOffered'])
+    typed['scraped'] = scraped
+    return typed
+
+
+def read_isps(filename: str='./isps.csv', scraped: date=None) -> List[dict]:
+    """Return the typed rows of the csv written by scrape_isps, scraped on the given date (default: the date the file
+    was last written)"""
+    if scraped is None:
+        scraped = date.fromtimestamp(os.path.getmtime(filename))
+    with open(filename, newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        # the header has the display names, the columns are in the order of COLUMN_TYPES
+        next(reader, None)
+        return [typed_row(dict(zip(COLUMN_TYPES, values)), scraped) for values in reader]
+
+
+def arrow_schema() -> 'pa.Schema':
+    """Return the arrow schema of the typed rows, all columns nullable, the bit order of servicesMask in the
+    metadata"""
+    types = dict(string=pa.string(), int=pa.int64(), float=pa.float64(), decimal=pa.decimal128(12, 1),
+                 date=pa.date32(), bool=pa.bool_(), services=pa.list_(pa.string()))
+    fields = [pa.field(name, types[type_]) for name, type_ in COLUMN_TYPES.items()]
+    fields += [pa.field('servicesMask', pa.uint32()), pa.field('scraped', pa.date32())]
+    return pa.schema(fields, metadata={'services': ','.join(SERVICES)})
+
+
+def arrow_table(rows: List[dict]) -> 'pa.Table':
+    if pa is None:
+        raise ImportError('pyarrow is needed for the typed export, pip install pyarrow')
+    return pa.Table.from_pylist(rows, schema=arrow_schema())
+
+
+def write_parquet(table: 'pa.Table', filename: str):
+    pyarrow.parquet.write_table(table, filename, compression='zstd')
+
+
+def write_arrow(table: 'pa.Table', filename: str):
+    # uncompressed, so it can be memory mapped when read
+    pyarrow.feather.write_feather(table, filename, compression='uncompressed')
+
+
+# the file formats of the export: the function to write the table to a file, and the function to read it back
+FORMATS = {
+    'parquet': (write_parquet, lambda filename: pyarrow.parquet.read_table(filename)),
+    'arrow': (write_arrow, lambda filename: pyarrow.feather.read_table(filename, memory_map=True)),
+}
+
+
+def get_format(format: str) -> tuple:
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format '{format}', choose one of {', '.join(FORMATS)}")
+    return FORMATS[format]
+
+
+def export_isps(filename: str='./isps.csv', export_filename: str=None, format: str=DEFAULT_FORMAT,
+                scraped: date=None) -> str:
+    """Write the rows of the csv written by scrape_isps to a typed Parquet or Arrow (feather) file, return its name
+    (default: the csv's name with the extension of the format)"""
+    write, _ = get_format(format)
+    export_filename = export_filename or os.path.splitext(filename)[0] + '.' + format
+    table = arrow_table(read_isps(filename, scraped))
+    write(table, export_filename)
+    print(f'exported {table.num_rows} isps to {export_filename}')
+    return export_filename
+
+
+def load_exports(filenames: Iterable[str], format: str=DEFAULT_FORMAT) -> 'pa.Table':
+    """Return the exports of several scrapes (snapshots) as one table, tell them apart by the scraped column"""
+    _, read = get_format(format)
+    if pa is None:
+        raise ImportError('pyarrow is needed for the typed export, pip install pyarrow')
+    return pa.concat_tables([read(filename) for filename in filenames])
+
+
+def with_services(table: 'pa.Table', *services: str) -> 'pa.Table':
+    """Return the rows of the table of the isps that offer all of the services, filtered on the bitmask at once"""
+    mask = services_mask(services)
+    if len(set(services)) > bin(mask).count('1'):
+        unknown = ', '.join(service for service in services if service not in SERVICES)
+        raise ValueError(f"Unknown service '{unknown}', choose from {', '.join(SERVICES)}")
+    return table.filter(pc.equal(pc.bit_wise_and(table['servicesMask'], pa.scalar(mask, pa.uint32())), mask))
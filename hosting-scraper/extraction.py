@@ -0,0 +1,275 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import os
+import re
+from typing import Iterable, Iterator, List, Union
+
+from bs4 import BeautifulSoup, NavigableString
+import soupsieve
+
+try:
+    import lxml.html
+    from lxml.cssselect import CSSSelector
+except ImportError:
+    # lxml and cssselect are optional, only needed for the 'lxml' backend
+    CSSSelector = None
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    # selectolax is optional, only needed for the 'selectolax' backend
+    LexborHTMLParser = None
+
+__all__ = ['Field', 'Derived', 'Spec', 'Extractor', 'BACKENDS', 'DEFAULT_BACKEND', 'fastest_backend',
+           'extract_pages']
+
+WORKERS = os.cpu_count() or 1  # number of worker processes to extract pages in
+
+# a field of the result, found by the css selector, relative to the page or to the item (see Spec):
+# - up: then take the ancestor this many levels up, e.g. the card a header is in
+# - label: a tuple of the css selector of label elements and a label text: the field is the text right after the label
+#   element with this text, inside the element found so far
+# - attribute: take this attribute rather than the text
+# - pattern: take the first group of this regex in the text, or the default if it doesn't match
+# - convert: function to apply to the value (or the default), must be importable to be used in worker processes
+Field = namedtuple('Field', ['name', 'selector', 'up', 'label', 'attribute', 'pattern', 'convert', 'default'],
+                   defaults=(0, None, None, None, None, ''))
+# a field calculated from another field of the same result by the convert function
+Derived = namedtuple('Derived', ['name', 'source', 'convert'])
+# fields (and derived fields) to extract from a page. With items, the css selector of elements that each give one
+# result, the page gives a list of results, leaving out results without the required field
+Spec = namedtuple('Spec', ['fields', 'items', 'required'], defaults=(None, None))
+
+
+class SoupBackend:
+    """Parse with BeautifulSoup's html.parser, css selectors are compiled once by soupsieve"""
+
+    compile = staticmethod(soupsieve.compile)
+
+    @staticmethod
+    def parse(content: Union[bytes, str]):
+        return BeautifulSoup(content, 'html.parser')
+
+    @staticmethod
+    def select(node, selector) -> list:
+        return selector.select(node)
+
+    @staticmethod
+    def select_one(node, selector):
+        return selector.select_one(node)
+
+    @staticmethod
+    def text(node) -> str:
+        return node.get_text()
+
+    @staticmethod
+    def attribute(node, name: str) -> str:
+        return node.get(name, '')
+
+    @staticmethod
+    def parent(node):
+        return node.parent
+
+    @staticmethod
+    def text_after(node) -> str:
+        # skip the whitespace between the node and the span or text after it, like the tail in LxmlBackend
+        for sibling in node.next_siblings:
+            text = str(sibling) if isinstance(sibling, NavigableString) else sibling.get_text()
+            if text.strip():
+                return text
+        return ''
+
+
+class LxmlBackend:
+    """Parse with lxml, css selectors are compiled once to XPath by cssselect"""
+
+    @staticmethod
+    def compile(selector: str):
+        return CSSSelector(selector)
+
+    @staticmethod
+    def parse(content: Union[bytes, str]):
+        return lxml.html.fromstring(content)
+
+    @staticmethod
+    def select(node, selector) -> list:
+        return selector(node)
+
+    @staticmethod
+    def select_one(node, selector):
+        found = selector(node)
+        return found[0] if found else None
+
+    @staticmethod
+    def text(node) -> str:
+        return node.text_content()
+
+    @staticmethod
+    def attribute(node, name: str) -> str:
+        return node.get(name, '')
+
+    @staticmethod
+    def parent(node):
+        return node.getparent()
+
+    @staticmethod
+    def text_after(node) -> str:
+        if node.tail and node.tail.strip():
+            return node.tail
+        sibling = node.getnext()
+        return sibling.text_content() if sibling is not None else ''
+
+
+class SelectolaxBackend:
+    """Parse with selectolax (lexbor), which takes css selectors as they are"""
+
+    @staticmethod
+    def compile(selector: str) -> str:
+        return selector
+
+    @staticmethod
+    def parse(content: Union[bytes, str]):
+        return LexborHTMLParser(content)
+
+    @staticmethod
+    def select(node, selector: str) -> list:
+        return node.css(selector)
+
+    @staticmethod
+    def select_one(node, selector: str):
+        return node.css_first(selector)
+
+    @staticmethod
+    def text(node) -> str:
+        return node.text()
+
+    @staticmethod
+    def attribute(node, name: str) -> str:
+        return node.attributes.get(name) or ''
+
+    @staticmethod
+    def parent(node):
+        return node.parent
+
+    @staticmethod
+    def text_after(node) -> str:
+        # skip the whitespace between the node and the span or text after it, like the tail in LxmlBackend
+        sibling = node.next
+        while sibling is not None:
+            text = sibling.text()
+            if text.strip():
+                return text
+            sibling = sibling.next
+        return ''
+
+
+BACKENDS = {
+    'html.parser': SoupBackend,
+    'lxml': LxmlBackend,
+    'selectolax': SelectolaxBackend,
+}
+DEFAULT_BACKEND = 'html.parser'
+
+
+def fastest_backend() -> str:
+    """Return the name of the fastest backend that is installed"""
+    if LexborHTMLParser:
+        return 'selectolax'
+    if CSSSelector:
+        return 'lxml'
+    return DEFAULT_BACKEND
+
+
+class Extractor:
+    """A spec compiled for a backend: css selectors and patterns are compiled once, then extract runs the spec over
+    the html of a page"""
+
+    def __init__(self, spec: Spec, backend: str=DEFAULT_BACKEND):
+        try:
+            self.backend = BACKENDS[backend]
+        except KeyError:
+            raise ValueError(f"Unknown backend '{backend}', choose one of {', '.join(BACKENDS)}")
+        if (backend == 'lxml' and CSSSelector is None) or (backend == 'selectolax' and LexborHTMLParser is None):
+            raise ImportError(f"the '{backend}' backend requires {backend} to be installed")
+        self.spec = spec
+        self.items = self.backend.compile(spec.items) if spec.items else None
+        self.fields = []
+        self.derived = []
+        # compiled selectors, shared by fields with the same selector
+        selectors = {}
+        for field in spec.fields:
+            if isinstance(field, Derived):
+                self.derived.append(field)
+                continue
+            for selector in (field.selector, field.label[0] if field.label else None):
+                if selector and selector not in selectors:
+                    selectors[selector] = self.backend.compile(selector)
+            self.fields.append((field, selectors[field.selector], selectors[field.label[0]] if field.label else None,
+                                re.compile(field.pattern) if field.pattern else None))
+
+    def extract_field(self, root, field: Field, selector, label_selector, pattern) -> str:
+        """Return the value of the field, found from the root (the page or an item)"""
+        backend = self.backend
+        node = backend.select_one(root, selector)
+        for _ in range(field.up):
+            if node is None:
+                break
+            node = backend.parent(node)
+        if node is not None and field.label:
+            label_text = field.label[1]
+            labels = [n for n in backend.select(node, label_selector) if backend.text(n).strip() == label_text]
+            node = labels[0] if labels else None
+            value = backend.text_after(node) if node is not None else None
+        elif node is not None:
+            value = backend.attribute(node, field.attribute) if field.attribute else backend.text(node)
+        else:
+            value = None
+        if value is not None and pattern:
+            match = pattern.search(value)
+            value = match.group(1) if match else None
+        value = field.default if value is None else value.strip()
+        return field.convert(value) if field.convert else value
+
+    def extract_from(self, root) -> dict:
+        result = {field.name: self.extract_field(root, field, selector, label_selector, pattern)
+                  for field, selector, label_selector, pattern in self.fields}
+        for derived in self.derived:
+            result[derived.name] = derived.convert(result[derived.source])
+        return result
+
+    def extract(self, content: Union[bytes, str]) -> Union[dict, List[dict]]:
+        """Return the result of the page, or the list of results of its items if the spec has items"""
+        root = self.backend.parse(content)
+        if not self.items:
+            return self.extract_from(root)
+        results = [self.extract_from(item) for item in self.backend.select(root, self.items)]
+        if self.spec.required:
+            results = [r for r in results if r[self.spec.required]]
+        return results
+
+
+# the extractor of a worker process, compiled once when the worker starts
+worker_extractor = None
+
+
+def init_worker(spec: Spec, backend: str):
+    global worker_extractor
+    worker_extractor = Extractor(spec, backend)
+
+
+def extract_in_worker(content: Union[bytes, str]) -> Union[dict, List[dict]]:
+    return worker_extractor.extract(content)
+
+
+def extract_pages(spec: Spec, pages: Iterable[Union[bytes, str]], backend: str=DEFAULT_BACKEND,
+                  workers: int=WORKERS, chunksize: int=8) -> Iterator:
+    """Return an iterator over the results of the pages, in order. The pages are extracted in a pool of worker
+    processes that each compile the spec once, or in this process if workers is 0."""
+    if not workers:
+        extractor = Extractor(spec, backend)
+        return map(extractor.extract, pages)
+
+    def in_pool() -> Iterator:
+        with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(spec, backend)) as executor:
+            yield from executor.map(extract_in_worker, pages, chunksize=chunksize)
+
+    return in_pool()
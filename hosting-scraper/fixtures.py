@@ -0,0 +1,138 @@
+import csv
+from html import escape
+import json
+import re
+from typing import Dict, List
+from urllib.parse import urlsplit
+import requests
+
+__all__ = ['make_fixtures', 'record_fixtures', 'save_fixtures', 'load_fixtures']
+
+ISPS_PER_PAGE = 25  # number of isps on an overview page, like the site
+NO_RESULTS = 'Geen ISP\'s gevonden op basis van uw criteria.'
+
+# the parts of the site's pages around the content, for realistic page sizes
+HEAD = '''<!DOCTYPE html>
+<html lang="nl">
+<head>
+<meta charset="utf-8">
+<title>{title} - ISPgids.com</title>
+<link rel="stylesheet" href="/css/bootstrap.min.css">
+<script src="/js/jquery.min.js"></script>
+</head>
+<body>
+<nav class="navbar navbar-default"><div class="container"><ul class="nav navbar-nav">
+''' + ''.join(f'<li><a href="/{item}">{item.capitalize()}</a></li>\n'
+              for item in ['overzicht', 'ervaringen', 'nieuws', 'vergelijken', 'webhosting', 'vps', 'domeinnaam',
+                           'dedicated', 'colocatie', 'contact']) + '''</ul></div></nav>
+<div class="container">
+'''
+FOOT = '''</div>
+<footer class="footer"><div class="container"><p>&copy; ISPgids.com</p>
+''' + ''.join(f'<a href="/pagina/{i}">Pagina {i}</a> ' for i in range(40)) + '''
+</div></footer>
+<script>var _paq = window._paq || []; _paq.push(['trackPageView']);</script>
+</body>
+</html>
+'''
+
+
+def slugify(name: str) -> str:
+    return re.sub('[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def make_isp_page(row: dict) -> str:
+    """Return the html of the page of an isp, with the cards scrape.parse_isp reads, from a row of isps.csv"""
+    name = escape(row['Naam'])
+
+    def li(subject: str, value: str, separator: str='', span: bool=True) -> str:
+        # like the site: the value right after the p or with whitespace in between, in a span or as just text
+        value = f'<span>{escape(value)}</span>' if span else escape(value)
+        return f'<li><p>{subject}</p>{separator}{value}{separator}</li>\n'
+
+    return (HEAD.format(title=name) + f'''<h1>{name}</h1>
+<div class="row"><div class="col-md-8"><div class="card">
+<div class="officieeleinfo"><h3>Officiële informatie</h3></div>
+<p>{name} is een hostingprovider uit {escape(row['Plaats'])}.</p>
+{name} biedt de volgende diensten aan:
+{escape(row['Diensten'])}
+<p>Bekijk de ervaringen van klanten.</p>
+</div></div>
+<div class="col-md-4">
+<ul class="list-group">
+<li><div class="adres"><h4>Adres</h4></div></li>
+''' + li('Adres', row['Adres']) + li('Postcode', row['Postcode'], ' ') + li('Plaats', row['Plaats'], '\n') + '''</ul>
+<ul class="list-group">
+<li><div class="aantal"><h4>Aantallen</h4></div></li>
+''' + li('Aantal klanten', row['Klanten'], ' ', span=False) + li('Aantal domeinen', row['Domeinen'], '\n') +
+            li('Aantal servers', row['Servers'], '\n', span=False) + f'''</ul>
+<ul class="list-group">
+<li><div class="bedrijfsinfo"><h4>Bedrijfsinfo</h4></div></li>
+<li><p>KvK-nummer</p><span>12345678</span></li>
+<li><p>Opgericht</p>{escape(row['Opgericht'])}
+<li><p>Personeel Totaal</p>{escape(row['Medewerkers (fte)'])}
+</ul>
+</div></div>
+''' + FOOT)
+
+
+def make_overview_page(isps: List[tuple]) -> str:
+    """Return the html of an overview page listing the isps, a list of (href, row of isps.csv). Without isps, the page
+    says no (more) isps were found."""
+    rows = []
+    for i, (href, row) in enumerate(isps):
+        # the reviews column shows the number of positive reviews per 100, scrape.calculate_nsp turns it into the nps
+        try:
+            positive = 100 - (100 - int(row['NPS (%)'])) // 2
+        except ValueError:
+            positive = ''
+        rows.append(f'''<tr><td>{i + 1}</td><td><a href="{href}">{escape(row['Naam'])}</a></td>
+<td>{escape(row['Plaats'])}</td><td>{escape(row['Klanten'])}</td><td>{escape(row['Medewerkers (fte)'])}</td>
+<td>{escape(row['Opgericht'])}</td><td><span class="score">{positive} uit 100</span> positief</td></tr>
+''')
+    body = ''.join(rows) or f'<tr><td colspan="7">{escape(NO_RESULTS, quote=False)}</td></tr>\n'
+    return (HEAD.format(title='Overzicht') + '''<table class="table table-striped">
+<thead><tr><th>#</th><th>Naam</th><th>Plaats</th><th>Klanten</th><th>Personeel</th><th>Opgericht</th>
+<th>Ervaringen</th></tr></thead>
+<tbody>
+''' + body + '</tbody>\n</table>\n' + FOOT)
+
+
+def make_fixtures(filename: str='./isps.csv', number_of_isps: int=None) -> Dict[str, str]:
+    """Return a dict of url path: html of the overview and isp pages, made from the rows of a csv written by
+    scrape_isps, so scraping can be run and benchmarked without the site. Overview pages are at /overzicht/<offset>,
+    the last one lists no isps."""
+    with open(filename, newline='') as csvfile:
+        reader = csv.DictReader(csvfile)
+        rows = list(reader)[:number_of_isps]
+    pages = {}
+    isps = []
+    for row in rows:
+        href = '/isp/' + slugify(row['Naam'])
+        while href in pages:
+            href += '-1'
+        pages[href] = make_isp_page(row)
+        isps.append((href, row))
+    for offset in range(0, len(isps) + ISPS_PER_PAGE, ISPS_PER_PAGE):
+        pages[f'/overzicht/{offset}'] = make_overview_page(isps[offset:offset + ISPS_PER_PAGE])
+    return pages
+
+
+def record_fixtures(urls: List[str], filename: str):
+    """Fetch the pages at the urls (e.g. the overview pages and some isp pages of a crawl) and save them as fixtures"""
+    pages = {}
+    for url in urls:
+        r = requests.get(url)
+        if r.status_code == 200:
+            pages[urlsplit(url).path] = r.text
+    save_fixtures(pages, filename)
+
+
+def save_fixtures(pages: Dict[str, str], filename: str):
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(pages, f)
+
+
+def load_fixtures(filename: str) -> Dict[str, str]:
+    with open(filename, encoding='utf-8') as f:
+        return json.load(f)
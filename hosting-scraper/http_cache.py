@@ -0,0 +1,114 @@
+import hashlib
+import json
+import pickle
+import sqlite3
+import time
+import zlib
+from typing import Callable, Optional
+from urllib.parse import urlencode
+
+__all__ = ['HttpCache', 'CACHE_FILENAME', 'TTL']
+
+CACHE_FILENAME = './ispgids_cache.sqlite'
+TTL = 60 * 60  # seconds a cached page is used without asking the site whether it changed
+
+
+class HttpCache:
+    """On-disk cache (sqlite) of the pages of the site, with their ETag and Last-Modified headers.
+
+    A page that was fetched less than ttl seconds ago is taken from the cache. An older page is revalidated with a
+    conditional request: when the site answers 304 Not Modified, the cached page is used without downloading it
+    again. Parse results are cached by the hash of the page contents, so a page that didn't change isn't parsed again
+    either (see cached_parser).
+    """
+
+    def __init__(self, filename: str=CACHE_FILENAME, ttl: float=TTL):
+        self.ttl = ttl
+        self.db = sqlite3.connect(filename)
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS pages (
+                key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, fetched REAL, hash TEXT, body BLOB);
+            CREATE TABLE IF NOT EXISTS parsed (
+                hash TEXT, parser TEXT, args TEXT, result BLOB, PRIMARY KEY (hash, parser, args));
+        ''')
+        # counts of this run, to see what the cache saved
+        self.stats = dict(fresh=0, not_modified=0, fetched=0, parsed=0, parse_skipped=0)
+
+    @staticmethod
+    def key(url: str, params: dict=None) -> str:
+        """Return the url with the params, in a fixed order, to cache the page under"""
+        return url + ('?' + urlencode(sorted(params.items())) if params else '')
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return a dict with the etag, last_modified, fetched (time) and body of the cached page, or None"""
+        row = self.db.execute('SELECT etag, last_modified, fetched, body FROM pages WHERE key = ?', (key,)).fetchone()
+        if not row:
+            return None
+        etag, last_modified, fetched, body = row
+        return dict(etag=etag, last_modified=last_modified, fetched=fetched, body=zlib.decompress(body))
+
+    def is_fresh(self, page: dict) -> bool:
+        """Return whether the cached page can be used without revalidating it"""
+        fresh = time.time() - page['fetched'] < self.ttl
+        self.stats['fresh'] += fresh
+        return fresh
+
+    @staticmethod
+    def conditional_headers(page: Optional[dict]) -> dict:
+        """Return the headers to ask the site to only send the page if it changed since it was cached"""
+        headers = {}
+        if page and page['etag']:
+            headers['If-None-Match'] = page['etag']
+        if page and page['last_modified']:
+            headers['If-Modified-Since'] = page['last_modified']
+        return headers
+
+    def put(self, key: str, body: bytes, headers):
+        """Store the page with the ETag and Last-Modified of the response headers"""
+        self.stats['fetched'] += 1
+        content_hash = hashlib.sha1(body).hexdigest()
+        with self.db:
+            old = self.db.execute('SELECT hash FROM pages WHERE key = ?', (key,)).fetchone()
+            self.db.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)',
+                            (key, headers.get('ETag'), headers.get('Last-Modified'), time.time(), content_hash,
+                             zlib.compress(body)))
+            if old and old[0] != content_hash:
+                # the page changed: forget the parse results of its old contents, unless another page has them
+                self.db.execute('DELETE FROM parsed WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM pages WHERE hash = ?)',
+                                (old[0], old[0]))
+
+    def not_modified(self, key: str):
+        """Mark the cached page as revalidated now"""
+        self.stats['not_modified'] += 1
+        with self.db:
+            self.db.execute('UPDATE pages SET fetched = ? WHERE key = ?', (time.time(), key))
+
+    def cached_parser(self, parser: str, parse: Callable) -> Callable:
+        """Return a function that parses the page contents like parse(content, *args), but returns the cached result
+        if contents with the same hash were parsed by the same parser with the same args before"""
+
+        def parse_cached(content: bytes, *args):
+            content_hash = hashlib.sha1(content).hexdigest()
+            key = (content_hash, f'{parser}.{parse.__name__}', json.dumps(args, sort_keys=True, default=str))
+            row = self.db.execute('SELECT result FROM parsed WHERE hash = ? AND parser = ? AND args = ?',
+                                  key).fetchone()
+            if row:
+                self.stats['parse_skipped'] += 1
+                return pickle.loads(row[0])
+            self.stats['parsed'] += 1
+            result = parse(content, *args)
+            with self.db:
+                # pickled rather than json, to keep the types of the values (e.g. Decimal)
+                self.db.execute('INSERT OR REPLACE INTO parsed VALUES (?, ?, ?, ?)', key + (pickle.dumps(result),))
+            return result
+
+        return parse_cached
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
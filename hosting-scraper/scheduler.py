@@ -0,0 +1,253 @@
+import asyncio
+from email.utils import parsedate_to_datetime
+import heapq
+import itertools
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+
+__all__ = ['CrawlScheduler', 'TokenBucket', 'RATE', 'BURST', 'USER_AGENT']
+
+RATE = 5.0  # requests per second per host, lowered to the crawl-delay or request-rate of the host's robots.txt
+BURST = 5  # number of requests that may start at once after an idle moment
+USER_AGENT = 'hosting-scraper'  # the name we crawl under, matched against the robots.txt rules
+RETRIES = 5  # times a request is retried after a 429 or 5xx response
+BACKOFF = 1.0  # seconds to wait before the first retry, doubled for each next one, unless the host says Retry-After
+MAX_BACKOFF = 60.0  # seconds to wait at most before a retry
+MIN_RATE = 0.1  # requests per second a host is slowed down to at most
+
+
+class TokenBucket:
+    """Limit the rate at which requests start: each request takes a token, tokens are added at rate per second, up to
+    burst tokens. Without a rate, there's no limit.
+
+    The rate can be changed while in use, and the bucket can be paused, e.g. when the host asks to retry later.
+    """
+
+    def __init__(self, rate: Optional[float]=RATE, burst: int=BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        """Wait for a token and take it"""
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            if not self.rate:
+                return
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Host:
+    """The crawl state of a host: its robots.txt rules and token bucket, of which the rate adapts to the responses"""
+
+    def __init__(self, max_rate: Optional[float], burst: int):
+        self.robots = None
+        self.max_rate = max_rate
+        self.bucket = TokenBucket(max_rate, burst)
+        self.lock = asyncio.Lock()
+
+    def obey(self, robots: RobotFileParser, user_agent: str):
+        """Use the robots.txt rules, lower the rate to its crawl-delay or request-rate for our user agent"""
+        self.robots = robots
+        delays = []
+        crawl_delay = robots.crawl_delay(user_agent)
+        if crawl_delay:
+            delays.append(float(crawl_delay))
+        request_rate = robots.request_rate(user_agent)
+        if request_rate:
+            delays.append(request_rate.seconds / request_rate.requests)
+        if delays:
+            rate = 1 / max(delays)
+            self.max_rate = min(self.max_rate, rate) if self.max_rate else rate
+            self.bucket.rate = self.max_rate
+            # a crawl-delay means one request at a time
+            self.bucket.burst = self.bucket.tokens = 1
+
+    def slow_down(self, delay: float):
+        """The host is overloaded: halve the rate and pause for the delay"""
+        self.bucket.rate = max(MIN_RATE, (self.bucket.rate or self.max_rate or RATE) / 2)
+        self.bucket.pause(delay)
+
+    def speed_up(self):
+        """The host responded fine: raise the rate step by step back to the maximum"""
+        if self.bucket.rate and self.bucket.rate != self.max_rate:
+            rate = self.bucket.rate + (self.max_rate or RATE) / 10
+            # without a maximum, the limit is lifted once the rate is back at the default
+            self.bucket.rate = min(rate, self.max_rate) if self.max_rate else (rate if rate < RATE else None)
+
+
+def retry_after(headers) -> Optional[float]:
+    """Return the seconds to wait according to the Retry-After header (seconds or a date), or None"""
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CrawlScheduler:
+    """Fetch pages politely and as fast as allowed: at most concurrency requests at the same time, and per host at most
+    rate requests per second (token bucket), lowered to the crawl-delay of the host's robots.txt. Urls the robots.txt
+    disallows aren't fetched. On a 429 or 5xx response the host is paused (Retry-After, or an exponential backoff)
+    and slowed down, and the request is retried; the rate recovers as responses come in fine.
+
+    Requests wait in a priority frontier per host, lower priority first (e.g. overview pages ahead of detail pages),
+    then first come first served. A worker waits for the host's token before it takes a request off the frontier, so
+    a request put in while the workers wait for the rate limit still goes ahead of those with a higher priority. Use it
+    as an async context manager, inside a coroutine.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, concurrency: int=10, rate: Optional[float]=RATE,
+                 burst: int=BURST, user_agent: str=USER_AGENT, robots: bool=True, retries: int=RETRIES,
+                 backoff: float=BACKOFF):
+        self.session = session
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.user_agent = user_agent
+        self.robots = robots
+        self.retries = retries
+        self.backoff = backoff
+        self.hosts: Dict[str, Host] = {}
+        # per host (netloc): a heap of the requests waiting to be fetched
+        self.frontiers: Dict[str, list] = {}
+        self.order = itertools.count()
+        self.waiting = asyncio.Semaphore(0)
+        self.workers = []
+
+    async def __aenter__(self) -> 'CrawlScheduler':
+        self.workers = [asyncio.ensure_future(self.work()) for _ in range(self.concurrency)]
+        return self
+
+    async def __aexit__(self, *args):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+
+    def get(self, url: str, params: dict=None, headers: dict=None, priority: int=0) -> asyncio.Future:
+        """Put a request in the frontier, return a future of its (status, body, headers). The status is 0 if it wasn't
+        fetched because the robots.txt disallows it. If the host is still overloaded after all retries, it's the status
+        of the last response (429 or 5xx), with an empty body."""
+        future = asyncio.get_event_loop().create_future()
+        frontier = self.frontiers.setdefault(urlsplit(url).netloc, [])
+        heapq.heappush(frontier, (priority, next(self.order), url, params, headers, future))
+        self.waiting.release()
+        return future
+
+    async def next_request(self) -> tuple:
+        """Return the host and the request (url, params, headers, future) that goes first once the host allows it"""
+        # there's a request waiting for this worker, though another worker may take it first from under its host
+        await self.waiting.acquire()
+        while True:
+            first = min((frontier[0], netloc) for netloc, frontier in self.frontiers.items() if frontier)
+            netloc, url = first[1], first[0][2]
+            frontier = self.frontiers[netloc]
+            try:
+                host = await self.host(url)
+            except Exception as e:
+                # the robots.txt can't be read: the request that goes first fails, wait for the next one
+                if frontier:
+                    future = heapq.heappop(frontier)[-1]
+                    if not future.cancelled():
+                        future.set_exception(e)
+                    await self.waiting.acquire()
+                continue
+            if frontier and not self.allowed(host, frontier[0][2]):
+                # no need to wait for a token to not fetch it
+                return host, heapq.heappop(frontier)[2:]
+            await host.bucket.acquire()
+            # take the request off the frontier only now, whatever was put in while waiting for the token may go first
+            if frontier:
+                return host, heapq.heappop(frontier)[2:]
+            # another worker took the last request of this host in the meantime, take the first one of another host
+
+    async def work(self):
+        """Take the first request from the frontier, fetch it and set its result, and again"""
+        while True:
+            host, (url, params, headers, future) = await self.next_request()
+            if future.cancelled():
+                continue
+            try:
+                result = await self.fetch(host, url, params, headers)
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            else:
+                if not future.cancelled():
+                    future.set_result(result)
+
+    async def host(self, url: str) -> Host:
+        """Return the host of the url, read its robots.txt the first time"""
+        parts = urlsplit(url)
+        host = self.hosts.get(parts.netloc)
+        if host is None:
+            host = self.hosts[parts.netloc] = Host(self.rate, self.burst)
+        if self.robots and host.robots is None:
+            async with host.lock:
+                if host.robots is None:
+                    host.obey(await self.read_robots(f'{parts.scheme}://{parts.netloc}/robots.txt'), self.user_agent)
+        return host
+
+    async def read_robots(self, robots_url: str) -> RobotFileParser:
+        """Return the parsed robots.txt, which allows everything if there is none"""
+        robots = RobotFileParser(robots_url)
+        async with self.session.get(robots_url, headers={'User-Agent': self.user_agent}) as response:
+            if response.status in (401, 403):
+                # like RobotFileParser.read
+                robots.disallow_all = True
+            elif response.status == 200:
+                robots.parse((await response.text()).splitlines())
+            else:
+                robots.allow_all = True
+        return robots
+
+    def allowed(self, host: Host, url: str) -> bool:
+        return not host.robots or host.robots.can_fetch(self.user_agent, url)
+
+    async def fetch(self, host: Host, url: str, params: dict=None, headers: dict=None) -> Tuple[int, bytes, dict]:
+        """Return the status, body and headers of the response to the request, retrying if the host is overloaded.
+        The host's token for the first attempt was already taken."""
+        if not self.allowed(host, url):
+            print('disallowed by robots.txt:', url)
+            return 0, b'', {}
+        headers = dict(headers or {}, **{'User-Agent': self.user_agent})
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await host.bucket.acquire()
+            async with self.session.get(url, params=params, headers=headers) as response:
+                if response.status == 429 or response.status >= 500:
+                    if attempt == self.retries:
+                        print(f'response: {response.status}, giving up on {url} after {self.retries} retries')
+                        return response.status, b'', response.headers
+                    delay = retry_after(response.headers)
+                    if delay is None:
+                        delay = min(MAX_BACKOFF, self.backoff * 2 ** attempt)
+                    print(f'response: {response.status}, retry in {delay:.1f}s')
+                    host.slow_down(delay)
+                    continue
+                body = await response.read()
+                host.speed_up()
+                return response.status, body, response.headers
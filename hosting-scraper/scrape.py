@@ -2,19 +2,113 @@ import requests
 from bs4 import BeautifulSoup
 from collections import namedtuple
 import re
-from typing import List, Union
+from typing import Awaitable, Callable, Iterable, List, Union
 import csv
 from decimal import Decimal
+import json
+import os
+import asyncio
+import aiohttp
 
+from crawl_state import CrawlState
+from export import export_isps
+from extraction import Derived, Extractor, Field, LxmlBackend, SelectolaxBackend, SoupBackend, Spec, fastest_backend
+from http_cache import HttpCache
+from scheduler import RATE, CrawlScheduler
 
-def get_soup_from_url(url, params: dict={}):
-    """Return soup of html of this page (params are fixed)"""
+try:
+    import lxml.html
+    from lxml.etree import XPath
+except ImportError:
+    # lxml is optional, only needed for the 'lxml' parser
+    lxml = None
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    # selectolax is optional, only needed for the 'selectolax' parser
+    HTMLParser = None
+
+BASE_URL = 'https://www.ispgids.com'
+OVERVIEW_PATH = '/overzicht/'
+ISPS_PER_PAGE = 25  # number of isps on an overview page
+CONCURRENCY = 10  # maximum number of pages fetched at the same time by the async crawl
+PROBES = 4  # number of overview pages probed at the same time when looking for the last one
+# the async crawl fetches overview pages ahead of isp pages
+OVERVIEW_PRIORITY = 0
+ISP_PRIORITY = 1
+NO_RESULTS = 'Geen ISP\'s gevonden op basis van uw criteria.'
+# query: in the Netherlands and a minimum of 5 employees
+SEARCH_PARAMS = dict(
+    action='zoek',
+    naam='',
+    plaats='',
+    land='Nederland',
+    beoordeling_min='', beoordeling_max='',
+    ervaringen_min='', ervaringen_max='',
+    medewerkers_min='5', medewerkers_max='')
+# the cards on an isp page to read: the class of the header div and a list of tuples of detail name and dict key
+CARDS = [
+    ('adres', [
+        ('Adres', 'streetAddress'),
+        ('Postcode', 'postalCode'),
+        ('Plaats', 'addressLocality')]),
+    ('aantal', [
+        ('Aantal klanten', 'numberOfCustomers'),
+        ('Aantal domeinen', 'numberOfDomains'),
+        ('Aantal servers', 'numberOfServers')]),
+    ('bedrijfsinfo', [
+        ('Opgericht', 'yearFounded'),
+        ('Personeel Totaal', 'numberOfFte')]),
+]
+# class of the header div: {detail name: dict key}, for the cards to read
+CARD_KEYS = {clas: dict(subjects) for clas, subjects in CARDS}
+DEFAULT_PARSER = 'html.parser'
+# compiled once, used for every page
+SERVICES_PATTERN = re.compile('biedt de volgende diensten aan:\n(.*)\n')
+RESELLERS_PATTERN = re.compile('[ -]resel')
+REVIEW_PATTERN = re.compile('([0-9]*) uit 100')
+
+Columns = namedtuple("Columns", ['name', 'displayName'])
+# we want to fill the following fields, in this order:
+COLUMNS = (Columns('name', 'Naam',),
+           Columns('streetAddress', 'Adres'),
+           Columns('postalCode', 'Postcode'),
+           Columns('addressLocality', 'Plaats'),
+           Columns('yearFounded', 'Opgericht'),
+           Columns('numberOfCustomers', 'Klanten'),
+           Columns('numberOfDomains', 'Domeinen'),
+           Columns('numberOfServers', 'Servers'),
+           Columns('numberOfFte', 'Medewerkers (fte)'),
+           Columns('netPromotorScore', 'NPS (%)'),
+           Columns('resellersSupported', 'Resellers toegestaan'),
+           Columns('estimatedRevenue', 'Geschatte omzet (*miljoen euro)'),
+           Columns('servicesOffered', 'Diensten'))
+
+
+def get_page(url, params: dict={}, cache: HttpCache=None) -> Union[bytes, int]:
+    """Return the html of this page, or 0 if it couldn't be fetched. With a cache, a fresh cached page is returned
+    without fetching it, and an older one is only downloaded again if it changed."""
     print('fetch', url)
-    r = requests.get(url, params=params)
+    key = HttpCache.key(url, params)
+    cached = cache.get(key) if cache else None
+    if cached and cache.is_fresh(cached):
+        return cached['body']
+    r = requests.get(url, params=params, headers=HttpCache.conditional_headers(cached))
+    if cached and r.status_code == 304:
+        cache.not_modified(key)
+        return cached['body']
     if not r.status_code == 200:
         return 0
     print('response:', r)
-    return BeautifulSoup(r.content, 'html.parser')
+    if cache:
+        cache.put(key, r.content, r.headers)
+    return r.content
+
+
+def get_soup_from_url(url, params: dict={}, cache: HttpCache=None):
+    """Return soup of html of this page (params are fixed)"""
+    content = get_page(url, params, cache)
+    return BeautifulSoup(content, 'html.parser') if content else 0
 
 
 def calculate_nsp(pos_reviews: Union[int, str]) -> int:
@@ -36,163 +130,538 @@ def calculate_estimated_revenue(fte: Union[int, float, str]):
         return 0
 
 
-def read_card_details(soup, clas: str, subjects: List[tuple]) -> dict:
-    """Return dictionary with the desired company info card details.
+def supports_resellers(services: str) -> Union[int, str]:
+    """Return 1 if reselling is among the services offered"""
+    return 1 if RESELLERS_PATTERN.search(services) else ''
+
+
+def absolute_url(href: str) -> str:
+    return BASE_URL + href
+
+
+def to_number(res: str) -> Union[int, float, str]:
+    """Return the detail as a number if it is one"""
+    try:
+        return float(res) if '.' in res else int(res)
+    except (ValueError, TypeError):
+        return res
+
+
+def read_services(card_text: str) -> str:
+    """Return the services offered, from the text of the description card"""
+    services_match = SERVICES_PATTERN.search(card_text)
+    return services_match.group(1) if services_match else ''
+
 
-    The card consists of uls, find the correct li based on the header and extract the details
+def read_card(backend, labels: Iterable, keys: dict) -> dict:
+    """Return dictionary with the details of a company info card, from the ps of the ul its header div is in.
 
-    @:param soup: soup of entire isp page
-    @:param clas: the class of the header div
-    @:param subjects: list of tuples of detail name and dict key
+    The detail name is in a p, the value right after it: sometimes span is used, sometimes no tag, just text (hack for
+    missing </li> tags!).
+
+    @:param backend: the extraction backend of the parser, see extraction.py
+    @:param labels: the ps in the card
+    @:param keys: dict of detail name: dict key
     """
     result = {}
-    # find the header div
-    header = soup.find('div', {'class': clas})
-    # find the ul this header is found in
-    ul = header.parent.parent
-    # iterate over the li items to find the ones with the desired detail name, when found, store value under key
-    li = ul.find_all('li')
-    for item in li:
-        if not item.p:
-            continue
-        subj_name = item.p.text.strip()
-        for subj in subjects:
-            if subj_name == subj[0]:
-                # sometimes span is used, sometimes no tag, just text
-                if item.span:
-                    res = item.span.text.strip()
-                else:
-                    # hack for missing </li> tags!
-                    res = [i for i in item.p.next_siblings][0].strip()
-                # if the result is a number, store it as a number
-                try:
-                    res = float(res) if '.' in res else int(res)
-                except (ValueError, TypeError):
-                    pass
-                result[subj[1]] = res
+    for label in labels:
+        key = keys.get(backend.text(label).strip())
+        if key is not None:
+            # if the result is a number, store it as a number
+            result[key] = to_number(backend.text_after(label).strip())
+    return result
+
+
+def read_cards(isp_soup) -> dict:
+    """Return dictionary with the services offered and the details of all company info cards, read in one pass over
+    the isp page.
+
+    @:param isp_soup: soup of entire isp page
+    """
+    result = {}
+    # walk the tree ourselves, that's cheaper than find_all matching each element
+    for element in isp_soup.descendants:
+        if element.name == 'div':
+            for clas in element.get('class', ()):
+                if clas == 'officieeleinfo':
+                    result['servicesOffered'] = read_services(element.parent.text)
+                elif clas in CARD_KEYS:
+                    # the card is the ul this header is found in
+                    result.update(read_card(SoupBackend, element.parent.parent.find_all('p'), CARD_KEYS[clas]))
+
+    return result
+
+
+def overview_url(page_num: int) -> str:
+    """Return the url of the overview page with this number, each page shows the next ISPS_PER_PAGE isps"""
+    return BASE_URL + OVERVIEW_PATH + str(page_num * ISPS_PER_PAGE)
+
+
+def overview_content(content: Union[bytes, int], page_num: int) -> bytes:
+    """Return the html of the overview page, raise a ValueError if it couldn't be fetched: the crawl can't go on
+    without it (running it again resumes it)"""
+    if not content:
+        raise ValueError(f"Unable to fetch overview page {overview_url(page_num)}, run the crawl again to resume it")
+    return content
+
+
+def parse_overview(soup) -> List[dict]:
+    """Return the name, link and nsp of each of the isps on the overview page, an empty list when no more results are
+    found"""
+    # each isp is on a new row, paging might be needed
+    isps = []
+    isps_table = soup.find('table', attrs={'class': 'table'})
+    table_body = isps_table.find('tbody')
+    rows = table_body.find_all('tr')
+    # stop this when no more results are found
+    if NO_RESULTS in table_body.text:
+        return isps
+
+    # gather name, link and nsp for each of the isps shown on the page
+    for row in rows:
+        # find the link to the ISP-page in the second column
+        cols = row.find_all('td')
+        link = cols[1]
+        # calculate NPS (100 - ('number of negative reviews per 100' * 2))
+        review = cols[6]
+        sm = REVIEW_PATTERN.search(review.text)
+        pos = sm.group(1) if sm else ''
+        isps.append(dict(
+            name=link.a.string.strip(),
+            href=BASE_URL + link.a['href'],
+            nsp=calculate_nsp(pos)))
+    return isps
+
+
+def parse_isp(isp_soup, isp: dict) -> dict:
+    """Return the result row of this isp: the details from the cards on its page, added to the details that were
+    already on the overview page"""
+    # start with the details that were already on the overview page
+    result = {'name': isp.get('name'),
+              'netPromotorScore': isp.get('nsp')}
+    # get services from the description card, and address details, numbers and company info
+    result.update(read_cards(isp_soup))
+    result['resellersSupported'] = supports_resellers(result.setdefault('servicesOffered', ''))
+    # calculate estimated revenue from number of fte
+    result['estimatedRevenue'] = calculate_estimated_revenue(result['numberOfFte'])
+    return result
+
+
+def parse_overview_page(content: bytes) -> List[dict]:
+    """Parse the html of an overview page with BeautifulSoup's html.parser, see parse_overview"""
+    return parse_overview(BeautifulSoup(content, 'html.parser'))
+
+
+def parse_isp_page(content: bytes, isp: dict) -> dict:
+    """Parse the html of an isp page with BeautifulSoup's html.parser, see parse_isp"""
+    return parse_isp(BeautifulSoup(content, 'html.parser'), isp)
+
+
+def has_class(name: str) -> str:
+    """Return an XPath condition for an element with this class, like a CSS class selector"""
+    return f'contains(concat(" ", normalize-space(@class), " "), concat(" ", {name}, " "))'
+
+
+if lxml:
+    # compiled once
+    XPATH_TABLE_BODY = XPath('(//table[' + has_class("'table'") + '])[1]/tbody')
+
+
+def parse_overview_page_lxml(content: bytes) -> List[dict]:
+    """Parse the html of an overview page with lxml and precompiled XPath, see parse_overview"""
+    table_body = XPATH_TABLE_BODY(lxml.html.fromstring(content))[0]
+    if NO_RESULTS in table_body.text_content():
+        return []
+    isps = []
+    for row in table_body.iter('tr'):
+        cols = row.findall('td')
+        link = cols[1].find('.//a')
+        sm = REVIEW_PATTERN.search(cols[6].text_content())
+        pos = sm.group(1) if sm else ''
+        isps.append(dict(
+            name=link.text_content().strip(),
+            href=BASE_URL + link.get('href'),
+            nsp=calculate_nsp(pos)))
+    return isps
+
+
+def parse_isp_page_lxml(content: bytes, isp: dict) -> dict:
+    """Parse the html of an isp page with lxml and precompiled XPath, see parse_isp"""
+    tree = lxml.html.fromstring(content)
+    result = {'name': isp.get('name'),
+              'netPromotorScore': isp.get('nsp')}
+    # one pass over the divs, see read_cards
+    for element in tree.iter('div'):
+        for clas in (element.get('class') or '').split():
+            if clas == 'officieeleinfo':
+                result['servicesOffered'] = read_services(element.getparent().text_content())
+            elif clas in CARD_KEYS:
+                result.update(read_card(LxmlBackend, element.getparent().getparent().iter('p'), CARD_KEYS[clas]))
+    result['resellersSupported'] = supports_resellers(result.setdefault('servicesOffered', ''))
+    result['estimatedRevenue'] = calculate_estimated_revenue(result['numberOfFte'])
+    return result
+
+
+def parse_overview_page_selectolax(content: bytes) -> List[dict]:
+    """Parse the html of an overview page with selectolax and CSS selectors, see parse_overview"""
+    table_body = HTMLParser(content).css_first('table.table > tbody')
+    if NO_RESULTS in table_body.text():
+        return []
+    isps = []
+    for row in table_body.css('tr'):
+        cols = row.css('td')
+        link = cols[1].css_first('a')
+        sm = REVIEW_PATTERN.search(cols[6].text())
+        pos = sm.group(1) if sm else ''
+        isps.append(dict(
+            name=link.text().strip(),
+            href=BASE_URL + link.attributes['href'],
+            nsp=calculate_nsp(pos)))
+    return isps
+
 
+def parse_isp_page_selectolax(content: bytes, isp: dict) -> dict:
+    """Parse the html of an isp page with selectolax and CSS selectors, see parse_isp"""
+    tree = HTMLParser(content)
+    result = {'name': isp.get('name'),
+              'netPromotorScore': isp.get('nsp')}
+    # one pass over the divs, see read_cards
+    for element in tree.css('div'):
+        for clas in (element.attributes.get('class') or '').split():
+            if clas == 'officieeleinfo':
+                result['servicesOffered'] = read_services(element.parent.text())
+            elif clas in CARD_KEYS:
+                result.update(read_card(SelectolaxBackend, element.parent.parent.css('p'), CARD_KEYS[clas]))
+    result['resellersSupported'] = supports_resellers(result.setdefault('servicesOffered', ''))
+    result['estimatedRevenue'] = calculate_estimated_revenue(result['numberOfFte'])
     return result
 
 
-def scrape_isps(filename: str='./isps.csv'):
-    """Scrape ISP data and write to csv"""
-    # list of rows for each ISP the query finds
-    result_rows = []
-
-    # query: in the Netherlands and a minimum of 5 employees
-    params = dict(
-        action='zoek',
-        naam='',
-        plaats='',
-        land='Nederland',
-        beoordeling_min='', beoordeling_max='',
-        ervaringen_min='', ervaringen_max='',
-        medewerkers_min='5', medewerkers_max='')
-
-    page_num = 0
-    # for each subsequent page of 25 isps, get the page and collect details
-    while True:
-        # get overview page soup
-        url = "https://www.ispgids.com/overzicht/" + str(page_num * 25)
-        soup = get_soup_from_url(url, params)
-        # and increase page num
+# the overview page and isp page, as declarative extraction specs (see extraction.py)
+OVERVIEW_SPEC = Spec(
+    fields=[
+        Field('name', 'td:nth-of-type(2) a'),
+        Field('href', 'td:nth-of-type(2) a', attribute='href', convert=absolute_url),
+        # calculate NPS from 'number of positive reviews per 100'
+        Field('nsp', 'td:nth-of-type(7)', pattern='([0-9]*) uit 100', convert=calculate_nsp),
+    ],
+    # each isp is on a new row, the row saying no more results are found has no name
+    items='table.table > tbody > tr',
+    required='name')
+ISP_SPEC = Spec(fields=[
+    Field('servicesOffered', 'div.officieeleinfo', up=1, pattern=SERVICES_PATTERN.pattern),
+    Derived('resellersSupported', 'servicesOffered', supports_resellers),
+    # the details in the cards: the text after the p with the detail name, in the ul the header div is in
+    *[Field(key, f'div.{clas}', up=2, label=('p', subject), convert=to_number)
+      for clas, subjects in CARDS for subject, key in subjects],
+    Derived('estimatedRevenue', 'numberOfFte', calculate_estimated_revenue),
+])
+SPEC_BACKEND = fastest_backend()
+OVERVIEW_EXTRACTOR = Extractor(OVERVIEW_SPEC, SPEC_BACKEND)
+ISP_EXTRACTOR = Extractor(ISP_SPEC, SPEC_BACKEND)
+
+
+def parse_overview_page_spec(content: bytes) -> List[dict]:
+    """Parse the html of an overview page by the extraction spec, see parse_overview"""
+    return OVERVIEW_EXTRACTOR.extract(content)
+
+
+def parse_isp_page_spec(content: bytes, isp: dict) -> dict:
+    """Parse the html of an isp page by the extraction spec, see parse_isp"""
+    result = {'name': isp.get('name'),
+              'netPromotorScore': isp.get('nsp')}
+    result.update(ISP_EXTRACTOR.extract(content))
+    return result
+
+
+# name: (function to parse an overview page, function to parse an isp page), both parse the html content
+PARSERS = {
+    'html.parser': (parse_overview_page, parse_isp_page),
+    'lxml': (parse_overview_page_lxml, parse_isp_page_lxml),
+    'selectolax': (parse_overview_page_selectolax, parse_isp_page_selectolax),
+    # with the fastest backend that is installed
+    'spec': (parse_overview_page_spec, parse_isp_page_spec),
+}
+
+
+def get_parser(parser: str=DEFAULT_PARSER, cache: HttpCache=None) -> tuple:
+    """Return the functions that parse an overview page and an isp page with the parser with the given name. With a
+    cache, they return the cached result for pages that were parsed before."""
+    try:
+        functions = PARSERS[parser]
+    except KeyError:
+        raise ValueError(f"Unknown parser '{parser}', choose one of {', '.join(PARSERS)}")
+    if (parser == 'lxml' and lxml is None) or (parser == 'selectolax' and HTMLParser is None):
+        raise ImportError(f"the '{parser}' parser requires {parser} to be installed")
+    if cache:
+        return tuple(cache.cached_parser(parser, parse) for parse in functions)
+    return functions
+
+
+async def fetch_page(session: aiohttp.ClientSession, url: str, params: dict=None,
+                     scheduler: CrawlScheduler=None, cache: HttpCache=None,
+                     priority: int=ISP_PRIORITY) -> Union[bytes, int]:
+    """This coroutine returns the html of this page, or 0 if it couldn't be fetched, with a cache like get_page. With a
+    scheduler, the request waits its turn by priority and is fetched politely, see CrawlScheduler."""
+    print('fetch', url)
+    key = HttpCache.key(url, params)
+    cached = cache.get(key) if cache else None
+    if cached and cache.is_fresh(cached):
+        return cached['body']
+    headers = HttpCache.conditional_headers(cached)
+    if scheduler:
+        status, content, response_headers = await scheduler.get(url, params, headers, priority)
+    else:
+        async with session.get(url, params=params, headers=headers) as response:
+            status, content, response_headers = response.status, await response.read(), response.headers
+    if cached and status == 304:
+        cache.not_modified(key)
+        return cached['body']
+    if not status == 200:
+        return 0
+    print('response:', status)
+    if cache:
+        cache.put(key, content, response_headers)
+    return content
+
+
+class RowWriter:
+    """Write result rows to csv, and optionally json lines, as soon as they come in, so rows survive a crash.
+
+    With append, rows are added to the files of an earlier (resumed) crawl, else the files are written anew.
+    """
+
+    def __init__(self, filename: str, jsonl_filename: str=None, append: bool=False):
+        mode = 'a' if append else 'w'
+        self.csvfile = open(filename, mode, newline='')
+        self.writer = csv.DictWriter(self.csvfile, fieldnames=[c.name for c in COLUMNS])
+        if not append:
+            # write custom header
+            self.writer.writerow({c.name: c.displayName for c in COLUMNS})
+        self.jsonlfile = open(jsonl_filename, mode, encoding='utf-8') if jsonl_filename else None
+        self.count = 0
+
+    def write(self, row: dict):
+        """Write the row and flush right away"""
+        try:
+            self.writer.writerow(row)
+        except Exception as e:
+            print(e)
+            print(row)
+        self.csvfile.flush()
+        if self.jsonlfile:
+            self.jsonlfile.write(json.dumps(row, default=str) + '\n')
+            self.jsonlfile.flush()
+        self.count += 1
+
+    def close(self):
+        self.csvfile.close()
+        if self.jsonlfile:
+            self.jsonlfile.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def next_page_num(page_num: int, state: CrawlState) -> int:
+    """Return the number of the first overview page from page_num on that isn't finished yet"""
+    while page_num * ISPS_PER_PAGE in state.overviews:
         page_num += 1
+    return page_num
+
 
-        # each isp is on a new row, paging might be needed
-        isps = []
-        isps_table = soup.find('table', attrs={'class': 'table'})
-        table_body = isps_table.find('tbody')
-        rows = table_body.find_all('tr')
-        # stop this when no more results are found
-        if 'Geen ISP\'s gevonden op basis van uw criteria.' in table_body.text:
-            break
-
-        # gather name, link and nsp for each of the isps shown on the page
-        for row in rows:
-            # find the link to the ISP-page in the second column
-            cols = row.find_all('td')
-            link = cols[1]
-            # calculate NPS (100 - ('number of negative reviews per 100' * 2))
-            review = cols[6]
-            sm = re.search('([0-9]*) uit 100', review.text)
-            pos = sm.group(1) if sm else ''
-            isps.append(dict(
-                name=link.a.string.strip(),
-                href='https://www.ispgids.com' + link.a['href'],
-                nsp=calculate_nsp(pos)))
-
-        # visit each isp page and gather the details from the cards
-        for isp in isps:
-            isp_soup = get_soup_from_url(isp.get('href'))
-            if not isp_soup:
-                continue
-            # start with the details that were already on the overview page
-            result = {'name': isp.get('name'),
-                      'netPromotorScore': isp.get('nsp')}
-            # get details from the description card
-            card_text = isp_soup.find('div', attrs={'class': 'officieeleinfo'}).parent.text
-            services_match = re.search('.*biedt de volgende diensten aan:\n(.*)\n', card_text)
-            services = services_match.group(1) if services_match else ''
-            result['servicesOffered'] = services
-            result['resellersSupported'] = 1 if re.search('[ -]resel', services) else ''
-            # get address details
-            result.update(read_card_details(isp_soup, 'adres', [
-                ('Adres', 'streetAddress'),
-                ('Postcode', 'postalCode'),
-                ('Plaats', 'addressLocality')]))
-            # get numbers
-            result.update(read_card_details(isp_soup, 'aantal', [
-                ('Aantal klanten', 'numberOfCustomers'),
-                ('Aantal domeinen', 'numberOfDomains'),
-                ('Aantal servers', 'numberOfServers')]))
-            # get company info
-            result.update(read_card_details(isp_soup, 'bedrijfsinfo', [
-                ('Opgericht', 'yearFounded'),
-                ('Personeel Totaal', 'numberOfFte')]))
-            # calculate estimated revenue from number of fte
-            result['estimatedRevenue'] = calculate_estimated_revenue(result['numberOfFte'])
-            # append the results to the main list of rows
-            result_rows.append(result)
-
-    print('found {} isps'.format(len(result_rows)))
-    for rr in result_rows:
-        print(rr)
-
-    # TODO: write the results to CSV
-    Columns = namedtuple("Columns", ['name', 'displayName'])
-    # we want to fill the following fields, in this order:
-    column_names = (Columns('name', 'Naam',),
-                    Columns('streetAddress', 'Adres'),
-                    Columns('postalCode', 'Postcode'),
-                    Columns('addressLocality', 'Plaats'),
-                    Columns('yearFounded', 'Opgericht'),
-                    Columns('numberOfCustomers', 'Klanten'),
-                    Columns('numberOfDomains', 'Domeinen'),
-                    Columns('numberOfServers', 'Servers'),
-                    Columns('numberOfFte', 'Medewerkers (fte)'),
-                    Columns('netPromotorScore', 'NPS (%)'),
-                    Columns('resellersSupported', 'Resellers toegestaan'),
-                    Columns('estimatedRevenue', 'Geschatte omzet (*miljoen euro)'),
-                    Columns('servicesOffered', 'Diensten'))
-
-    print('write csv')
-    with open(filename, 'w', newline='') as csvfile:
-        fieldnames = [i[0] for i in column_names]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-
-        # write custom header
-        writer.writerow({c.name: c.displayName for c in column_names})
-        # write data
-        for rd in result_rows:
-            try:
-                writer.writerow(rd)
-            except Exception as e:
-                print(e)
-                print(rd)
-
-        # writer.writerows(result_rows)
+async def find_last_page(has_isps: Callable[[int], Awaitable[bool]], probes: int=PROBES) -> int:
+    """This coroutine returns the number of the first overview page without isps, the overview pages before it being
+    the ones to crawl. has_isps(page_num) is a coroutine function that tells whether an overview page lists isps,
+    page 0 is taken to have isps.
 
+    The site doesn't tell the number of results, so it's searched for: probes pages are probed at the same time, first
+    pages 1, 2, 4, 8, ... until one is empty, then pages spread evenly between the last page with isps and the first
+    one without, until these are next to each other. That takes about 2 log(pages) / log(probes + 1) rounds of
+    requests, rather than one request after the other for each page.
+    """
+    # the last page known to have isps, and the first one known to be empty
+    last, first_empty = 0, None
+    while first_empty is None:
+        page_nums = [max(1, 2 * last) * 2 ** i for i in range(probes)]
+        for page_num, found in zip(page_nums, await asyncio.gather(*map(has_isps, page_nums))):
+            if not found:
+                first_empty = page_num
+                break
+            last = page_num
+    while first_empty - last > 1:
+        step = (first_empty - last) / (probes + 1)
+        page_nums = sorted({last + max(1, round(step * i)) for i in range(1, probes + 1)} - {first_empty})
+        for page_num, found in zip(page_nums, await asyncio.gather(*map(has_isps, page_nums))):
+            if not found:
+                first_empty = page_num
+                break
+            last = page_num
+    return first_empty
+
+
+async def crawl_isps(finish: Callable, state: CrawlState, concurrency: int=CONCURRENCY,
+                     parser: str=DEFAULT_PARSER, cache: HttpCache=None, rate: float=RATE, discover: bool=False):
+    """This coroutine crawls all isps the query finds and calls finish(isp, row) with the result row of each isp.
+
+    All requests share one connection pool of at most concurrency connections, and are scheduled by a CrawlScheduler:
+    at most rate requests per second (None for no limit), or slower if robots.txt says so or the site is overloaded.
+    The isp pages of an overview page are fetched at the same time, while the next overview page is already being
+    fetched, ahead of the isp pages. Each isp page is parsed as soon as it comes in. The rows are finished in the same
+    order as the isps on the overview pages. Overview pages and isps that are finished according to the crawl state
+    are skipped. With a cache, see scrape_isps.
+
+    With discover, the last overview page is looked up first (see find_last_page) and then all overview pages are
+    fetched at the same time, ahead of the isp pages, rather than each one after the one before. Pages after the last
+    one found are still crawled as usual, in case the search was off (e.g. a probe couldn't be fetched).
+    """
+    parse_overview_page, parse_isp_page = get_parser(parser, cache)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session, \
+            CrawlScheduler(session, concurrency, rate) as scheduler:
+
+        async def fetch_isp(index: int, isp: dict) -> tuple:
+            isp_page = await fetch_page(session, isp.get('href'), scheduler=scheduler, cache=cache)
+            return index, parse_isp_page(isp_page, isp) if isp_page else None
+
+        async def read_overview(page_num: int) -> List[dict]:
+            content = await fetch_page(session, overview_url(page_num), SEARCH_PARAMS, scheduler, cache,
+                                       OVERVIEW_PRIORITY)
+            return parse_overview_page(overview_content(content, page_num))
+
+        # overview pages fetched while looking for the last one (None if it couldn't be fetched), and the ones being
+        # fetched after it was found
+        probed = {}
+        overviews = {}
+
+        async def has_isps(page_num: int) -> bool:
+            if page_num * ISPS_PER_PAGE in state.overviews:
+                return True
+            content = await fetch_page(session, overview_url(page_num), SEARCH_PARAMS, scheduler, cache,
+                                       OVERVIEW_PRIORITY)
+            # a page that can't be fetched is taken to be past the last one
+            probed[page_num] = parse_overview_page(content) if content else None
+            return bool(probed[page_num])
+
+        def fetch_overview(page_num: int) -> asyncio.Future:
+            """Return a future of the isps on the overview page, which may have been fetched already"""
+            if probed.get(page_num) is not None:
+                future = asyncio.get_event_loop().create_future()
+                future.set_result(probed.pop(page_num))
+                return future
+            if page_num in overviews:
+                return overviews.pop(page_num)
+            return asyncio.ensure_future(read_overview(page_num))
+
+        page_num = next_page_num(0, state)
+        next_overview = fetch_overview(page_num)
+        if discover:
+            last_page = await find_last_page(has_isps)
+            print('found {} overview pages'.format(last_page))
+            for other_page_num in range(page_num + 1, last_page):
+                if other_page_num * ISPS_PER_PAGE not in state.overviews:
+                    overviews[other_page_num] = fetch_overview(other_page_num)
+        while True:
+            isps = await next_overview
+            if not isps:
+                break
+            # prefetch the next overview page while the isp pages of this one are fetched and parsed
+            offset = page_num * ISPS_PER_PAGE
+            page_num = next_page_num(page_num + 1, state)
+            next_overview = fetch_overview(page_num)
+            rows = {}
+            next_index = 0
+            for next_done in asyncio.as_completed([fetch_isp(i, isp) for i, isp in enumerate(isps)
+                                                   if isp.get('href') not in state.isps]):
+                index, row = await next_done
+                rows[index] = row
+                # finish the rows that are next in line, skipping isps that were already finished
+                while next_index < len(isps) and (next_index in rows or isps[next_index].get('href') in state.isps):
+                    row = rows.pop(next_index, None)
+                    if row:
+                        finish(isps[next_index], row)
+                    next_index += 1
+            state.finish_overview(offset)
+
+
+def scrape_isps(filename: str='./isps.csv', use_async: bool=False, concurrency: int=CONCURRENCY,
+                parser: str=DEFAULT_PARSER, jsonl_filename: str=None, state_filename: str=None,
+                cache: HttpCache=None, rate: float=RATE, discover: bool=False, export_format: str=None):
+    """Scrape ISP data and write to csv, and to json lines if jsonl_filename is given
+
+    Each row is written as soon as its isp is done, and recorded in the crawl state file (filename + '.state' by
+    default). When a crawl is interrupted, running it again resumes it: finished overview pages and isps are skipped
+    and rows are added to the files. The crawl state is removed when the crawl is complete.
+
+    With use_async, pages are fetched concurrently rather than one after the other, at most rate requests per second
+    and within the limits of the site's robots.txt (see crawl_isps). The pages are parsed with the parser of the given
+    name, see PARSERS. With discover as well, all overview pages are fetched at the same time once the last one is
+    found, instead of each one after the other.
+
+    With a cache, pages fetched within its ttl aren't fetched again, older pages are revalidated with a conditional
+    request and only downloaded if they changed, and pages whose contents didn't change aren't parsed again.
+
+    With an export_format ('parquet' or 'arrow', needs pyarrow), the complete csv is also exported to a file with typed
+    columns next to it, see export.export_isps.
+    """
+    state_filename = state_filename or filename + '.state'
+    if not os.path.exists(filename) and os.path.exists(state_filename):
+        # the rows of the earlier crawl are gone, so start over
+        os.remove(state_filename)
+    state = CrawlState(state_filename, SEARCH_PARAMS)
+    with state, RowWriter(filename, jsonl_filename, append=state.resumed) as writer:
+
+        def finish(isp: dict, row: dict):
+            print(row)
+            writer.write(row)
+            state.finish_isp(isp.get('href'))
+
+        if use_async:
+            # make sure the event loop is always a new one, because we can't reopen an already closed loop
+            asyncio.set_event_loop(asyncio.new_event_loop())
+            loop = asyncio.get_event_loop()
+            loop.run_until_complete(crawl_isps(finish, state, concurrency, parser, cache, rate, discover))
+            loop.close()
+        else:
+            parse_overview_page, parse_isp_page = get_parser(parser, cache)
+            page_num = next_page_num(0, state)
+            # for each subsequent page of 25 isps, get the page and collect details
+            while True:
+                # get overview page
+                content = get_page(overview_url(page_num), SEARCH_PARAMS, cache)
+                isps = parse_overview_page(overview_content(content, page_num))
+                if not isps:
+                    break
+
+                # visit each isp page and gather the details from the cards
+                for isp in isps:
+                    if isp.get('href') in state.isps:
+                        continue
+                    isp_page = get_page(isp.get('href'), cache=cache)
+                    if not isp_page:
+                        continue
+                    # write the row right away
+                    finish(isp, parse_isp_page(isp_page, isp))
+                state.finish_overview(page_num * ISPS_PER_PAGE)
+                # and increase page num
+                page_num = next_page_num(page_num + 1, state)
+
+    print('found {} isps'.format(writer.count))
+    if cache:
+        print('cache: {fresh} fresh, {not_modified} not modified, {fetched} fetched, {parsed} parsed, '
+              '{parse_skipped} not parsed again'.format(**cache.stats))
+    # the crawl is complete, a next one starts over
+    os.remove(state_filename)
+    if export_format:
+        export_isps(filename, format=export_format)
     print('done')
 
+
 if __name__ == '__main__':
-    scrape_isps()
\ No newline at end of file
+    # a plain, sequential crawl; opt in to more with e.g. use_async=True (concurrency, rate, discover), parser='lxml',
+    # jsonl_filename, export_format='parquet', or a page cache: with HttpCache() as cache: scrape_isps(cache=cache)
+    scrape_isps()
+
@@ -0,0 +1,99 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+import hashlib
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlsplit
+
+__all__ = ['StandInServer']
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """HTTPServer handling each request in a thread, like http.server.ThreadingHTTPServer (Python 3.7+)"""
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        status, headers, body = self.server.stand_in.respond(urlsplit(self.path).path, self.headers)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        # don't log every request to stderr
+        pass
+
+
+class StandInServer:
+    """Local stand-in for ispgids.com, serving the pages of the fixtures (url path: html, see fixtures.py) with a
+    configurable latency per request, so scrape_isps can be run, benchmarked and tested without network.
+
+    The query string is ignored, unknown paths get a 404. Pages have an ETag, so conditional requests get a 304 when
+    the page didn't change. The robots_txt is served at /robots.txt (else it's a 404 too). To test backing off, the
+    first too_many_requests requests for pages get a 429 with a Retry-After of retry_after seconds. The time and path
+    of each request are logged. Use it as a context manager and point scrape.BASE_URL to its url.
+    """
+
+    def __init__(self, pages: Dict[str, str], latency: float=0.0, robots_txt: str=None, too_many_requests: int=0,
+                 retry_after: float=0):
+        self.pages = pages
+        self.robots_txt = robots_txt
+        self.too_many_requests = too_many_requests
+        self.retry_after = retry_after
+        self.log = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.server.daemon_threads = True
+        self.server.stand_in = self
+        self.server.latency = latency
+        self.thread = None
+        # number of responses per status code
+        self.responses = {}
+
+    @property
+    def url(self) -> str:
+        return 'http://{}:{}'.format(*self.server.server_address)
+
+    @property
+    def requests(self) -> int:
+        return sum(self.responses.values())
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def __enter__(self) -> 'StandInServer':
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def respond(self, path: str, request_headers) -> tuple:
+        """Return the status, headers and body the site would respond with to a request for this path"""
+        self.log.append((time.monotonic(), path))
+        page = self.robots_txt if path == '/robots.txt' else self.pages.get(path)
+        if page is not None and path != '/robots.txt' and self.too_many_requests > 0:
+            self.too_many_requests -= 1
+            status, headers, body = 429, {'Retry-After': str(self.retry_after)}, b''
+        elif page is None:
+            status, headers, body = 404, {}, b''
+        else:
+            body = page.encode('utf-8')
+            headers = {'Content-Type': 'text/html; charset=utf-8',
+                       'ETag': '"{}"'.format(hashlib.sha1(body).hexdigest())}
+            status = 304 if request_headers.get('If-None-Match') == headers['ETag'] else 200
+            if status == 304:
+                body = b''
+        self.responses[status] = self.responses.get(status, 0) + 1
+        return status, headers, body
@@ -0,0 +1,57 @@
+from datetime import date
+from decimal import Decimal
+import os
+import tempfile
+import unittest
+
+import scrape
+from export import COLUMN_TYPES, FORMATS, SERVICES, export_isps, load_exports, pa, read_isps, typed_row, with_services
+
+ISPS_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'isps.csv')
+
+
+class TestExport(unittest.TestCase):
+
+    def test_columns_are_the_columns_of_the_csv(self):
+        self.assertEqual([c.name for c in scrape.COLUMNS], list(COLUMN_TYPES))
+
+    def test_rows_get_typed_values(self):
+        row = typed_row(dict(name='Antagonist', yearFounded='24-06-2004', numberOfCustomers='90000',
+                             numberOfServers='Geen opgave', numberOfFte='15.0', netPromotorScore='98',
+                             resellersSupported='1', estimatedRevenue='3.0',
+                             servicesOffered='Domeinnaam, Webhosting, Usenet toegang, Tweets.'), date(2020, 1, 1))
+        self.assertEqual(date(2004, 6, 24), row['yearFounded'])
+        self.assertEqual((90000, None, None), (row['numberOfCustomers'], row['numberOfServers'],
+                                               row['numberOfDomains']))
+        self.assertEqual((15.0, Decimal('3.0'), True), (row['numberOfFte'], row['estimatedRevenue'],
+                                                        row['resellersSupported']))
+        self.assertEqual(['Domeinnaam', 'Webhosting', 'Usenet toegang', 'Tweets'], row['servicesOffered'])
+        self.assertEqual(0b1 | 0b100 | 1 << SERVICES.index('Usenet toegang'), row['servicesMask'])
+        self.assertEqual(None, row['streetAddress'])
+
+    def test_services_of_the_csv_are_known(self):
+        rows = read_isps(ISPS_FILENAME)
+        self.assertEqual(142, len(rows))
+        for row in rows:
+            self.assertEqual(len(row['servicesOffered']), bin(row['servicesMask']).count('1'))
+
+    @unittest.skipIf(pa is None, 'pyarrow is not installed')
+    def test_exports_are_read_back_typed_and_filtered_on_services(self):
+        rows = read_isps(ISPS_FILENAME, date(2020, 1, 1))
+        with tempfile.TemporaryDirectory() as directory:
+            for format in FORMATS:
+                with self.subTest(format=format):
+                    filenames = [export_isps(ISPS_FILENAME, os.path.join(directory, f'{day}.{format}'), format,
+                                             date(2020, 1, day)) for day in (1, 2)]
+                    table = load_exports(filenames, format)
+                    self.assertEqual(2 * len(rows), table.num_rows)
+                    self.assertEqual(rows, table.slice(0, len(rows)).to_pylist())
+                    self.assertEqual(pa.date32(), table.schema.field('yearFounded').type)
+                    filtered = with_services(table, 'Webhosting', 'Colocatie')
+                    expected = [row['name'] for row in rows
+                                if {'Webhosting', 'Colocatie'} <= set(row['servicesOffered'])]
+                    self.assertEqual(expected * 2, filtered['name'].to_pylist())
+        with self.assertRaises(ValueError):
+            with_services(table, 'Tweets')
+        with self.assertRaises(ValueError):
+            export_isps(ISPS_FILENAME, format='xlsx')
@@ -0,0 +1,66 @@
+import os
+import unittest
+
+import scrape
+from extraction import BACKENDS, Derived, Extractor, Field, Spec, extract_pages
+from fixtures import make_fixtures
+
+ISPS_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'isps.csv')
+
+
+def installed_backends() -> list:
+    names = []
+    for name in BACKENDS:
+        try:
+            Extractor(Spec(fields=[]), name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+class TestExtractor(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        pages = make_fixtures(ISPS_FILENAME, number_of_isps=30)
+        cls.overview_pages = [pages['/overzicht/0'].encode('utf-8'), pages['/overzicht/50'].encode('utf-8')]
+        cls.isp_pages = [page.encode('utf-8') for path, page in pages.items() if path.startswith('/isp/')]
+
+    def test_specs_extract_what_the_parsers_parse(self):
+        isps = [scrape.parse_overview_page(page) for page in self.overview_pages]
+        self.assertEqual(25, len(isps[0]))
+        self.assertEqual([], isps[1])
+        rows = [scrape.parse_isp_page(page, isp) for page, isp in zip(self.isp_pages, isps[0])]
+        for backend in installed_backends():
+            with self.subTest(backend=backend):
+                overview_extractor = Extractor(scrape.OVERVIEW_SPEC, backend)
+                isp_extractor = Extractor(scrape.ISP_SPEC, backend)
+                self.assertEqual(isps, [overview_extractor.extract(page) for page in self.overview_pages])
+                self.assertEqual(rows, [dict(name=isp['name'], netPromotorScore=isp['nsp'],
+                                             **isp_extractor.extract(page))
+                                        for page, isp in zip(self.isp_pages, isps[0])])
+
+    def test_missing_fields_get_the_default(self):
+        spec = Spec(fields=[Field('title', 'h1'), Field('missing', 'h2', default='none', convert=str.upper),
+                            Field('number', 'p', pattern='([0-9]+) spam', convert=int, default='0'),
+                            Derived('length', 'title', len)])
+        self.assertEqual(dict(title='Spam', missing='NONE', number=0, length=4),
+                         Extractor(spec).extract('<h1> Spam </h1><p>eggs</p>'))
+
+    def test_label_value_after_whitespace_is_extracted(self):
+        spec = Spec(fields=[Field(name, 'ul', label=('p', name)) for name in ('span', 'newline', 'text', 'none')])
+        html = ('<ul><li><p>span</p> <span>9000</span></li><li><p>newline</p>\n<span>10</span>\n</li>'
+                '<li><p>text</p>\n 2004\n</li><li><p>none</p></li></ul>')
+        for backend in installed_backends():
+            with self.subTest(backend=backend):
+                self.assertEqual(dict(span='9000', newline='10', text='2004', none=''),
+                                 Extractor(spec, backend).extract(html))
+
+    def test_pages_are_extracted_in_order_in_worker_processes(self):
+        expected = [Extractor(scrape.ISP_SPEC).extract(page) for page in self.isp_pages]
+        self.assertEqual(expected, list(extract_pages(scrape.ISP_SPEC, self.isp_pages, workers=2, chunksize=4)))
+
+    def test_unknown_backend_raises(self):
+        with self.assertRaises(ValueError):
+            Extractor(scrape.ISP_SPEC, 'regex')
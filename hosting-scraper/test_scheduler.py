@@ -0,0 +1,123 @@
+import asyncio
+import contextlib
+import io
+import time
+import unittest
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+
+from scheduler import CrawlScheduler, Host, TokenBucket
+from standin import StandInServer
+
+PAGES = {f'/page/{i}': f'<html><p>page {i}</p></html>' for i in range(8)}
+
+
+class TestCrawlScheduler(unittest.TestCase):
+
+    def setUp(self):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        self.loop = asyncio.get_event_loop()
+
+    def crawl(self, server: StandInServer, requests: list, **kwargs) -> list:
+        """Return the statuses of the requests (path, priority), all put in the frontier at once"""
+
+        async def get_all() -> list:
+            async with aiohttp.ClientSession() as session, CrawlScheduler(session, **kwargs) as scheduler:
+                futures = [scheduler.get(server.url + path, priority=priority) for path, priority in requests]
+                return [status for status, _, _ in await asyncio.gather(*futures)]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.loop.run_until_complete(get_all())
+
+    def test_robots_txt_crawl_delay_lowers_the_rate(self):
+        robots = RobotFileParser()
+        robots.parse(['User-agent: hosting-scraper', 'Crawl-delay: 2', '', 'User-agent: *', 'Crawl-delay: 10'])
+        host = Host(max_rate=5, burst=5)
+        host.obey(robots, 'hosting-scraper')
+        self.assertEqual(0.5, host.bucket.rate)
+        self.assertEqual(1, host.bucket.burst)
+        host.slow_down(0)
+        self.assertEqual(0.25, host.bucket.rate)
+        for _ in range(10):
+            host.speed_up()
+        self.assertEqual(0.5, host.bucket.rate)
+
+    def test_robots_txt_request_rate_and_disallow_are_obeyed(self):
+        robots_txt = 'User-agent: *\nRequest-rate: 20/1\nDisallow: /page/7\n'
+        with StandInServer(PAGES, robots_txt=robots_txt) as server:
+            statuses = self.crawl(server, [(path, 0) for path in PAGES], concurrency=4, rate=None)
+        self.assertEqual([200] * 7 + [0], statuses)
+        paths = [path for _, path in server.log]
+        self.assertEqual('/robots.txt', paths[0])
+        self.assertNotIn('/page/7', paths)
+        starts = [t for t, path in server.log[1:]]
+        self.assertGreaterEqual(min(b - a for a, b in zip(starts, starts[1:])), 0.04)
+
+    def test_overloaded_host_is_retried_after_a_pause(self):
+        with StandInServer(PAGES, too_many_requests=3, retry_after=0.1) as server:
+            start = time.monotonic()
+            statuses = self.crawl(server, [(path, 0) for path in PAGES], concurrency=2, rate=None)
+            seconds = time.monotonic() - start
+        self.assertEqual([200] * len(PAGES), statuses)
+        self.assertEqual(3, server.responses[429])
+        self.assertGreaterEqual(seconds, 0.1)
+
+    def test_overloaded_host_is_given_up_on_after_the_retries(self):
+        with StandInServer(PAGES, too_many_requests=3, retry_after=0) as server:
+            statuses = self.crawl(server, [('/page/0', 0), ('/page/1', 0)], concurrency=1, rate=None, retries=1)
+        # the first page gets a 429 on both attempts, the second one on its first attempt only
+        self.assertEqual([429, 200], statuses)
+        self.assertEqual(3, server.responses[429])
+
+    def test_unreachable_host_fails_its_requests_only(self):
+
+        async def get_all(url: str) -> list:
+            async with aiohttp.ClientSession() as session, CrawlScheduler(session, concurrency=1) as scheduler:
+                futures = [scheduler.get(url + '/page/0', priority=0)]
+                futures += [scheduler.get(server.url + f'/page/{i}', priority=1) for i in range(2)]
+                return await asyncio.gather(*futures, return_exceptions=True)
+
+        with StandInServer(PAGES) as unreachable:
+            pass
+        with StandInServer(PAGES) as server, contextlib.redirect_stdout(io.StringIO()):
+            results = self.loop.run_until_complete(get_all(unreachable.url))
+        self.assertIsInstance(results[0], aiohttp.ClientConnectionError)
+        self.assertEqual([200, 200], [status for status, _, _ in results[1:]])
+
+    def test_frontier_takes_lower_priority_first_under_the_rate_limit(self):
+        # the workers are waiting for the host's tokens when the requests with a lower priority come in
+
+        async def get_all() -> list:
+            async with aiohttp.ClientSession() as session, CrawlScheduler(session, concurrency=4, rate=10,
+                                                                           burst=1) as scheduler:
+                futures = [scheduler.get(server.url + f'/page/{i}', priority=1) for i in range(6)]
+                await futures[0]
+                futures += [scheduler.get(server.url + path, priority=0) for path in ('/page/6', '/page/7')]
+                await asyncio.gather(*futures)
+
+        with StandInServer(PAGES) as server, contextlib.redirect_stdout(io.StringIO()):
+            self.loop.run_until_complete(get_all())
+        self.assertEqual(['/robots.txt', '/page/0', '/page/6', '/page/7'] + [f'/page/{i}' for i in range(1, 6)],
+                         [path for _, path in server.log])
+
+    def test_frontier_takes_lower_priority_first(self):
+        requests = [(f'/page/{i}', 1) for i in range(6)] + [('/page/6', 0), ('/page/7', 0)]
+        with StandInServer(PAGES) as server:
+            self.crawl(server, requests, concurrency=1, rate=None)
+        self.assertEqual(['/robots.txt', '/page/6', '/page/7'] + [f'/page/{i}' for i in range(6)],
+                         [path for _, path in server.log])
+
+    def test_token_bucket_limits_the_rate_after_the_burst(self):
+
+        async def take(bucket: TokenBucket, tokens: int) -> float:
+            start = time.monotonic()
+            for _ in range(tokens):
+                await bucket.acquire()
+            return time.monotonic() - start
+
+        self.assertLess(self.loop.run_until_complete(take(TokenBucket(rate=20, burst=5), 5)), 0.04)
+        self.assertGreaterEqual(self.loop.run_until_complete(take(TokenBucket(rate=20, burst=1), 5)), 0.19)
+
+    def tearDown(self):
+        self.loop.close()
@@ -0,0 +1,150 @@
+import contextlib
+import csv
+import io
+import os
+import tempfile
+import unittest
+
+import scrape
+from fixtures import make_fixtures, make_isp_page
+from http_cache import HttpCache
+from standin import StandInServer
+
+ISPS_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'isps.csv')
+
+
+def read_csv(filename: str) -> list:
+    with open(filename, newline='') as csvfile:
+        return list(csv.reader(csvfile))
+
+
+def installed_parsers() -> list:
+    names = []
+    for parser in scrape.PARSERS:
+        try:
+            scrape.get_parser(parser)
+        except ImportError:
+            continue
+        names.append(parser)
+    return names
+
+
+class TestParseIspPage(unittest.TestCase):
+
+    def test_details_are_read_from_the_card_of_their_header_only(self):
+        page = b'''<ul><li><div class="aantal"><h4>Aantallen</h4></div></li>
+<li><p>Aantal klanten</p><span>9000</span></li></ul>
+<ul><li><p>Aantal domeinen</p><span>not in a card</span></li></ul>
+<ul><li><div class="bedrijfsinfo"><h4>Bedrijfsinfo</h4></div></li><li><p>Personeel Totaal</p><span>3.0</span></li></ul>
+'''
+        for parser in installed_parsers():
+            with self.subTest(parser=parser):
+                row = scrape.get_parser(parser)[1](page, dict(name='Antagonist', nsp=98))
+                self.assertEqual((9000, 3.0), (row['numberOfCustomers'], row['numberOfFte']))
+                self.assertNotEqual('not in a card', row.get('numberOfDomains'))
+
+    def test_values_after_whitespace_and_without_span_are_read(self):
+        # the fixtures give the postal code, city and number of domains after whitespace, the number of customers and
+        # servers as just text (see fixtures.make_isp_page)
+        with open(ISPS_FILENAME, newline='') as csvfile:
+            rows = list(csv.DictReader(csvfile))[:5]
+        for parser in installed_parsers():
+            with self.subTest(parser=parser):
+                for row in rows:
+                    result = scrape.get_parser(parser)[1](make_isp_page(row).encode('utf-8'),
+                                                          dict(name=row['Naam'], nsp=int(row['NPS (%)'])))
+                    self.assertEqual([scrape.to_number(row[name]) for name in (
+                        'Adres', 'Postcode', 'Plaats', 'Klanten', 'Domeinen', 'Servers', 'Medewerkers (fte)')],
+                        [result[key] for key in ('streetAddress', 'postalCode', 'addressLocality', 'numberOfCustomers',
+                                                 'numberOfDomains', 'numberOfServers', 'numberOfFte')])
+
+
+class TestScrapeIsps(unittest.TestCase):
+    """Run scrape_isps against the stand-in server replaying pages made from isps.csv, instead of ispgids.com"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pages = make_fixtures(ISPS_FILENAME, number_of_isps=60)
+        cls.expected = read_csv(ISPS_FILENAME)[:61]
+        cls.server = StandInServer(cls.pages)
+        cls.server.start()
+        cls.base_url, scrape.BASE_URL = scrape.BASE_URL, cls.server.url
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'isps.csv')
+
+    def scrape(self, **kwargs) -> list:
+        # no need to spare the stand-in, see test_scheduler for the rate limits
+        kwargs.setdefault('rate', None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            scrape.scrape_isps(self.filename, **kwargs)
+        return read_csv(self.filename)
+
+    def test_sync_and_async_crawl_write_the_rows_the_pages_were_made_from(self):
+        self.assertEqual(self.expected, self.scrape())
+        self.assertEqual(self.expected, self.scrape(use_async=True, concurrency=4))
+        self.assertFalse(os.path.exists(self.filename + '.state'))
+
+    def test_parsers_write_the_same_rows(self):
+        for parser in installed_parsers():
+            with self.subTest(parser=parser):
+                self.assertEqual(self.expected, self.scrape(use_async=True, parser=parser))
+        with self.assertRaises(ValueError):
+            scrape.get_parser('regex')
+
+    def test_discovered_overview_pages_are_fetched_ahead_of_the_isp_pages(self):
+        with StandInServer(self.pages) as server:
+            scrape.BASE_URL = server.url
+            try:
+                self.assertEqual(self.expected, self.scrape(use_async=True, concurrency=4, discover=True))
+            finally:
+                scrape.BASE_URL = self.server.url
+        paths = [path for _, path in server.log if path != '/robots.txt']
+        overviews = [path for path in paths if path.startswith(scrape.OVERVIEW_PATH)]
+        # pages 0, 1, 2 list isps, page 3 is empty and probing pages 4 and 8 gets a 404
+        self.assertEqual({f'/overzicht/{page_num * 25}' for page_num in (0, 1, 2, 3, 4, 8)}, set(overviews))
+        self.assertEqual(len(overviews), len(set(overviews)))
+        self.assertEqual(overviews, paths[:len(overviews)])
+
+    def test_interrupted_crawl_is_resumed(self):
+        jsonl_filename = os.path.join(self.directory.name, 'isps.jsonl')
+        # the site goes down before the second overview page, the crawl stops as it can't go on without it
+        pages = {path: page for path, page in self.pages.items() if path != '/overzicht/25'}
+        with StandInServer(pages) as server:
+            scrape.BASE_URL = server.url
+            try:
+                with self.assertRaisesRegex(ValueError, 'Unable to fetch overview page .*/overzicht/25'):
+                    self.scrape(jsonl_filename=jsonl_filename)
+                # the async crawl resumes, and stops at the same page
+                with self.assertRaisesRegex(ValueError, 'Unable to fetch overview page .*/overzicht/25'):
+                    self.scrape(jsonl_filename=jsonl_filename, use_async=True)
+            finally:
+                scrape.BASE_URL = self.server.url
+        self.assertEqual(self.expected[:26], read_csv(self.filename))
+        requests = self.server.requests
+        self.assertEqual(self.expected, self.scrape(jsonl_filename=jsonl_filename))
+        # the first overview page and its isps aren't fetched again: the other 35 isps and 3 overview pages are
+        self.assertEqual(35 + 3, self.server.requests - requests)
+        with open(jsonl_filename) as f:
+            self.assertEqual(60, len(f.readlines()))
+
+    def test_unchanged_pages_are_revalidated_and_not_parsed_again(self):
+        with HttpCache(os.path.join(self.directory.name, 'cache.sqlite'), ttl=0) as cache:
+            self.scrape(cache=cache)
+            not_modified = self.server.responses.get(304, 0)
+            self.assertEqual(self.expected, self.scrape(use_async=True, cache=cache))
+            self.assertEqual(len(self.pages), self.server.responses.get(304, 0) - not_modified)
+            self.assertEqual(len(self.pages), cache.stats['parse_skipped'])
+            cache.ttl = 60
+            requests = self.server.requests
+            self.assertEqual(self.expected, self.scrape(cache=cache))
+            self.assertEqual(requests, self.server.requests)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    @classmethod
+    def tearDownClass(cls):
+        scrape.BASE_URL = cls.base_url
+        cls.server.stop()
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+from typing import Any
+
+
+class Journal:
+    """Append-only journal (json lines) of the items that completed during a parallel run.
+
+    The first line holds a fingerprint of the input, every following line holds the index of a completed item and its
+    result. When a run is restarted with the same input and journal file, the completed items are read back and only
+    the remainder needs to be requested. A journal with a different fingerprint is discarded and started anew.
+
+    An item can consist of parts that are requested separately, e.g. the inserts of a post item. The result of each
+    completed part is recorded as well (with its part number), so when only some parts failed, only those need to be
+    requested again.
+    """
+
+    def __init__(self, filename: str, items: list, method: str='get'):
+        self.filename = filename
+        self.fingerprint = self.make_fingerprint(items, method)
+        self.completed = {}
+        # index: {part: result} of the completed parts of items
+        self.parts = {}
+        if os.path.exists(filename):
+            self.completed = self.read()
+        if not (self.completed or self.parts):
+            # new journal or a journal for some other input: start over
+            with open(filename, 'w') as f:
+                f.write(json.dumps({'fingerprint': self.fingerprint}) + '\n')
+        else:
+            print(f'resuming from journal {filename}: {len(self.completed)} items already completed, '
+                  f'{len(self.parts)} items partly')
+        self.file = open(filename, 'a')
+
+    @staticmethod
+    def make_fingerprint(items: list, method: str) -> str:
+        """Return a hash of the method and input items, used to check that a journal belongs to this run"""
+        dump = json.dumps([method, items], sort_keys=True, default=str)
+        return hashlib.sha256(dump.encode('utf-8')).hexdigest()
+
+    def read(self) -> dict:
+        """Return a dict of index: result of the items completed according to the journal file, or an empty dict if
+        the journal doesn't match the input. The completed parts are read into parts."""
+        completed = {}
+        parts = {}
+        with open(self.filename) as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                return {}
+            if header.get('fingerprint') != self.fingerprint:
+                print(f'journal {self.filename} belongs to a different input, starting over')
+                return {}
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # the last line may be incomplete if the previous run was killed while writing
+                    break
+                if 'part' in entry:
+                    parts.setdefault(entry['index'], {})[entry['part']] = entry['result']
+                else:
+                    completed[entry['index']] = entry['result']
+        self.parts = parts
+        return completed
+
+    def record(self, index: int, result: Any):
+        """Append the result of a completed item to the journal, flush right away so it survives a crash"""
+        self.completed[index] = result
+        self.write({'index': index, 'result': result})
+
+    def record_part(self, index: int, part: int, result: Any):
+        """Append the result of a completed part of the item at index to the journal"""
+        self.parts.setdefault(index, {})[part] = result
+        self.write({'index': index, 'part': part, 'result': result})
+
+    def write(self, entry: dict):
+        self.file.write(json.dumps(entry, default=str) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
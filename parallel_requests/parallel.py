@@ -3,24 +3,59 @@ import asyncio
 from functools import partial
 import time
 from urllib.parse import urlsplit, urlunsplit, parse_qsl
-from typing import Union
+from typing import Callable, Union
+from .journal import Journal
 
 
-__all__ = ['get']
+__all__ = ['get', 'delete_where']
 
 TIMEOUT = 300  # 300 is the default
 CONCURRENCY = 1000  # Semaphore defaults to 1
 OFFSET = 0
 BATCH_LIMIT = 1000
+PAGE_CONCURRENCY = 10  # number of listing pages to request at the same time in delete_where
+DELETE_WORKERS = 100  # number of workers taking urls off the queue to delete in delete_where
 
 
 class RequestCaller:
     """Call the appropriate request on all urls found in the list items in parallel
     and aggregate and return the responses"""
 
-    def __init__(self, headers: dict=None):
+    def __init__(self, headers: dict=None, journal: Journal=None, on_result: Callable=None):
         # use a semaphore to make sure no more than CONCURRENCY requests run at the same time
         self.semaphore = asyncio.Semaphore(CONCURRENCY)
+        # optional journal of completed items, to be able to resume an interrupted run
+        self.journal = journal
+        # optional on_result(index, result), called for each item as soon as its result is in
+        self.on_result = on_result
+
+    async def run_item(self, index: int, coroutine) -> Union[dict, list]:
+        """Await the coroutine for the item at index, record the result in the journal and pass it on to on_result as
+        soon as it's done"""
+        try:
+            result = await coroutine
+        except Exception as e:
+            result = e
+        # only successful results are recorded, failed items will be requested again when the run is resumed
+        if self.journal and not has_exception(result):
+            self.journal.record(index, result)
+        if self.on_result:
+            self.on_result(index, result)
+        return result
+
+    async def gather(self, items: list, make_coroutine: Callable) -> list:
+        """Run the coroutine for each item and return the results in the order of the items.
+
+        Items that were already completed according to the journal are not requested again, their results are taken
+        from the journal instead (and passed on to on_result first, the others follow as they come in)."""
+        completed = dict(self.journal.completed) if self.journal else {}
+        if self.on_result:
+            for i, result in sorted(completed.items()):
+                self.on_result(i, result)
+        coroutines = (self.run_item(i, make_coroutine(item)) for i, item in enumerate(items) if i not in completed)
+        # gather the responses, add any exceptions to the list instead of raising
+        responses = iter(await asyncio.gather(*coroutines, return_exceptions=True))
+        return [completed[i] if i in completed else next(responses) for i in range(len(items))]
 
     async def fetch(self, session: aiohttp.ClientSession,
                     url: str, params: dict=None, headers: dict=None) -> Union[dict, list]:
@@ -141,12 +176,9 @@ class RequestCaller:
         # the session shouldn't be created outside of a coroutine so it needs to be here rather than in __init__
         # see also https://github.com/aio-libs/aiohttp/issues/2473
         async with aiohttp.ClientSession(headers=headers, raise_for_status=True) as session:
-            # create coroutines for fetching each url
-            coroutines = (self.fetch(session=session,
-                                         url=url.get('url'), params=url.get('params'), headers=url.get('headers'))
-                          for url in urls)
-            # gather the responses, add any exceptions to the list instead of raising
-            responses = await asyncio.gather(*coroutines, return_exceptions=True)
+            # fetch each url and gather the responses
+            responses = await self.gather(urls, lambda url: self.fetch(
+                session=session, url=url.get('url'), params=url.get('params'), headers=url.get('headers')))
         print('get took {:.2f} seconds'.format(time.time() - start))
         return responses
 
@@ -173,11 +205,23 @@ class RequestCaller:
         return result
 
     async def call_insert(self, session: aiohttp.ClientSession,
-                          url: str, data: list, headers: dict=None) -> list:
-        """Unpack the data list and insert each data dict into the url"""
-        coros = (self.insert(session=session, url=url, data=d, headers=headers) for d in data)
-        responses = await asyncio.gather(*coros, return_exceptions=True)
-        return responses
+                          url: str, data: list, headers: dict=None, index: int=None) -> list:
+        """Unpack the data list and insert each data dict into the url.
+
+        With a journal, each insert that succeeds is recorded as a part of the item at index: inserts aren't
+        idempotent, so when the run is resumed after some inserts of the item failed, only those are posted again."""
+        journal = self.journal if index is not None else None
+        done = journal.parts.get(index, {}) if journal else {}
+
+        async def insert(part: int, d: dict) -> dict:
+            result = await self.insert(session=session, url=url, data=d, headers=headers)
+            if journal:
+                journal.record_part(index, part, result)
+            return result
+
+        coros = (insert(part, d) for part, d in enumerate(data) if part not in done)
+        responses = iter(await asyncio.gather(*coros, return_exceptions=True))
+        return [done[part] if part in done else next(responses) for part in range(len(data))]
 
     async def post(self, items: list, headers: dict=None) -> list:
         """This coroutine inserts the given data for each url and returns the response bodies of each request.
@@ -189,21 +233,19 @@ class RequestCaller:
         For each dictonary, a list with response bodies is returned.
         """
         urls = []
-        for item in items:
+        for index, item in enumerate(items):
             # assuming item is a dictionary
             url = item.get('url')
-            urls.append(dict(url=url, data=item.get('data', []), headers=item.get('headers')))
+            urls.append(dict(url=url, data=item.get('data', []), headers=item.get('headers'), index=index))
 
         start = time.time()
         # the session shouldn't be created outside of a coroutine so it needs to be here rather than in __init__
         # see also https://github.com/aio-libs/aiohttp/issues/2473
         async with aiohttp.ClientSession(headers=headers, raise_for_status=True) as session:
-            # create coroutines for each url
-            coroutines = (self.call_insert(session=session,
-                                           url=url.get('url'), data=url.get('data'), headers=url.get('headers'))
-                          for url in urls)
-            # gather the responses, add any exceptions to the list instead of raising
-            responses = await asyncio.gather(*coroutines, return_exceptions=True)
+            # insert the data for each url and gather the responses
+            responses = await self.gather(urls, lambda url: self.call_insert(
+                session=session, url=url.get('url'), data=url.get('data'), headers=url.get('headers'),
+                index=url.get('index')))
         print('post {:.2f} seconds'.format(time.time() - start))
         return responses
 
@@ -231,16 +273,163 @@ class RequestCaller:
         # the session shouldn't be created outside of a coroutine so it needs to be here rather than in __init__
         # see also https://github.com/aio-libs/aiohttp/issues/2473
         async with aiohttp.ClientSession(headers=headers, raise_for_status=True) as session:
-            # create coroutines for each url
-            coroutines = (self.delete_url(session=session, url=url) for url in urls)
-            # gather the responses, add any exceptions to the list instead of raising
-            responses = await asyncio.gather(*coroutines, return_exceptions=True)
+            # delete each url and gather the responses
+            responses = await self.gather(urls, lambda url: self.delete_url(session=session, url=url))
         print('delete took {:.2f} seconds'.format(time.time() - start))
         return responses
 
+    async def list_page(self, session: aiohttp.ClientSession, url: str, params: dict, queue: asyncio.Queue,
+                        seen: set) -> int:
+        """Fetch a single page of the listing at url and put every _href_ not seen before on the queue.
+        Return the number of items on the page."""
+        start = time.time()
+        try:
+            async with self.semaphore, session.get(url=url, params=params, timeout=TIMEOUT) as response:
+                data = await response.json()
+        except asyncio.TimeoutError as te:
+            te.args += (f'timeout on resource: {url}',)
+            print(f'timeout on listing {url}: {te}')
+            raise
+        except Exception as e:
+            e.args += (f'resource: {url}',)
+            print(f'something went wrong listing {url}: {e}')
+            raise
+        print('listing {} at offset {} took {:.2f} seconds'.format(url, params.get('offset'), time.time() - start))
+        for item in data:
+            href = item.get('_href_')
+            if href and href not in seen:
+                seen.add(href)
+                await queue.put(href)
+        return len(data)
+
+    async def list_pages(self, session: aiohttp.ClientSession, url: str, params: dict, queue: asyncio.Queue,
+                         seen: set) -> int:
+        """Page through the listing at url, PAGE_CONCURRENCY pages at a time, and put the _href_ of each item on the
+        queue as soon as its page comes in. Return the number of new urls put on the queue."""
+        n_seen = len(seen)
+        limit = int(params.get('limit', BATCH_LIMIT))
+        if limit == -1:
+            limit = BATCH_LIMIT
+        offset = int(params.get('offset', OFFSET))
+        while True:
+            pages = [asyncio.ensure_future(self.list_page(session=session, url=url,
+                                                          params=dict(params, offset=offset + i * limit, limit=limit),
+                                                          queue=queue, seen=seen))
+                     for i in range(PAGE_CONCURRENCY)]
+            try:
+                sizes = await asyncio.gather(*pages)
+            except BaseException:
+                # stop the other pages, so they don't put urls on the queue (or use the session) after the workers
+                # were told to stop
+                for page in pages:
+                    page.cancel()
+                await asyncio.gather(*pages, return_exceptions=True)
+                raise
+            # a page that isn't full means the end of the listing has been reached
+            if min(sizes) < limit:
+                break
+            offset += PAGE_CONCURRENCY * limit
+        return len(seen) - n_seen
+
+    async def delete_worker(self, session: aiohttp.ClientSession, url: str, queue: asyncio.Queue,
+                            batch_size: int=None) -> list:
+        """Take urls off the queue and delete them until a None is found. Return the list of responses.
+
+        If batch_size is given, up to batch_size urls are taken off the queue at once and deleted in a single request:
+        a DELETE on the listing url with the list of urls as the body. This only works if the api supports it."""
+        responses = []
+        while True:
+            href = await queue.get()
+            if href is None:
+                queue.task_done()
+                return responses
+            if not batch_size:
+                try:
+                    responses.append(await self.delete_url(session=session, url=href))
+                except Exception as e:
+                    responses.append(e)
+                queue.task_done()
+                continue
+            hrefs = [href]
+            # don't wait for a full batch: take whatever is on the queue right now, up to the first None
+            while len(hrefs) < batch_size and not queue.empty():
+                next_href = queue.get_nowait()
+                if next_href is None:
+                    # a None means stop, put it back to be handled in the next iteration (by this or another worker)
+                    queue.put_nowait(None)
+                    queue.task_done()
+                    break
+                hrefs.append(next_href)
+            try:
+                responses.append(await self.delete_batch(session=session, url=url, hrefs=hrefs))
+            except Exception as e:
+                responses.append(e)
+            for _ in hrefs:
+                queue.task_done()
+
+    async def delete_batch(self, session: aiohttp.ClientSession, url: str, hrefs: list) -> dict:
+        """Delete all hrefs in a single request with the list of hrefs as the (json) body"""
+        start = time.time()
+        try:
+            async with self.semaphore, session.delete(url=url, json=hrefs, timeout=TIMEOUT) as response:
+                result = await response.json()
+        except asyncio.TimeoutError as te:
+            te.args += (f'timeout on resource: {url}',)
+            print(f'timeout on batch deleting {len(hrefs)} items from {url}: {te}')
+            raise
+        except Exception as e:
+            e.args += (f'resource: {url}',)
+            print(f'something went wrong batch deleting {len(hrefs)} items from {url}: {e}')
+            raise
+        print('delete_batch of {} items took {:.2f} seconds'.format(len(hrefs), time.time() - start))
+        return result
+
+    async def delete_where(self, url: str, params: dict=None, headers: dict=None, batch_size: int=None) -> list:
+        """Delete all items found in the listing at url (filtered by params) and return the delete responses.
+
+        Listing and deleting run in one pipeline: the listing is paged through PAGE_CONCURRENCY pages at a time and
+        the _href_ of each item is fed to the delete workers as soon as its page comes in, so deletion starts while
+        later pages are still loading. Deleting items shifts the offsets of the remaining ones, so the listing is
+        repeated until it turns up no new items."""
+        start = time.time()
+        params = dict(params or {})
+        queue = asyncio.Queue()
+        seen = set()
+        # the session shouldn't be created outside of a coroutine so it needs to be here rather than in __init__
+        # see also https://github.com/aio-libs/aiohttp/issues/2473
+        async with aiohttp.ClientSession(headers=headers, raise_for_status=True) as session:
+            workers = [asyncio.ensure_future(self.delete_worker(session=session, url=url, queue=queue,
+                                                                batch_size=batch_size))
+                       for _ in range(DELETE_WORKERS)]
+            try:
+                while await self.list_pages(session=session, url=url, params=params, queue=queue, seen=seen):
+                    # let the workers finish before listing again, to see what is left
+                    await queue.join()
+            finally:
+                for _ in workers:
+                    queue.put_nowait(None)
+                responses = await asyncio.gather(*workers)
+        print('delete_where took {:.2f} seconds'.format(time.time() - start))
+        return [r for worker_responses in responses for r in worker_responses]
+
+
+def has_exception(result) -> bool:
+    """Return True if the result is an exception or a list containing exceptions (at any depth)"""
+    if isinstance(result, BaseException):
+        return True
+    if isinstance(result, list):
+        return any(has_exception(r) for r in result)
+    return False
+
+
+def main_caller(items: list, headers: dict={}, method: str= 'get', journal: str=None, on_result: Callable=None):
+    """Set up event loop, run specific request caller with the list of items, close event loop
 
-def main_caller(items: list, headers: dict={}, method: str= 'get'):
-    """Set up event loop, run specific request caller with the list of items, close event loop"""
+    If a journal filename is given, completed items are recorded in that file as they finish. Calling again with the
+    same items and journal resumes the run: only the items that didn't complete are requested.
+
+    If on_result is given, on_result(index, result) is called for each item as soon as its result is in, so results
+    can be processed while the run goes on, rather than only when all of them are done."""
     # stop if method unknown
     if method not in 'get post delete'.split():
         print(f'method {method} not supported')
@@ -252,7 +441,8 @@ def main_caller(items: list, headers: dict={}, method: str= 'get'):
     # want to restart the interpreter between calls to parallel.my_method
     asyncio.set_event_loop(asyncio.new_event_loop())
     loop = asyncio.get_event_loop()
-    request_caller = RequestCaller(headers)
+    journal = Journal(journal, items, method.lower()) if journal else None
+    request_caller = RequestCaller(headers, journal, on_result)
     if method.lower() == "get":
         future = request_caller.get(items, headers)
     elif method.lower() == 'post':
@@ -262,10 +452,25 @@ def main_caller(items: list, headers: dict={}, method: str= 'get'):
     else:
         return []
 
-    result = loop.run_until_complete(future)
+    try:
+        result = loop.run_until_complete(future)
+    finally:
+        if journal:
+            journal.close()
+    loop.close()
+    return result
+
+
+def delete_where(url: str, params: dict=None, headers: dict={}, batch_size: int=None) -> list:
+    """Set up event loop, delete all items in the listing at url that match params, close event loop"""
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    loop = asyncio.get_event_loop()
+    request_caller = RequestCaller(headers)
+    result = loop.run_until_complete(request_caller.delete_where(url, params, headers, batch_size))
     loop.close()
     return result
 
+
 # call the main caller with the appropriate method
 get = partial(main_caller, method='get')
 post = partial(main_caller, method='post')
@@ -0,0 +1,145 @@
+import asyncio
+import unittest
+
+import aiohttp
+from aiohttp import web
+
+from parallel_requests import parallel
+from parallel_requests.parallel import RequestCaller
+
+
+class StubListing:
+    """Stub of a yourapi listing at /student, on a local port: GET pages through the students that are left (offset,
+    limit), DELETE /student/<id> deletes one and DELETE /student with a json list of urls deletes those.
+
+    Listing pages take list_delay seconds (or the delay of their offset in page_delays), so deletes of earlier pages
+    come in first and shift the offsets, deletes take delete_delay seconds. A listing at an offset in fail_offsets gets
+    a 500."""
+
+    def __init__(self, number_of_students: int, list_delay: float=0.01, delete_delay: float=0.0,
+                 fail_offsets: set=frozenset(), page_delays: dict=None):
+        self.students = list(range(number_of_students))
+        self.list_delay = list_delay
+        self.page_delays = page_delays or {}
+        self.delete_delay = delete_delay
+        self.fail_offsets = fail_offsets
+        self.listed_offsets = []
+        self.deletes = 0
+        self.batches = []
+        app = web.Application()
+        app.router.add_get('/student', self.list_students)
+        app.router.add_delete('/student', self.delete_students)
+        app.router.add_delete('/student/{id}', self.delete_student)
+        self.runner = web.AppRunner(app)
+        self.url = None
+
+    async def start(self):
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        self.url = 'http://127.0.0.1:{}/student'.format(site._server.sockets[0].getsockname()[1])
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    def href(self, student: int) -> str:
+        return f'{self.url}/{student}'
+
+    async def list_students(self, request: web.Request) -> web.Response:
+        offset, limit = int(request.query['offset']), int(request.query['limit'])
+        self.listed_offsets.append(offset)
+        await asyncio.sleep(self.page_delays.get(offset, self.list_delay))
+        if offset in self.fail_offsets:
+            raise web.HTTPInternalServerError()
+        return web.json_response([{'_href_': self.href(s)} for s in self.students[offset:offset + limit]])
+
+    def remove(self, href: str):
+        student = int(href.rsplit('/', 1)[1])
+        if student in self.students:
+            self.students.remove(student)
+
+    async def delete_student(self, request: web.Request) -> web.Response:
+        self.deletes += 1
+        await asyncio.sleep(self.delete_delay)
+        self.remove(str(request.url))
+        return web.json_response({'deleted': str(request.url)})
+
+    async def delete_students(self, request: web.Request) -> web.Response:
+        hrefs = await request.json()
+        self.batches.append(hrefs)
+        await asyncio.sleep(self.delete_delay)
+        for href in hrefs:
+            self.remove(href)
+        return web.json_response({'deleted': len(hrefs)})
+
+
+class TestDeleteWhere(unittest.TestCase):
+
+    def setUp(self):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        self.loop = asyncio.get_event_loop()
+        self.page_concurrency, self.delete_workers = parallel.PAGE_CONCURRENCY, parallel.DELETE_WORKERS
+        parallel.PAGE_CONCURRENCY = 3
+
+    def delete_where(self, stub: StubListing, **kwargs) -> list:
+        """Run delete_where on the stub's listing, fail rather than hang if it doesn't finish"""
+
+        async def run() -> list:
+            await stub.start()
+            try:
+                return await asyncio.wait_for(RequestCaller().delete_where(stub.url, **kwargs), 10)
+            finally:
+                await stub.stop()
+
+        return self.loop.run_until_complete(run())
+
+    def test_all_items_are_deleted_one_by_one(self):
+        stub = StubListing(10)
+        responses = self.delete_where(stub, params={'limit': 4})
+        self.assertEqual([], stub.students)
+        self.assertEqual(10, stub.deletes)
+        self.assertEqual(10, len(responses))
+
+    def test_listing_is_repeated_to_find_the_items_skipped_by_shifted_offsets(self):
+        # the first 3 pages (12 students) are deleted before the next 3 are listed, so those skip 12 students
+        stub = StubListing(40)
+        self.delete_where(stub, params={'limit': 4})
+        self.assertEqual([], stub.students)
+        self.assertGreater(stub.listed_offsets.count(0), 1)
+
+    def test_items_are_deleted_in_batches(self):
+        stub = StubListing(30)
+        responses = self.delete_where(stub, params={'limit': 10}, batch_size=5)
+        self.assertEqual([], stub.students)
+        self.assertTrue(all(len(batch) <= 5 for batch in stub.batches))
+        self.assertEqual(30, sum(r['deleted'] for r in responses))
+
+    def test_failed_listing_raises_after_the_workers_stopped(self):
+        # the second round of listing fails while both workers are still deleting the first one, so the sentinels for
+        # the workers are queued behind the urls of the pages that did come in
+        parallel.DELETE_WORKERS = 2
+        for batch_size in (None, 10):
+            with self.subTest(batch_size=batch_size):
+                stub = StubListing(40, delete_delay=0.1, fail_offsets={16})
+                with self.assertRaises(aiohttp.ClientResponseError):
+                    self.delete_where(stub, params={'limit': 4}, batch_size=batch_size)
+
+    def test_failed_listing_stops_the_other_pages(self):
+        # the first page fails while the second one is still loading
+        stub = StubListing(40, fail_offsets={0}, page_delays={4: 0.5})
+
+        async def run() -> list:
+            await stub.start()
+            try:
+                with self.assertRaises(aiohttp.ClientResponseError):
+                    await RequestCaller().delete_where(stub.url, params={'limit': 4})
+                return [task for task in asyncio.all_tasks()
+                        if task.get_coro().__qualname__ == 'RequestCaller.list_page' and not task.done()]
+            finally:
+                await stub.stop()
+
+        self.assertEqual([], self.loop.run_until_complete(run()))
+
+    def tearDown(self):
+        parallel.PAGE_CONCURRENCY, parallel.DELETE_WORKERS = self.page_concurrency, self.delete_workers
+        self.loop.close()
@@ -0,0 +1,109 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from parallel_requests.journal import Journal
+from parallel_requests.parallel import RequestCaller
+
+ITEMS = [f'https://api.example.com/student/{i}' for i in range(6)]
+
+
+class TestJournal(unittest.TestCase):
+    """Run RequestCaller.gather with a journal and a fake request function instead of the network"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'journal.jsonl')
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        self.loop = asyncio.get_event_loop()
+        self.requested = []
+
+    def gather(self, items: list, failing: set=frozenset(), on_result=None) -> list:
+        """Return the results of the fake request on each item, with the journal file, the items in failing raise"""
+
+        async def fake_request(item: str) -> dict:
+            self.requested.append(item)
+            await asyncio.sleep(0)
+            if item in failing:
+                raise ValueError(f'resource: {item}')
+            return {'url': item}
+
+        journal = Journal(self.filename, items, 'post')
+        try:
+            return self.loop.run_until_complete(RequestCaller(journal=journal, on_result=on_result).gather(
+                items, fake_request))
+        finally:
+            journal.close()
+
+    def post(self, items: list, failing: set=frozenset()) -> list:
+        """Return the results of post with a fake insert instead of the network, with the journal file, the inserts
+        of the data in failing raise"""
+        requested = self.requested
+
+        class FakeInsertCaller(RequestCaller):
+
+            async def insert(self, session, url: str, data: dict=None, headers: dict=None) -> dict:
+                requested.append((url, data['id']))
+                await asyncio.sleep(0)
+                if data['id'] in failing:
+                    raise ValueError(f'resource: {url}')
+                return dict(data, url=url)
+
+        journal = Journal(self.filename, items, 'post')
+        try:
+            return self.loop.run_until_complete(FakeInsertCaller(journal=journal).post(items))
+        finally:
+            journal.close()
+
+    def test_resumed_post_only_posts_the_inserts_that_failed(self):
+        items = [{'url': ITEMS[0], 'data': [{'id': i} for i in range(3)]},
+                 {'url': ITEMS[1], 'data': [{'id': 3}, {'id': 4}]}]
+        # no item completes, each has an insert that fails
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = self.post(items, failing={1, 4})
+            self.assertIsInstance(results[0][1], ValueError)
+            self.requested.clear()
+            results = self.post(items)
+        self.assertEqual([(ITEMS[0], 1), (ITEMS[1], 4)], self.requested)
+        self.assertEqual([[dict(id=i, url=ITEMS[0]) for i in range(3)], [dict(id=i, url=ITEMS[1]) for i in (3, 4)]],
+                         results)
+
+    def test_resumed_run_only_requests_the_items_that_did_not_complete(self):
+        results = self.gather(ITEMS, failing={ITEMS[1], ITEMS[4]})
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual({'url': ITEMS[0]}, results[0])
+        self.requested = []
+        results = self.gather(ITEMS)
+        self.assertEqual([ITEMS[1], ITEMS[4]], self.requested)
+        self.assertEqual([{'url': item} for item in ITEMS], results)
+
+    def test_failed_results_are_not_journaled(self):
+        self.gather(ITEMS, failing={ITEMS[2]})
+        with open(self.filename) as f:
+            entries = [json.loads(line) for line in f][1:]
+        self.assertEqual([0, 1, 3, 4, 5], sorted(entry['index'] for entry in entries))
+
+    def test_journal_of_other_items_is_started_over(self):
+        self.gather(ITEMS)
+        journal = Journal(self.filename, ITEMS[:3], 'post')
+        journal.close()
+        self.assertEqual({}, journal.completed)
+        self.requested = []
+        self.gather(ITEMS)
+        self.assertEqual(ITEMS, sorted(self.requested))
+
+    def test_results_are_streamed_as_they_come_in(self):
+        self.gather(ITEMS, failing={ITEMS[3]})
+        streamed = []
+        self.gather(ITEMS, on_result=lambda index, result: streamed.append((index, result)))
+        # the journaled items first, then the one that is requested again
+        self.assertEqual([i for i in range(6) if i != 3] + [3], [index for index, _ in streamed])
+        self.assertEqual({'url': ITEMS[3]}, streamed[-1][1])
+
+    def tearDown(self):
+        self.loop.close()
+        self.directory.cleanup()
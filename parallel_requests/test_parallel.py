@@ -43,6 +43,12 @@ if __name__ == '__main__':
     # print('deleting 1000+ records from students took {:.2f} seconds'.format(time.time() - start))
     # sys.exit()
 
+    # ## pipelined parallel delete: page through the listing and delete while later pages are still loading
+    # start = time.time()
+    # parallel.delete_where('https://demo.yourapi.io/playground/dynamic/student', params={'limit': 100})
+    # print('listing and deleting all students in one pipeline took {:.2f} seconds'.format(time.time() - start))
+    # sys.exit()
+
     # ## parallel insert
     # domain = 'static'
     #
@@ -0,0 +1,144 @@
+import asyncio
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from typing import Callable, List
+
+import aiohttp
+import mwparserfromhell
+
+import word_count_v1
+from word_count_async import word_count as word_count_async
+from word_count_async.counting import TRANSLATION_TABLE as ASYNC_TRANSLATION_TABLE
+from word_count_async.standin import StandInServer, make_fixtures, load_fixtures, save_fixtures, normalize_title
+
+
+def record_fixtures(titles: List[str], filename: str):
+    """Fetch the pages with the given titles from Wikipedia and save them as fixtures for the stand-in server"""
+    revids = {}
+    pages = {}
+    with word_count_v1.get_session() as session:
+        for batch in word_count_v1.split_in_batches(titles):
+            for title, wikitext in word_count_v1.fetch_wiki_pages(batch, session, revids).items():
+                if wikitext:
+                    pages[normalize_title(title)] = dict(revid=revids.get(title), wikitext=wikitext)
+    save_fixtures(pages, filename)
+
+
+def summarize(times: List[float]) -> dict:
+    """Return the mean, standard deviation and percentiles of the times in seconds"""
+    ordered = sorted(times)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))]
+
+    return dict(mean=statistics.mean(times), stdev=statistics.stdev(times) if len(times) > 1 else 0.0,
+                min=ordered[0], p50=percentile(50), p90=percentile(90), p99=percentile(99), max=ordered[-1],
+                runs=len(times))
+
+
+def measure(fn: Callable, iterations: int) -> dict:
+    """Time fn iterations times and run it once more to find its peak memory use (Python allocations only,
+    worker processes are not included)"""
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return dict(seconds=summarize(times), peak_memory_bytes=peak)
+
+
+def fetch_v1(titles: List[str]) -> dict:
+    with word_count_v1.get_session() as session, ThreadPoolExecutor(word_count_v1.WORKERS) as executor:
+        batches = executor.map(lambda batch: word_count_v1.fetch_wiki_pages(batch, session),
+                               word_count_v1.split_in_batches(titles))
+        return {title: wikitext for batch in batches for title, wikitext in batch.items()}
+
+
+def fetch_async(titles: List[str]) -> dict:
+    async def gather_batches():
+        limiter = word_count_async.RateLimiter(word_count_async.CONCURRENCY, None)
+        async with aiohttp.ClientSession(raise_for_status=True) as session:
+            return await asyncio.gather(*(word_count_async.get_wikipedia_pages_batch(session, batch, limiter)
+                                          for batch in word_count_async.split_in_batches(titles)))
+
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    loop = asyncio.get_event_loop()
+    batches = loop.run_until_complete(gather_batches())
+    loop.close()
+    return {title: wikitext for batch in batches for title, wikitext in batch.items()}
+
+
+def benchmark_stages(fetch: Callable, titles: List[str], translation_table: dict, iterations: int) -> dict:
+    """Time the fetch, parse, tokenize and count stages of word count separately, each on the output of the
+    previous one"""
+    wikitexts = fetch(titles)
+    texts = [mwparserfromhell.parse(w).strip_code(collapse=False) for w in wikitexts.values()]
+    tokens = [text.lower().translate(translation_table).split() for text in texts]
+    return dict(
+        fetch=measure(lambda: fetch(titles), iterations),
+        parse=measure(lambda: [mwparserfromhell.parse(w).strip_code(collapse=False) for w in wikitexts.values()],
+                      iterations),
+        tokenize=measure(lambda: [text.lower().translate(translation_table).split() for text in texts], iterations),
+        count=measure(lambda: [Counter(t) for t in tokens], iterations),
+    )
+
+
+def benchmark(fixtures: dict, top: int=10, iterations: int=5, latency: float=0.0) -> dict:
+    """Run v1 and async word count against a stand-in server serving the fixtures and return the timings and peak
+    memory per version, end to end (total) and per stage"""
+    titles = list(fixtures) + ['there is no page with this title']
+    with StandInServer(fixtures, latency) as server:
+        # point both versions to the stand-in server
+        api_urls = word_count_v1.API_URL, word_count_async.API_URL
+        word_count_v1.API_URL = word_count_async.API_URL = server.url
+        try:
+            results = {
+                'v1': dict(total=measure(lambda: word_count_v1.get_most_common_words(titles, top), iterations),
+                           **benchmark_stages(fetch_v1, titles, word_count_v1.TRANSLATION_TABLE, iterations)),
+                'async': dict(total=measure(lambda: word_count_async.get_most_common_words(titles, top, rate=None),
+                                            iterations),
+                              **benchmark_stages(fetch_async, titles, ASYNC_TRANSLATION_TABLE, iterations)),
+            }
+        finally:
+            word_count_v1.API_URL, word_count_async.API_URL = api_urls
+    return dict(
+        settings=dict(pages=len(fixtures), words=sum(len(f['wikitext'].split()) for f in fixtures.values()),
+                      top=top, iterations=iterations, latency=latency),
+        platform=dict(python=platform.python_version(), machine=platform.machine()),
+        results=results,
+    )
+
+
+if __name__ == '__main__':
+    # record fixtures once with record_fixtures(titles, fixtures_filename) to benchmark on real pages,
+    # without a fixtures file a fixed set of pages is generated
+    fixtures_filename = None
+    results_filename = './benchmark_results.json'
+    top = 10
+    iterations = 3
+    latency = 0.05  # seconds per request
+
+    if fixtures_filename:
+        fixtures = load_fixtures(fixtures_filename)
+    else:
+        fixtures = make_fixtures(number_of_pages=50, words_per_page=1000)
+    report = benchmark(fixtures, top, iterations, latency)
+    with open(results_filename, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print('\n===============\nRESULTS (mean seconds, peak memory MB)')
+    for version, stages in report['results'].items():
+        print(version)
+        for stage, result in stages.items():
+            print('  {:<9} {:.3f}s  {:.1f}MB'.format(stage, result['seconds']['mean'],
+                                                   result['peak_memory_bytes'] / 1024 ** 2))
+    print(f'written to {results_filename}')
@@ -0,0 +1,107 @@
+import asyncio
+from collections import Counter
+import json
+import os
+import time
+from typing import Dict, List, Tuple
+
+import aiohttp
+
+from compare_word_count_versions import get_random_titles
+from word_count_async import word_count
+from word_count_async.backends import BACKENDS, DEFAULT_BACKEND, SOURCES, to_text
+from word_count_async.counting import count_words
+
+
+def fetch_sources(titles: List[str], concurrency: int=word_count.CONCURRENCY) -> Tuple[dict, dict]:
+    """Fetch the wikitext, html and extract of each page and return a dict of source: {title: content} and a dict of
+    source: seconds it took to fetch all pages. Wikitext is fetched in batches, the others one page per request."""
+
+    async def fetch(source: str) -> dict:
+        limiter = word_count.RateLimiter(concurrency, word_count.RATE_LIMIT)
+        async with aiohttp.ClientSession(raise_for_status=True) as session:
+            if source == 'wikitext':
+                batches = await asyncio.gather(*(word_count.get_wikipedia_pages_batch(session, batch, limiter)
+                                                 for batch in word_count.split_in_batches(titles)))
+                return {title: content for batch in batches for title, content in batch.items()}
+            contents = await asyncio.gather(*(word_count.FETCHERS[source](session, title, limiter)
+                                              for title in titles))
+            return dict(zip(titles, contents))
+
+    sources = {}
+    fetch_times = {}
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    loop = asyncio.get_event_loop()
+    for source in SOURCES:
+        start = time.perf_counter()
+        sources[source] = loop.run_until_complete(fetch(source))
+        fetch_times[source] = time.perf_counter() - start
+    loop.run_until_complete(asyncio.sleep(word_count.WAIT_FOR_CONNECTION_CLOSE))
+    loop.close()
+    return sources, fetch_times
+
+
+def benchmark_backends(sources: dict, iterations: int=5) -> Dict[str, List[float]]:
+    """Return a dict of backend name: list of times in seconds it took to turn all pages of its source into text"""
+    results = {}
+    for name, (source, _) in BACKENDS.items():
+        times = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            for content in sources[source].values():
+                to_text(content, name)
+            times.append(time.perf_counter() - start)
+        results[name] = times
+    return results
+
+
+def compare_counts(cntr: Counter, reference: Counter, top: int=100) -> dict:
+    """Return how well the word counts match the reference counts: the share of the reference words that were counted
+    (recall), the share of the counted words that are in the reference (precision), and the share of the top most
+    common reference words that are among the top most common counted words"""
+    matching = sum((cntr & reference).values())
+    top_words = {w for w, _ in cntr.most_common(top)}
+    reference_top_words = {w for w, _ in reference.most_common(top)}
+    return dict(recall=matching / max(sum(reference.values()), 1), precision=matching / max(sum(cntr.values()), 1),
+                top_overlap=len(top_words & reference_top_words) / max(len(reference_top_words), 1))
+
+
+def accuracy_of_backends(sources: dict, reference: str=DEFAULT_BACKEND, top: int=100) -> Dict[str, dict]:
+    """Return a dict of backend name: how well the word counts of all pages match those of the reference backend"""
+
+    def count_all(name: str) -> Counter:
+        source, _ = BACKENDS[name]
+        cntr = Counter()
+        for content in sources[source].values():
+            cntr.update(count_words(to_text(content, name)))
+        return cntr
+
+    reference_cntr = count_all(reference)
+    return {name: compare_counts(count_all(name), reference_cntr, top) for name in BACKENDS}
+
+
+if __name__ == '__main__':
+    number_of_titles = 50
+    iterations = 5
+    reference = DEFAULT_BACKEND
+    # fetch the pages once and save them to compare backends on the same pages later, without network
+    sources_filename = None
+
+    if sources_filename and os.path.exists(sources_filename):
+        with open(sources_filename, encoding='utf-8') as f:
+            sources, fetch_times = json.load(f), {}
+    else:
+        sources, fetch_times = fetch_sources(get_random_titles(number_of_titles))
+        if sources_filename:
+            with open(sources_filename, 'w', encoding='utf-8') as f:
+                json.dump(sources, f)
+    results = benchmark_backends(sources, iterations)
+    accuracy = accuracy_of_backends(sources, reference)
+
+    print(f'\n===============\nRESULTS\npages: {len(sources["wikitext"])}, iterations: {iterations}')
+    for source, seconds in fetch_times.items():
+        print('fetch {:<8} {:.2f}s'.format(source, seconds))
+    print(f'word counts compared to {reference}')
+    for name, times in results.items():
+        print('{:<16} best {:.3f}s, mean {:.3f}s, recall {recall:.1%}, precision {precision:.1%}, '
+              'top 100 overlap {top_overlap:.0%}'.format(name, min(times), sum(times) / len(times), **accuracy[name]))
@@ -0,0 +1,59 @@
+from word_count_async.counting import COUNTERS, count_words
+import random
+from string import ascii_lowercase
+import time
+from typing import Dict, List
+
+VOCABULARY_SIZE = 20000
+PUNCTUATION = ['', '', '', '', ',', '.', '(', ')', ':', "'s", '-']
+# letters and punctuation of non-English text, to benchmark on non-ascii words
+NON_ASCII_LETTERS = ('abcdefghijklmnopqrstuvwxyzäöüßéèêçñåøœ'
+                     + 'αβγδεζηθικλμνξοπρστυφχψω'
+                     + 'абвгдежзийклмнопрстуфхцчшщыэюя')
+NON_ASCII_PUNCTUATION = PUNCTUATION + ['«', '»', '—', '’', '„', '“', '。', '·']
+
+
+def make_corpus(number_of_words: int=1000000, seed: int=42, letters: str=ascii_lowercase,
+                punctuation: List[str]=PUNCTUATION) -> str:
+    """Return a fixed text of the given number of words, the same for the same seed, so benchmarks are reproducible
+    without fetching any pages. Word frequencies follow Zipf's law, like in natural language."""
+    rnd = random.Random(seed)
+    vocabulary = [''.join(rnd.choice(letters) for _ in range(rnd.randint(1, 12))) for _ in range(VOCABULARY_SIZE)]
+    weights = [1 / rank for rank in range(1, VOCABULARY_SIZE + 1)]
+    words = rnd.choices(vocabulary, weights=weights, k=number_of_words)
+    # add some capitals and punctuation for the counters to deal with
+    return ' '.join((w.capitalize() if rnd.random() < .1 else w) + rnd.choice(punctuation) for w in words)
+
+
+def benchmark_counters(text: str, counters: List[str]=None, iterations: int=5) -> Dict[str, List[float]]:
+    """Return a dict of counter name: list of times in seconds it took to count the words in the text"""
+    results = {}
+    for name in counters or COUNTERS:
+        try:
+            count_words(text[:1000], name)
+        except ImportError as e:
+            print(f'skipping {name}: {e}')
+            continue
+        times = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            count_words(text, name)
+            times.append(time.perf_counter() - start)
+        results[name] = times
+    return results
+
+
+if __name__ == '__main__':
+    number_of_words = 1000000
+    iterations = 5
+
+    corpora = {'ascii': make_corpus(number_of_words),
+               'non-ascii': make_corpus(number_of_words, letters=NON_ASCII_LETTERS, punctuation=NON_ASCII_PUNCTUATION)}
+    for corpus_name, corpus in corpora.items():
+        reference = count_words(corpus, 'loop')
+        results = benchmark_counters(corpus, iterations=iterations)
+
+        print(f'\n===============\nRESULTS {corpus_name}\nwords: {number_of_words}, iterations: {iterations}')
+        for name, times in results.items():
+            same = 'same counts as loop' if count_words(corpus, name) == reference else 'counts differ from loop'
+            print('{:<8} best {:.3f}s, mean {:.3f}s ({})'.format(name, min(times), sum(times) / len(times), same))
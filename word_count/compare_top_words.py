@@ -0,0 +1,53 @@
+from compare_counters import make_corpus
+from word_count_async.counting import count_words
+from word_count_async.topk import make_tally, TALLIES, EPSILON
+import time
+from typing import List
+
+
+def split_in_pages(text: str, words_per_page: int=2000) -> List[str]:
+    """Return the text split in pages of words_per_page words"""
+    words = text.split()
+    return [' '.join(words[i:i + words_per_page]) for i in range(0, len(words), words_per_page)]
+
+
+def compare_tallies(pages: List[str], top: int=10, epsilon: float=EPSILON) -> dict:
+    """Count the words per page, merge the counts into each tally and return a dict of tally name: report on its
+    accuracy compared to the exact counts, its size (number of counters) and the time it took to merge"""
+    page_counts = [count_words(page) for page in pages]
+    tallies = {}
+    for name in TALLIES:
+        tally = make_tally(name, top, epsilon)
+        start = time.perf_counter()
+        for cntr in page_counts:
+            tally.update(cntr)
+        tallies[name] = (tally, time.perf_counter() - start)
+
+    exact = tallies['exact'][0]
+    exact_top = exact.most_common(top)
+    reports = {}
+    for name, (tally, seconds) in tallies.items():
+        approx_top = tally.most_common(top)
+        errors = [abs(count - exact[word]) / exact[word] for word, count in approx_top]
+        reports[name] = {
+            'seconds': round(seconds, 3),
+            'counters': len(tally),
+            # fraction of the exact top words that the tally ranked in its top too
+            'recall': len({w for w, _ in exact_top} & {w for w, _ in approx_top}) / len(exact_top),
+            'same ranking': [w for w, _ in exact_top] == [w for w, _ in approx_top],
+            'max relative count error': round(max(errors), 5),
+        }
+    return reports
+
+
+if __name__ == '__main__':
+    number_of_words = 1000000
+    top = 10
+    epsilon = EPSILON
+
+    pages = split_in_pages(make_corpus(number_of_words))
+    reports = compare_tallies(pages, top, epsilon)
+
+    print(f'\n===============\nRESULTS\nwords: {number_of_words}, pages: {len(pages)}, top: {top}, epsilon: {epsilon}')
+    for name, report in reports.items():
+        print(f'{name:<13}', report)
@@ -1,5 +1,6 @@
 import requests
 from word_count_async.word_count import get_most_common_words as async_word_count, API_URL
+from word_count_async.cache import PageCache
 from word_count_v1 import get_most_common_words as word_count_v1
 from typing import List, Tuple
 import time
@@ -21,13 +22,16 @@ def add_special_titles(titles: List[str]) -> List[str]:
     return titles
 
 
-def benchmark_word_count(titles: List[str], top: int=10, iterations: int=10) -> Tuple[list, list]:
+def benchmark_word_count(titles: List[str], top: int=10, iterations: int=10,
+                         cache: PageCache=None) -> Tuple[list, list]:
+    """Time v1 and async word count on the titles. With a cache, pages are fetched and parsed only once, for the first
+    version in the first iteration, which leaves the counting to be compared."""
     results_v1 = []
     results_async = []
     for _ in range(iterations):
         print('start word count v1')
         start_v1 = time.time()
-        wrds_v1 = word_count_v1(titles, top)
+        wrds_v1 = word_count_v1(titles, top, cache=cache)
         end_v1 = time.time() - start_v1
         print('results of word count v1:', wrds_v1)
         print('\nword count v1 took {:.2f} seconds\n'.format(end_v1))
@@ -35,7 +39,7 @@ def benchmark_word_count(titles: List[str], top: int=10, iterations: int=10) ->
 
         print('start async word count')
         start_v2 = time.time()
-        wrds_async = async_word_count(titles, top)
+        wrds_async = async_word_count(titles, top, cache=cache)
         end_v2 = time.time() - start_v2
         print('results of async word count:', wrds_async)
         print('\nasync word count took {:.2f} seconds'.format(end_v2))
@@ -50,10 +54,12 @@ if __name__ == '__main__':
     number_of_titles = 100
     top = 10
     iterations = 1
+    use_cache = False
 
     titles = add_special_titles(get_random_titles(100))
 
-    times_v1, times_async = benchmark_word_count(titles, top, iterations)
+    cache = PageCache() if use_cache else None
+    times_v1, times_async = benchmark_word_count(titles, top, iterations, cache)
 
     print('\n===============\nRESULTS')
     print(f'top: {top}, iterations: {iterations}, titles: {titles}')
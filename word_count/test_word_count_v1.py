@@ -0,0 +1,72 @@
+import contextlib
+import io
+import unittest
+from . import word_count_v1
+from .word_count_async.standin import StandInServer, make_fixtures
+
+
+class TestWordCountV1(unittest.TestCase):
+    """Run v1 against the stand-in server instead of Wikipedia"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.fixtures = make_fixtures(number_of_pages=30, words_per_page=50)
+        cls.server = StandInServer(cls.fixtures, max_pages_per_response=20)
+        cls.server.start()
+        cls.titles = list(cls.fixtures)
+        cls.api_url, word_count_v1.API_URL = word_count_v1.API_URL, cls.server.url
+
+    def test_session_keeps_a_connection_open_for_every_worker(self):
+        with word_count_v1.get_session(workers=4) as session:
+            self.assertEqual(4, session.get_adapter(self.server.url)._pool_maxsize)
+            title = self.titles[0]
+            self.assertEqual(self.fixtures[title]['wikitext'], word_count_v1.fetch_wiki_page(title, session))
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.assertEqual('', word_count_v1.fetch_wiki_page('There is no such page', session))
+
+    def test_batch_is_continued_and_normalized_titles_are_mapped_back(self):
+        # lower case and underscores are normalized by the API, the contents come back under the normalized title
+        titles = ([self.titles[0].lower(), self.titles[1].replace(' ', '_')] + self.titles[2:]
+                  + ['There is no such page'])
+        revids = {}
+        requests = self.server.requests
+        with word_count_v1.get_session() as session:
+            pages = word_count_v1.fetch_wiki_pages(titles, session, revids)
+        # 30 pages, at most 20 per response
+        self.assertEqual(2, self.server.requests - requests)
+        self.assertEqual(titles, list(pages))
+        self.assertEqual(self.fixtures[self.titles[1]]['wikitext'], pages[titles[1]])
+        self.assertEqual([f['wikitext'] for f in self.fixtures.values()][2:], [pages[t] for t in self.titles[2:]])
+        self.assertEqual('', pages['There is no such page'])
+        # only the first letter is capitalized by normalizing, so the rest of the lower case title is another page
+        self.assertEqual('', pages[titles[0]])
+        self.assertEqual(self.fixtures[self.titles[1]]['revid'], revids[titles[1]])
+        self.assertNotIn('There is no such page', revids)
+
+    def test_titles_are_fetched_in_batches_by_the_thread_pool(self):
+        self.assertEqual([50, 50, 2], [len(b) for b in word_count_v1.split_in_batches(
+            [f'Title {i}' for i in range(102)] + ['', 'Title 1'])])
+        requests = self.server.requests
+        with contextlib.redirect_stdout(io.StringIO()):
+            word_count_v1.get_most_common_words(self.titles, workers=4)
+        self.assertEqual(2, self.server.requests - requests)
+
+    def test_pages_counted_one_by_one_give_the_counts_of_all_text_at_once(self):
+        text = '\n'.join(word_count_v1.strip_wikitext(f['wikitext']) for f in self.fixtures.values())
+        with contextlib.redirect_stdout(io.StringIO()):
+            ranking = word_count_v1.get_most_common_words(self.titles, top=None)
+        self.assertEqual(word_count_v1.count_words(text), dict(ranking))
+
+    def test_title_given_twice_is_fetched_once_and_counted_twice(self):
+        title = self.titles[0]
+        once = word_count_v1.count_words(word_count_v1.strip_wikitext(self.fixtures[title]['wikitext']))
+        requests = self.server.requests
+        with contextlib.redirect_stdout(io.StringIO()):
+            ranking = word_count_v1.get_most_common_words([title, 'There is no such page', title], top=None)
+        self.assertEqual(1, self.server.requests - requests)
+        self.assertEqual({word: 2 * count for word, count in once.items()}, dict(ranking))
+
+    @classmethod
+    def tearDownClass(cls):
+        word_count_v1.API_URL = cls.api_url
+        cls.server.stop()
@@ -0,0 +1,155 @@
+from html import unescape
+from html.parser import HTMLParser
+import re
+import mwparserfromhell
+
+try:
+    import lxml.html
+    from lxml.etree import XPath
+except ImportError:
+    # lxml is optional, without it the 'html' backend falls back to the (slower) html.parser of the standard library
+    lxml = None
+
+__all__ = ['to_text', 'BACKENDS', 'DEFAULT_BACKEND', 'SOURCES']
+
+# what a backend needs to be fetched from the API: the page wikitext, the rendered page html (action=parse) or the plain
+# text extract (prop=extracts)
+SOURCES = ['wikitext', 'html', 'extract']
+
+# wikitext patterns, compiled once
+COMMENT = re.compile(r'<!--.*?-->', re.S)
+# refs and other tags mwparserfromhell doesn't show the contents of
+INVISIBLE_TAGS = re.compile(r'<(ref|references|gallery|math|score|timeline|imagemap)\b[^>]*?(/>|>.*?</\1\s*>)',
+                            re.S | re.I)
+TEMPLATE = re.compile(r'\{\{[^{}]*\}\}')  # innermost template, nested ones are removed from the inside out
+WIKILINK = re.compile(r'\[\[(?:[^\[\]|]*\|)?([^\[\]]*)\]\]')  # innermost link, keep its text or else its target
+EXTERNAL_LINK = re.compile(r'\[(?:https?:)?//[^\s\]]*\s*([^\]]*)\]')
+HEADING = re.compile(r'^(=+)\s*(.*?)\s*\1\s*$', re.M)
+TABLE_MARKUP = re.compile(r'^\s*(\{\||\|\}|\|-|\|\+|[|!])|\|\||!!', re.M)
+BOLD_ITALIC = re.compile(r"'{2,}")
+TAG = re.compile(r'</?[a-zA-Z][^>]*>')
+MAGIC_WORD = re.compile(r'__[A-Z]+__')
+
+# html elements that aren't part of the article text
+SKIP_CLASSES = {'reference', 'mw-editsection', 'navbox', 'reflist', 'mw-references-wrap', 'noprint'}
+SKIP_TAGS = {'script', 'style'}
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+# html elements that start and end a block of text, the words on either side of them are separate words
+BLOCK_TAGS = {'address', 'blockquote', 'br', 'caption', 'dd', 'div', 'dl', 'dt', 'figcaption', 'figure', 'h1', 'h2',
+              'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'ol', 'p', 'pre', 'section', 'table', 'td', 'th', 'tr', 'ul'}
+BLOCK_SEPARATOR = '\n'
+if lxml:
+    SKIP_XPATH = XPath(' | '.join([f'//{tag}' for tag in SKIP_TAGS] +
+                                  [f'//*[contains(concat(" ", normalize-space(@class), " "), " {c} ")]'
+                                   for c in SKIP_CLASSES]))
+    BLOCK_XPATH = XPath(' | '.join(f'//{tag}' for tag in sorted(BLOCK_TAGS)))
+
+
+def strip_mwparserfromhell(wikitext: str) -> str:
+    """Parse the wikitext and strip the code. This is the original implementation."""
+    return mwparserfromhell.parse(wikitext).strip_code(collapse=False)
+
+
+def sub_innermost(pattern, repl: str, text: str) -> str:
+    """Substitute the pattern until it no longer matches, for markup that can be nested"""
+    count = 1
+    while count:
+        text, count = pattern.subn(repl, text)
+    return text
+
+
+def strip_regex(wikitext: str) -> str:
+    """Strip the wikitext with a few precompiled regexes, rather than parsing it.
+
+    Much faster than mwparserfromhell, but approximate: e.g. table cell attributes and unbalanced markup end up in the
+    text.
+    """
+    text = COMMENT.sub('', wikitext)
+    text = INVISIBLE_TAGS.sub('', text)
+    text = sub_innermost(TEMPLATE, '', text)
+    text = sub_innermost(WIKILINK, r'\1', text)
+    text = EXTERNAL_LINK.sub(r'\1', text)
+    text = HEADING.sub(r'\2', text)
+    text = TABLE_MARKUP.sub(' ', text)
+    text = BOLD_ITALIC.sub('', text)
+    text = TAG.sub('', text)
+    text = MAGIC_WORD.sub('', text)
+    return unescape(text)
+
+
+class TextExtractor(HTMLParser):
+    """Collect the text of an html document, skipping the elements that aren't part of the article text"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.text = []
+        self.skip_depth = 0  # depth of the open elements inside a skipped element
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BLOCK_TAGS and not self.skip_depth:
+            self.text.append(BLOCK_SEPARATOR)
+        if tag in VOID_TAGS:
+            return
+        if self.skip_depth:
+            self.skip_depth += 1
+        elif tag in SKIP_TAGS or SKIP_CLASSES.intersection((dict(attrs).get('class') or '').split()):
+            self.skip_depth = 1
+
+    def handle_endtag(self, tag):
+        if self.skip_depth and tag not in VOID_TAGS:
+            self.skip_depth -= 1
+        elif tag in BLOCK_TAGS:
+            self.text.append(BLOCK_SEPARATOR)
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.text.append(data)
+
+
+def html_to_text(html: str) -> str:
+    """Return the text contents of the rendered page html (action=parse), with a line break around each block (e.g. a
+    paragraph or heading). Uses lxml if it's installed."""
+    if lxml is None:
+        parser = TextExtractor()
+        parser.feed(html)
+        parser.close()
+        return ''.join(parser.text)
+    tree = lxml.html.fromstring(html)
+    for element in SKIP_XPATH(tree):
+        element.drop_tree()
+    # text_content joins the text of all elements, separate the blocks so their words don't run into each other
+    for element in BLOCK_XPATH(tree):
+        if element.tag not in VOID_TAGS:
+            element.text = BLOCK_SEPARATOR + (element.text or '')
+        element.tail = BLOCK_SEPARATOR + (element.tail or '')
+    return tree.text_content()
+
+
+def extract_to_text(extract: str) -> str:
+    """The extracts API already returns plain text"""
+    return extract
+
+
+# name: (source to fetch, function that returns the text of the source)
+BACKENDS = {
+    'mwparserfromhell': ('wikitext', strip_mwparserfromhell),
+    'regex': ('wikitext', strip_regex),
+    'html': ('html', html_to_text),
+    'extracts': ('extract', extract_to_text),
+}
+DEFAULT_BACKEND = 'mwparserfromhell'
+
+
+def get_backend(backend: str=DEFAULT_BACKEND) -> tuple:
+    """Return the source and text function of the backend with the given name"""
+    try:
+        return BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown backend '{backend}', choose one of {', '.join(BACKENDS)}")
+
+
+def to_text(content: str, backend: str=DEFAULT_BACKEND) -> str:
+    """Return the text contents of the page content (wikitext, html or extract, see get_backend) with the backend with
+    the given name"""
+    _, fn = get_backend(backend)
+    return fn(content) if content else ''
@@ -0,0 +1,113 @@
+import hashlib
+import sqlite3
+import time
+import zlib
+from typing import Dict, List, Optional
+
+__all__ = ['PageCache', 'CACHE_FILENAME', 'MAX_SIZE']
+
+CACHE_FILENAME = './wikipedia_cache.sqlite'
+MAX_SIZE = 1024 ** 3  # evict the least recently used contents when the cache grows over 1 GB
+
+
+class PageCache:
+    """On-disk cache (sqlite) of the wikitext and stripped text contents of Wikipedia pages.
+
+    Pages are keyed by title and revision id, contents by the hash of the wikitext, so a page that didn't change (or
+    identical pages under different titles) are stored once. Contents are optionally compressed. When the size of the
+    contents exceeds max_size bytes, the least recently used contents are evicted.
+    """
+
+    def __init__(self, filename: str=CACHE_FILENAME, max_size: int=MAX_SIZE, compress: bool=True):
+        self.max_size = max_size
+        self.compress = compress
+        self.db = sqlite3.connect(filename)
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS contents (
+                hash TEXT PRIMARY KEY, wikitext BLOB, text BLOB, compressed INTEGER, size INTEGER, last_used REAL);
+            CREATE TABLE IF NOT EXISTS pages (
+                title TEXT, revid INTEGER, hash TEXT REFERENCES contents(hash) ON DELETE CASCADE,
+                PRIMARY KEY (title, revid));
+            CREATE INDEX IF NOT EXISTS contents_last_used ON contents(last_used);
+        ''')
+        self.db.execute('PRAGMA foreign_keys = ON')
+        self.current_size = self.size()
+
+    def encode(self, s: str) -> bytes:
+        data = s.encode('utf-8')
+        return zlib.compress(data) if self.compress else data
+
+    @staticmethod
+    def decode(data: bytes, compressed: int) -> str:
+        return (zlib.decompress(data) if compressed else data).decode('utf-8')
+
+    def get(self, title: str, revid: int=None) -> Optional[dict]:
+        """Return a dict with the revid, wikitext and text of the page with this title, or None if it isn't cached.
+        Without revid, the latest cached revision is returned."""
+        query = ('SELECT p.revid, c.hash, c.wikitext, c.text, c.compressed FROM pages p JOIN contents c USING (hash) '
+                 'WHERE p.title = ?')
+        args = (title,)
+        if revid is not None:
+            query += ' AND p.revid = ?'
+            args += (revid,)
+        row = self.db.execute(query + ' ORDER BY p.revid DESC LIMIT 1', args).fetchone()
+        if not row:
+            return None
+        revid, content_hash, wikitext, text, compressed = row
+        with self.db:
+            self.db.execute('UPDATE contents SET last_used = ? WHERE hash = ?', (time.time(), content_hash))
+        return dict(revid=revid, wikitext=self.decode(wikitext, compressed), text=self.decode(text, compressed))
+
+    def get_texts(self, titles: List[str], revids: Dict[str, int]=None) -> Dict[str, str]:
+        """Return a dict of title: stripped text contents for the titles that are cached. If revids is given, only
+        the revisions in it count as cached."""
+        texts = {}
+        for title in dict.fromkeys(titles):
+            page = self.get(title, revids.get(title) if revids else None)
+            if page is not None and (revids is None or title in revids):
+                texts[title] = page['text']
+        return texts
+
+    def put(self, title: str, revid: int, wikitext: str, text: str):
+        """Store the wikitext and stripped text contents of this revision of the page"""
+        content_hash = hashlib.sha1(wikitext.encode('utf-8')).hexdigest()
+        encoded_wikitext, encoded_text = self.encode(wikitext), self.encode(text)
+        with self.db:
+            # identical contents are stored once: don't replace them, that would delete the pages referring to them
+            content_size = len(encoded_wikitext) + len(encoded_text)
+            inserted = self.db.execute('INSERT OR IGNORE INTO contents VALUES (?, ?, ?, ?, ?, ?)',
+                                       (content_hash, encoded_wikitext, encoded_text, int(self.compress),
+                                        content_size, time.time())).rowcount
+            self.current_size += content_size if inserted else 0
+            self.db.execute('UPDATE contents SET last_used = ? WHERE hash = ?', (time.time(), content_hash))
+            self.db.execute('INSERT OR REPLACE INTO pages VALUES (?, ?, ?)', (title, revid or 0, content_hash))
+        if self.current_size > self.max_size:
+            self.evict()
+
+    def size(self) -> int:
+        """Return the size of the cached contents in bytes"""
+        return self.db.execute('SELECT COALESCE(SUM(size), 0) FROM contents').fetchone()[0]
+
+    def evict(self):
+        """Delete the least recently used contents (and the pages that refer to them) until the cache has shrunk to
+        90% of max_size, so we don't need to evict again on every put"""
+        target = int(self.max_size * .9)
+        size = self.current_size
+        to_delete = []
+        for content_hash, content_size in self.db.execute('SELECT hash, size FROM contents ORDER BY last_used'):
+            if size <= target:
+                break
+            to_delete.append((content_hash,))
+            size -= content_size
+        with self.db:
+            self.db.executemany('DELETE FROM contents WHERE hash = ?', to_delete)
+        self.current_size = size
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
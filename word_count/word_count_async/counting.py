@@ -0,0 +1,79 @@
+from collections import Counter
+import re
+from string import punctuation
+from typing import Union
+from .tokenizing import Tokenizer
+
+try:
+    import numpy as np
+except ImportError:
+    # numpy is optional, only needed for the 'numpy' counter
+    np = None
+
+__all__ = ['count_words', 'COUNTERS', 'DEFAULT_COUNTER', 'Tokenizer']
+
+TRANSLATION_TABLE = str.maketrans('', '', punctuation)
+# a word is a sequence of letters and digits, underscore is punctuation
+WORD_PATTERN = re.compile(r'[^\W_]+')
+
+
+def count_words_loop(text: str) -> Counter:
+    """Translate, split and count the words one by one in a Python loop. This is the original implementation."""
+    trans = text.translate(TRANSLATION_TABLE)
+    cntr = Counter()
+    for word in trans.split():
+        cntr[word.lower()] += 1
+    return cntr
+
+
+def count_words_counter(text: str) -> Counter:
+    """Translate and split, then let Counter do the counting in C. Lowering is done once for the whole text."""
+    return Counter(text.lower().translate(TRANSLATION_TABLE).split())
+
+
+def count_words_regex(text: str) -> Counter:
+    """Find the words with a precompiled regex, rather than removing punctuation first.
+
+    Unlike the other counters, punctuation splits words: "don't" counts as 'don' and 't' rather than 'dont'.
+    """
+    return Counter(WORD_PATTERN.findall(text.lower()))
+
+
+def count_words_numpy(text: str) -> Counter:
+    """Translate and split, then count in bulk with numpy. Requires numpy."""
+    if np is None:
+        raise ImportError("the 'numpy' counter requires numpy to be installed")
+    words = text.lower().translate(TRANSLATION_TABLE).split()
+    if not words:
+        return Counter()
+    unique, counts = np.unique(np.array(words), return_counts=True)
+    return Counter(dict(zip(unique.tolist(), counts.tolist())))
+
+
+def count_words_unicode(text: str) -> Counter:
+    """Split on Unicode word boundaries and casefold, for non-English text. See tokenizing.Tokenizer to configure the
+    language, stopwords and numbers."""
+    return UNICODE_TOKENIZER.count(text)
+
+
+UNICODE_TOKENIZER = Tokenizer()
+COUNTERS = {
+    'loop': count_words_loop,
+    'counter': count_words_counter,
+    'regex': count_words_regex,
+    'numpy': count_words_numpy,
+    'unicode': count_words_unicode,
+}
+DEFAULT_COUNTER = 'counter'
+
+
+def count_words(text: str, counter: Union[str, Tokenizer]=DEFAULT_COUNTER) -> Counter:
+    """Return a dictionary of word: #occurences as found in the text, counted by the counter with the given name or by
+    a configured Tokenizer"""
+    if isinstance(counter, Tokenizer):
+        return counter.count(text)
+    try:
+        count = COUNTERS[counter]
+    except KeyError:
+        raise ValueError(f"Unknown counter '{counter}', choose one of {', '.join(COUNTERS)}")
+    return count(text)
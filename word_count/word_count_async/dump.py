@@ -0,0 +1,154 @@
+import bz2
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import ExitStack
+from io import BytesIO
+import os
+import sys
+import time
+from typing import IO, Iterable, Iterator, List
+import xml.etree.ElementTree as ET
+from .counting import DEFAULT_COUNTER
+from .topk import make_tally, EPSILON
+from .word_count import parse_and_count_words, WORKERS
+
+__all__ = ['get_most_common_words_from_dump', 'count_words_in_dump']
+
+ARTICLE_NAMESPACE = '0'
+PAGES_PER_TASK = 50  # number of pages sent to a worker at once when reading a single stream dump
+
+
+def local_name(tag: str) -> str:
+    """Return the tag without its namespace, the export format declares one on the root element"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def iter_articles(source: IO) -> Iterator[str]:
+    """Yield the wikitext of each article in the xml, skipping other namespaces and redirects.
+
+    The xml is parsed as a stream and the pages are removed from the root element once they're read, so memory doesn't
+    grow with the dump.
+    """
+    root = None
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if root is None:
+            root = elem
+        if event != 'end' or local_name(elem.tag) != 'page':
+            continue
+        children = {local_name(child.tag): child for child in elem}
+        is_article = children.get('ns') is not None and children['ns'].text == ARTICLE_NAMESPACE
+        if is_article and 'redirect' not in children and children.get('revision') is not None:
+            for child in children['revision']:
+                if local_name(child.tag) == 'text' and child.text:
+                    yield child.text
+        # clearing the page itself isn't enough, the root would still hold on to it
+        root.clear()
+
+
+def read_stream_offsets(index_filename: str) -> List[int]:
+    """Return the start offsets of the streams in a multistream dump, read from its index (offset:page id:title)"""
+    opener = bz2.open if index_filename.endswith('.bz2') else open
+    offsets = set()
+    with opener(index_filename, 'rt', encoding='utf-8') as f:
+        for line in f:
+            offsets.add(int(line.split(':', 1)[0]))
+    return sorted(offsets)
+
+
+def count_words_in_stream(dump_filename: str, start: int, end: int, counter: str=DEFAULT_COUNTER) -> Counter:
+    """Decompress a single stream of a multistream dump, then parse and count the words of its articles.
+    Runs in a worker process."""
+    with open(dump_filename, 'rb') as f:
+        f.seek(start)
+        data = bz2.decompress(f.read(end - start) if end else f.read())
+    # a stream holds a sequence of pages, the first and last also hold the start and end of the root element
+    first, last = data.find(b'<page>'), data.rfind(b'</page>')
+    if first == -1 or last == -1:
+        return Counter()
+    fragment = b'<pages>' + data[first:last + len(b'</page>')] + b'</pages>'
+    cntr = Counter()
+    for page_content in iter_articles(BytesIO(fragment)):
+        cntr.update(parse_and_count_words(page_content, counter))
+    return cntr
+
+
+def count_words_in_pages(pages: List[str], counter: str=DEFAULT_COUNTER) -> Counter:
+    """Parse and count the words of a list of articles. Runs in a worker process."""
+    cntr = Counter()
+    for page_content in pages:
+        cntr.update(parse_and_count_words(page_content, counter))
+    return cntr
+
+
+def chunks(pages: Iterable[str], size: int=PAGES_PER_TASK) -> Iterator[List[str]]:
+    """Yield lists of size pages"""
+    chunk = []
+    for page in pages:
+        chunk.append(page)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_bounded(executor: Executor, fn, args: Iterable[tuple], limit: int) -> Iterator:
+    """Submit fn for each tuple of args to the executor and yield the results as they are done.
+
+    No more than limit tasks are pending at the same time, so the arguments are read lazily rather than all at once.
+    """
+    pending = set()
+    for a in args:
+        if len(pending) >= limit:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+        pending.add(executor.submit(fn, *a))
+    for future in wait(pending).done:
+        yield future.result()
+
+
+def count_words_in_dump(dump_filename: str, index_filename: str=None, workers: int=WORKERS,
+                        counter: str=DEFAULT_COUNTER, tally: str='exact', top: int=10, epsilon: float=EPSILON):
+    """Count the words in all articles of a Wikipedia xml dump (pages-articles.xml.bz2) and return the tally.
+
+    With the index of a multistream dump, the streams are decompressed, parsed and counted in parallel by the worker
+    processes. Without it, the dump is decompressed and read as a single stream in this process, and the articles are
+    sent to the workers in chunks to be parsed and counted. Either way the page wikitext goes through the same
+    mwparserfromhell and count_words pipeline as the live pages. See count_words_in_pages in word_count for tally.
+
+    With 0 workers, like WORKERS in word_count, the streams or chunks are parsed and counted in this process instead.
+    """
+    cntr = make_tally(tally, top, epsilon)
+    workers = os.cpu_count() if workers is None else workers
+    with ExitStack() as stack:
+        executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers)) if workers else None
+        if index_filename:
+            offsets = read_stream_offsets(index_filename)
+            fn = count_words_in_stream
+            args = ((dump_filename, start, end, counter) for start, end in zip(offsets, offsets[1:] + [None]))
+        else:
+            opener = bz2.open if dump_filename.endswith('.bz2') else open
+            source = stack.enter_context(opener(dump_filename, 'rb'))
+            fn = count_words_in_pages
+            args = ((chunk, counter) for chunk in chunks(iter_articles(source)))
+        results = run_bounded(executor, fn, args, limit=4 * workers) if executor else (fn(*a) for a in args)
+        for result in results:
+            cntr.update(result)
+    return cntr
+
+
+def get_most_common_words_from_dump(dump_filename: str, top: int=10, index_filename: str=None,
+                                    workers: int=WORKERS, counter: str=DEFAULT_COUNTER, tally: str='exact',
+                                    epsilon: float=EPSILON) -> list:
+    """Return a list of the most common words as found in the articles of the Wikipedia xml dump"""
+    start = time.time()
+    cntr = count_words_in_dump(dump_filename, index_filename, workers, counter, tally, top, epsilon)
+    print('counting all articles in the dump took {:.2f} seconds'.format(time.time() - start))
+    return cntr.most_common(top)
+
+
+if __name__ == '__main__':
+    # python -m word_count_async.dump enwiki-latest-pages-articles-multistream.xml.bz2 [index.txt.bz2]
+    ranking = get_most_common_words_from_dump(sys.argv[1], 10, sys.argv[2] if len(sys.argv) > 2 else None)
+    print('ranking:', ranking)
@@ -0,0 +1,185 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+import json
+import random
+import threading
+import time
+from urllib.parse import urlsplit, parse_qsl
+
+__all__ = ['StandInServer', 'make_fixtures', 'load_fixtures', 'save_fixtures']
+
+# the real API returns the contents of a limited number of pages per response and continues with the rest
+MAX_PAGES_PER_RESPONSE = 20
+
+
+def normalize_title(title: str) -> str:
+    """Return the title the way the API normalizes it: underscores become spaces, the first letter a capital"""
+    title = title.replace('_', ' ').strip()
+    return title[:1].upper() + title[1:]
+
+
+def make_fixtures(number_of_pages: int=100, words_per_page: int=2000, seed: int=42) -> dict:
+    """Return a fixed set of generated pages of title: {revid, wikitext}, the same for the same seed.
+
+    The wikitext has bold text, links, templates and headings for the parser to deal with, and the words follow Zipf's
+    law like in natural language.
+    """
+    rnd = random.Random(seed)
+    vocabulary = [''.join(rnd.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rnd.randint(1, 12)))
+                  for _ in range(5000)]
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    markup = [
+        lambda w: w,
+        lambda w: w,
+        lambda w: w,
+        lambda w: f"'''{w}'''",
+        lambda w: f'[[{w}]]',
+        lambda w: f'[[{w.capitalize()}|{w}]]',
+        lambda w: f'{w}.\n\n== {w.capitalize()} ==\n',
+        lambda w: f'{w}{{{{cite web|url=https://example.org/{w}|title={w}}}}}',
+    ]
+    fixtures = {}
+    for page_id in range(1, number_of_pages + 1):
+        words = rnd.choices(vocabulary, weights=weights, k=words_per_page)
+        title = f'Page {page_id} {words[0].capitalize()}'
+        fixtures[title] = dict(revid=1000 + page_id, wikitext=' '.join(rnd.choice(markup)(w) for w in words))
+    return fixtures
+
+
+def save_fixtures(fixtures: dict, filename: str):
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(fixtures, f)
+
+
+def load_fixtures(filename: str) -> dict:
+    with open(filename, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """HTTPServer handling each request in a thread, like http.server.ThreadingHTTPServer (Python 3.7+)"""
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        params = dict(parse_qsl(urlsplit(self.path).query, keep_blank_values=True))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = json.dumps(self.server.stand_in.respond(params)).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # don't log every request
+        pass
+
+
+class StandInServer:
+    """Local stand-in for the Wikipedia API, serving the pages from the fixtures with a configurable latency per
+    request, so word count can be run and benchmarked without network.
+
+    Supports what word count uses: action=query with prop=revisions (including continue) or prop=info for one or more
+    titles, list=random, and generator=allpages (with gapfrom, gapto and continue) with prop=revisions. Use it as a
+    context manager and point API_URL to its url.
+    """
+
+    def __init__(self, fixtures: dict, latency: float=0.0, max_pages_per_response: int=MAX_PAGES_PER_RESPONSE):
+        self.fixtures = fixtures
+        self.page_ids = {title: page_id for page_id, title in enumerate(fixtures, start=1)}
+        self.max_pages_per_response = max_pages_per_response
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.server.daemon_threads = True
+        self.server.stand_in = self
+        self.server.latency = latency
+        self.thread = None
+        self.requests = 0
+
+    @property
+    def url(self) -> str:
+        return 'http://{}:{}/w/api.php'.format(*self.server.server_address)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def __enter__(self) -> 'StandInServer':
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def respond(self, params: dict) -> dict:
+        """Return the json data the API would respond with to these query params"""
+        self.requests += 1
+        if params.get('list') == 'random':
+            titles = list(self.fixtures)[:int(params.get('rnlimit', 1))]
+            return {'batchcomplete': '', 'query': {'random': [{'ns': 0, 'title': t} for t in titles]}}
+        if params.get('generator') == 'allpages':
+            return self.respond_allpages(params)
+        titles = [t for t in params.get('titles', '').split('|') if t]
+        if not titles:
+            return {'batchcomplete': ''}
+        query = {}
+        normalized = [{'from': t, 'to': normalize_title(t)} for t in titles if t != normalize_title(t)]
+        if normalized:
+            query['normalized'] = normalized
+        pages = {}
+        missing = 0
+        found = []
+        for title in dict.fromkeys(normalize_title(t) for t in titles):
+            fixture = self.fixtures.get(title)
+            if fixture is None:
+                missing += 1
+                pages[str(-missing)] = {'ns': 0, 'title': title, 'missing': ''}
+            else:
+                page_id = self.page_ids[title]
+                pages[str(page_id)] = {'pageid': page_id, 'ns': 0, 'title': title}
+                found.append((str(page_id), title, fixture))
+        data = {}
+        if params.get('prop') == 'info':
+            for page_id, title, fixture in found:
+                pages[page_id]['lastrevid'] = fixture['revid']
+        elif params.get('prop') == 'revisions':
+            # continue where the previous response stopped, return the contents of a limited number of pages
+            start = int(params.get('rvcontinue', 0))
+            end = start + self.max_pages_per_response
+            for page_id, title, fixture in found[start:end]:
+                pages[page_id]['revisions'] = [{'revid': fixture['revid'], 'contentformat': 'text/x-wiki',
+                                                'contentmodel': 'wikitext', '*': fixture['wikitext']}]
+            if end < len(found):
+                data['continue'] = {'rvcontinue': str(end), 'continue': '||'}
+        if 'continue' not in data:
+            data['batchcomplete'] = ''
+        query['pages'] = pages
+        data['query'] = query
+        return data
+
+    def respond_allpages(self, params: dict) -> dict:
+        """Return the json data for generator=allpages with prop=revisions: the contents of the next pages in title
+        order, from gapfrom (or gapcontinue) to gapto (inclusive)"""
+        start = params.get('gapcontinue') or params.get('gapfrom') or ''
+        end = params.get('gapto')
+        titles = [t for t in sorted(self.fixtures) if t >= start and (end is None or t <= end)]
+        pages = {}
+        for title in titles[:self.max_pages_per_response]:
+            fixture = self.fixtures[title]
+            page_id = self.page_ids[title]
+            pages[str(page_id)] = {'pageid': page_id, 'ns': 0, 'title': title,
+                                   'revisions': [{'contentformat': 'text/x-wiki', 'contentmodel': 'wikitext',
+                                                  '*': fixture['wikitext']}]}
+        data = {'query': {'pages': pages}} if pages else {}
+        if len(titles) > self.max_pages_per_response:
+            data['continue'] = {'gapcontinue': titles[self.max_pages_per_response], 'continue': 'gapcontinue||'}
+        else:
+            data['batchcomplete'] = ''
+        return data
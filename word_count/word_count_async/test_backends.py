@@ -0,0 +1,53 @@
+import unittest
+from .backends import to_text, BACKENDS, TextExtractor, get_backend
+from .counting import count_words
+
+
+class TestBackends(unittest.TestCase):
+
+    wikitext = ("{{Infobox film|name={{nowrap|Holy Grail}}}}\n"
+                "'''Monty Python''' is a [[comedy]] [[Film|film]]<ref name=a>{{cite web|url=x}}</ref> "
+                "by [https://example.org the group].<!-- hidden -->\n"
+                "== Plot ==\n"
+                "King &amp; knights.\n")
+    html = ('<div class="mw-parser-output"><p>The <b>knights</b> who<sup class="reference"><a>[1]</a></sup> say<br>'
+            ' Ni</p><style>.x{}</style><h2>Plot<span class="mw-editsection">[<a>edit</a>]</span></h2></div>')
+
+    def test_regex_gives_same_words_as_mwparserfromhell(self):
+        self.assertEqual(count_words(to_text(self.wikitext, 'mwparserfromhell')),
+                         count_words(to_text(self.wikitext, 'regex')))
+
+    def test_regex_strips_markup(self):
+        text = to_text(self.wikitext, 'regex')
+        for markup in ['{{', '[[', "'''", '<ref', 'hidden', 'https', '==', 'Infobox']:
+            with self.subTest(markup=markup):
+                self.assertNotIn(markup, text)
+        self.assertIn('Monty Python is a comedy film', text)
+
+    def test_html_skips_references_styles_and_edit_links(self):
+        self.assertEqual('The knights who say Ni Plot', ' '.join(to_text(self.html, 'html').split()))
+
+    def test_text_extractor_without_lxml(self):
+        parser = TextExtractor()
+        parser.feed(self.html)
+        self.assertEqual('The knights who say Ni Plot', ' '.join(''.join(parser.text).split()))
+
+    def test_words_of_blocks_are_separate(self):
+        html = '<div><h2>Plot</h2><p>Ni</p><ul><li>knights</li><li>shrubbery</li></ul>it<br>works</div>'
+        parser = TextExtractor()
+        parser.feed(html)
+        expected = ['Plot', 'Ni', 'knights', 'shrubbery', 'it', 'works']
+        self.assertEqual(expected, ''.join(parser.text).split())
+        self.assertEqual(expected, to_text(html, 'html').split())
+
+    def test_extracts_are_text_already(self):
+        self.assertEqual('The knights who say Ni', to_text('The knights who say Ni', 'extracts'))
+
+    def test_empty_content(self):
+        for name in BACKENDS:
+            with self.subTest(backend=name):
+                self.assertEqual('', to_text('', name))
+
+    def test_unknown_backend_raises(self):
+        with self.assertRaises(ValueError):
+            get_backend('pandoc')
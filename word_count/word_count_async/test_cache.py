@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+from .cache import PageCache
+
+
+class TestPageCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = PageCache(os.path.join(self.directory.name, 'cache.sqlite'))
+
+    def test_get_returns_none_for_page_not_cached(self):
+        self.assertIsNone(self.cache.get('Monty Python'))
+
+    def test_put_and_get(self):
+        self.cache.put('Monty Python', 1, "'''Monty Python'''", 'Monty Python')
+        self.assertEqual(dict(revid=1, wikitext="'''Monty Python'''", text='Monty Python'),
+                         self.cache.get('Monty Python'))
+
+    def test_get_returns_latest_revision_unless_revid_is_given(self):
+        self.cache.put('Monty Python', 1, 'old', 'old')
+        self.cache.put('Monty Python', 2, 'new', 'new')
+        self.assertEqual('new', self.cache.get('Monty Python')['text'])
+        self.assertEqual('old', self.cache.get('Monty Python', 1)['text'])
+        self.assertIsNone(self.cache.get('Monty Python', 3))
+
+    def test_get_texts_only_returns_given_revisions(self):
+        self.cache.put('Monty Python', 1, 'old', 'old')
+        self.cache.put('Terry Gilliam', 5, 'Gilliam', 'Gilliam')
+        self.assertEqual({'Terry Gilliam': 'Gilliam', 'Monty Python': 'old'},
+                         self.cache.get_texts(['Terry Gilliam', 'Monty Python', 'Holy Grail']))
+        latest_revids = {'Terry Gilliam': 5, 'Monty Python': 2}
+        self.assertEqual({'Terry Gilliam': 'Gilliam'},
+                         self.cache.get_texts(['Terry Gilliam', 'Monty Python'], latest_revids))
+
+    def test_identical_contents_are_stored_once(self):
+        self.cache.put('Monty Python', 1, 'same', 'same')
+        size = self.cache.size()
+        self.cache.put('Monty_Python', 1, 'same', 'same')
+        self.assertEqual(size, self.cache.size())
+        self.assertEqual('same', self.cache.get('Monty Python')['text'])
+        self.assertEqual('same', self.cache.get('Monty_Python')['text'])
+
+    def test_least_recently_used_contents_are_evicted(self):
+        self.cache.max_size = 3 * 2 * len(self.cache.encode('x' * 1000))
+        for i in range(3):
+            self.cache.put(f'page {i}', 1, f'{i}' + 'x' * 999, 'x' * 1000)
+        # use page 0, so page 1 is the least recently used when page 3 no longer fits
+        self.cache.get('page 0')
+        self.cache.put('page 3', 1, '3' + 'x' * 999, 'x' * 1000)
+        self.assertLessEqual(self.cache.size(), self.cache.max_size)
+        self.assertIsNone(self.cache.get('page 1'))
+        self.assertIsNotNone(self.cache.get('page 0'))
+        self.assertIsNotNone(self.cache.get('page 3'))
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
@@ -0,0 +1,37 @@
+import unittest
+from .counting import count_words, COUNTERS, np
+
+
+class TestCounters(unittest.TestCase):
+
+    text = "The knights who say 'Ni!' (and say it again): ni, NI... the_end"
+
+    def test_all_counters_agree_on_simple_words(self):
+        reference = count_words(self.text, 'loop')
+        for name in COUNTERS:
+            if name == 'numpy' and np is None:
+                continue
+            with self.subTest(counter=name):
+                cntr = count_words(self.text, name)
+                self.assertEqual(3, cntr['ni'])
+                self.assertEqual(2, cntr['say'])
+                self.assertEqual(reference['knights'], cntr['knights'])
+
+    def test_counter_gives_same_counts_as_loop(self):
+        self.assertEqual(count_words(self.text, 'loop'), count_words(self.text, 'counter'))
+
+    def test_regex_counter_splits_on_punctuation(self):
+        cntr = count_words(self.text, 'regex')
+        self.assertEqual(1, cntr['end'])
+        self.assertNotIn('theend', cntr)
+
+    def test_empty_text(self):
+        for name in COUNTERS:
+            if name == 'numpy' and np is None:
+                continue
+            with self.subTest(counter=name):
+                self.assertFalse(count_words('', name))
+
+    def test_unknown_counter_raises(self):
+        with self.assertRaises(ValueError):
+            count_words(self.text, 'abacus')
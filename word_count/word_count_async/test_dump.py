@@ -0,0 +1,103 @@
+import bz2
+from io import BytesIO
+import os
+import tempfile
+import unittest
+from unittest import mock
+import xml.etree.ElementTree as ET
+from .dump import count_words_in_dump, get_most_common_words_from_dump, iter_articles, read_stream_offsets
+
+HEADER = ('<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" version="0.10" xml:lang="en">\n'
+          '  <siteinfo><sitename>Wikipedia</sitename></siteinfo>\n')
+FOOTER = '</mediawiki>\n'
+PAGES = [
+    (0, 'Monty Python', "'''Monty Python''' were a British [[comedy]] group. The Pythons wrote sketches."),
+    (0, 'Holy Grail', "The film is a [[parody]] of the Arthurian legend of the Holy Grail. Ni!"),
+    (0, 'Monty', None),  # redirect
+    (1, 'Talk:Monty Python', 'Talk pages are not counted.'),
+    (0, 'Terry Gilliam', "Gilliam was the only American member of Monty Python. {{Infobox|name=Gilliam}}"),
+]
+
+
+def page_xml(page_id: int, ns: int, title: str, text: str) -> str:
+    redirect = '<redirect title="Monty Python" />' if text is None else ''
+    return (f'  <page>\n    <title>{title}</title>\n    <ns>{ns}</ns>\n    <id>{page_id}</id>\n    {redirect}\n'
+            f'    <revision><id>{page_id}00</id><text xml:space="preserve">{text or "#REDIRECT"}</text></revision>\n'
+            f'  </page>\n')
+
+
+def write_multistream_dump(directory: str, pages_per_stream: int=2) -> tuple:
+    """Write a small multistream dump and its index like the ones Wikipedia publishes and return their filenames:
+    the header, streams of pages_per_stream pages and the footer are separately compressed and concatenated."""
+    dump_filename = os.path.join(directory, 'pages-articles-multistream.xml.bz2')
+    index_filename = os.path.join(directory, 'pages-articles-multistream-index.txt')
+    index = []
+    with open(dump_filename, 'wb') as dump:
+        dump.write(bz2.compress(HEADER.encode('utf-8')))
+        for i in range(0, len(PAGES), pages_per_stream):
+            offset = dump.tell()
+            xml = ''
+            for page_id, (ns, title, text) in enumerate(PAGES[i:i + pages_per_stream], start=i + 1):
+                xml += page_xml(page_id, ns, title, text)
+                index.append(f'{offset}:{page_id}:{title}\n')
+            dump.write(bz2.compress(xml.encode('utf-8')))
+        dump.write(bz2.compress(FOOTER.encode('utf-8')))
+    with open(index_filename, 'w', encoding='utf-8') as f:
+        f.writelines(index)
+    return dump_filename, index_filename
+
+
+class TestDump(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.dump_filename, self.index_filename = write_multistream_dump(self.directory.name)
+
+    def test_read_stream_offsets_returns_unique_sorted_offsets(self):
+        offsets = read_stream_offsets(self.index_filename)
+        self.assertEqual(3, len(offsets))
+        self.assertEqual(sorted(offsets), offsets)
+
+    def test_only_articles_are_counted(self):
+        cntr = count_words_in_dump(self.dump_filename, workers=1)
+        self.assertEqual(2, cntr['monty'])
+        self.assertEqual(1, cntr['gilliam'])
+        self.assertNotIn('talk', cntr)
+        self.assertNotIn('redirect', cntr)
+        self.assertNotIn('infobox', cntr)
+
+    def test_pages_read_are_removed_from_the_root(self):
+        xml = HEADER + ''.join(page_xml(page_id, *page) for page_id, page in enumerate(PAGES, start=1)) + FOOTER
+        elements = []
+        original_iterparse = ET.iterparse
+
+        def iterparse(*args, **kwargs):
+            # keep the elements parsed, to find the root
+            for event, elem in original_iterparse(*args, **kwargs):
+                elements.append(elem)
+                yield event, elem
+
+        with mock.patch.object(ET, 'iterparse', iterparse):
+            articles = list(iter_articles(BytesIO(xml.encode('utf-8'))))
+        self.assertEqual(3, len(articles))
+        # the root let go of every page read, clearing the pages themselves would leave them attached to it
+        root = next(elem for elem in elements if elem.tag.endswith('}mediawiki'))
+        self.assertEqual(0, len(root))
+
+    def test_parallel_streams_give_same_counts_as_single_stream(self):
+        single = count_words_in_dump(self.dump_filename, workers=2)
+        parallel = count_words_in_dump(self.dump_filename, self.index_filename, workers=2)
+        self.assertEqual(single, parallel)
+
+    def test_no_workers_counts_in_this_process(self):
+        expected = count_words_in_dump(self.dump_filename, workers=2)
+        with mock.patch(__package__ + '.dump.ProcessPoolExecutor', side_effect=AssertionError('no worker processes')):
+            self.assertEqual(expected, count_words_in_dump(self.dump_filename, workers=0))
+            self.assertEqual(expected, count_words_in_dump(self.dump_filename, self.index_filename, workers=0))
+
+    def test_get_most_common_words_from_dump(self):
+        ranking = get_most_common_words_from_dump(self.dump_filename, 2, self.index_filename, workers=2)
+        self.assertEqual([('the', 5), ('of', 3)], ranking)
+
+    def tearDown(self):
+        self.directory.cleanup()
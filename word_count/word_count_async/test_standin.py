@@ -0,0 +1,85 @@
+import aiohttp
+import asyncio
+from collections import Counter
+import unittest
+from .standin import StandInServer, make_fixtures
+from .word_count import get_wikipedia_pages_batch, get_wikipedia_page_content, get_latest_revids
+from .word_count import count_words_in_generated_pages, parse_and_count_words, partition_params
+
+
+class TestStandInServer(unittest.TestCase):
+    """Run the fetching coroutines against the stand-in server instead of Wikipedia"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.fixtures = make_fixtures(number_of_pages=30, words_per_page=50)
+        cls.server = StandInServer(cls.fixtures, max_pages_per_response=20)
+        cls.server.start()
+        cls.titles = list(cls.fixtures)
+
+    def setUp(self):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        self.loop = asyncio.get_event_loop()
+
+    async def fetch(self, coroutine_function, *args, **kwargs):
+        async with aiohttp.ClientSession(raise_for_status=True) as session:
+            return await coroutine_function(session, *args, **kwargs)
+
+    def test_make_fixtures_is_reproducible(self):
+        self.assertEqual(self.fixtures, make_fixtures(number_of_pages=30, words_per_page=50))
+
+    def test_batch_is_continued_until_all_pages_are_in(self):
+        # patch the API url of the module the coroutines live in
+        from . import word_count
+        api_url, word_count.API_URL = word_count.API_URL, self.server.url
+        try:
+            revids = {}
+            titles = self.titles + ['There is no such page']
+            pages = self.loop.run_until_complete(self.fetch(get_wikipedia_pages_batch, titles, revids=revids))
+        finally:
+            word_count.API_URL = api_url
+        self.assertEqual({t: f['wikitext'] for t, f in self.fixtures.items()}, {t: pages[t] for t in self.titles})
+        self.assertEqual('', pages['There is no such page'])
+        self.assertEqual({t: f['revid'] for t, f in self.fixtures.items()}, revids)
+
+    def test_titles_are_normalized_and_latest_revids_returned(self):
+        from . import word_count
+        api_url, word_count.API_URL = word_count.API_URL, self.server.url
+        title = self.titles[0]
+        try:
+            content = self.loop.run_until_complete(self.fetch(get_wikipedia_page_content, title.replace(' ', '_')))
+            latest = self.loop.run_until_complete(self.fetch(get_latest_revids, [title.lower()]))
+        finally:
+            word_count.API_URL = api_url
+        self.assertEqual(self.fixtures[title]['wikitext'], content)
+        # only the first letter is capitalized by normalizing, so the rest of the lower case title is another page
+        self.assertEqual({}, latest)
+
+    def test_generated_pages_are_counted_once_over_partitions(self):
+        from . import word_count
+        # titles around the partition boundaries G, N and T, a boundary title is in two ranges but counted once
+        fixtures = {title: dict(revid=1, wikitext=f"'''{title}''' is [[a]] page {i}")
+                    for i, title in enumerate(['1975', 'Apple', 'G', 'Grail', 'Ni', 'Spam', 'T', 'Zebra', 'ni'])}
+        self.assertEqual(4, len(partition_params('allpages', 4)))
+        expected = Counter()
+        for fixture in fixtures.values():
+            expected.update(parse_and_count_words(fixture['wikitext']))
+        api_url = word_count.API_URL
+        with StandInServer(fixtures, max_pages_per_response=2) as server:
+            word_count.API_URL = server.url
+            try:
+                cntr = self.loop.run_until_complete(
+                    count_words_in_generated_pages('allpages', partitions=4, rate=None, workers=0))
+                first_three = self.loop.run_until_complete(
+                    count_words_in_generated_pages('allpages', partitions=1, max_pages=3, rate=None, workers=0))
+            finally:
+                word_count.API_URL = api_url
+        self.assertEqual(expected, cntr)
+        self.assertEqual(3, first_three['page'])
+
+    def tearDown(self):
+        self.loop.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
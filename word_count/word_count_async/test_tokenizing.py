@@ -0,0 +1,60 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import unittest
+from .counting import count_words
+from .tokenizing import Tokenizer
+from .word_count import count_page_contents
+
+
+class TestTokenizer(unittest.TestCase):
+
+    text = ("Die Straße, STRASSE! «L’homme» qu’il a vu; don't 'quote' 1975 ١٢٣ mp3 Ελλάδα ελλάδα "
+            "soft\u00adhyphen été")
+
+    def test_non_ascii_words_are_casefolded_and_split_on_unicode_punctuation(self):
+        cntr = count_words(self.text, 'unicode')
+        self.assertEqual(2, cntr['strasse'])
+        self.assertEqual(2, cntr['ελλάδα'])
+        self.assertEqual(1, cntr['été'])
+        self.assertEqual(1, cntr['softhyphen'])
+        self.assertEqual(1, cntr["l'homme"])
+        self.assertEqual(1, cntr['quote'])
+        self.assertFalse([w for w in cntr if '«' in w or '»' in w or ';' in w])
+
+    def test_ascii_and_non_ascii_text_give_the_same_words(self):
+        ascii_text = "The 'knights' who say: don't (say) ni_ni"
+        self.assertEqual(Tokenizer().count(ascii_text), Tokenizer().count(ascii_text + ' é') - Tokenizer().count('é'))
+
+    def test_ascii_words_differ_from_the_counter_counter_only_around_punctuation(self):
+        text = "The knights who say: (ni) ni, NI! The end."
+        self.assertEqual(count_words(text, 'counter'), count_words(text, 'unicode'))
+        self.assertEqual({'dont': 1, 'wellknown': 1}, count_words("don't well-known", 'counter'))
+        self.assertEqual({"don't": 1, 'well': 1, 'known': 1}, count_words("don't well-known", 'unicode'))
+
+    def test_elided_articles_are_separated_and_filtered_as_stopwords(self):
+        cntr = count_words(self.text, Tokenizer('fr', stopwords=True))
+        self.assertEqual(1, cntr['homme'])
+        self.assertNotIn('l', cntr)
+        self.assertNotIn('a', count_words('a b', Tokenizer('es', stopwords=True)))
+
+    def test_numbers_are_filtered(self):
+        cntr = count_words(self.text, Tokenizer(numbers=False))
+        self.assertNotIn('1975', cntr)
+        self.assertNotIn('١٢٣', cntr)
+        self.assertEqual(1, cntr['mp3'])
+
+    def test_unknown_language_raises(self):
+        with self.assertRaises(ValueError):
+            Tokenizer('tlh')
+
+    def test_tokenizer_is_used_in_worker_processes(self):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        loop = asyncio.get_event_loop()
+        pages = {'Straße': "'''Die Straße''' und die STRASSE"}
+        tokenizer = Tokenizer('de', stopwords=True)
+        try:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                counts = loop.run_until_complete(count_page_contents(pages, executor, tokenizer))
+        finally:
+            loop.close()
+        self.assertEqual({'strasse': 2}, dict(counts['Straße']))
@@ -0,0 +1,64 @@
+import unittest
+from collections import Counter
+import random
+from .topk import SpaceSaving, CountMinTopK, make_tally
+
+
+def zipf_pages(number_of_pages: int=50, words_per_page: int=200, seed: int=1) -> list:
+    """Return a list of Counters of words with Zipf distributed frequencies"""
+    rnd = random.Random(seed)
+    vocabulary = [f'word{i}' for i in range(2000)]
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    return [Counter(rnd.choices(vocabulary, weights=weights, k=words_per_page)) for _ in range(number_of_pages)]
+
+
+class TestSpaceSaving(unittest.TestCase):
+
+    def setUp(self):
+        self.pages = zipf_pages()
+        self.exact = sum(self.pages, Counter())
+        self.tally = SpaceSaving(100)
+        for page in self.pages:
+            self.tally.update(page)
+
+    def test_memory_is_fixed(self):
+        self.assertEqual(100, len(self.tally))
+
+    def test_counts_are_within_error_bound(self):
+        bound = self.tally.error_bound()
+        for word, count in self.tally.most_common():
+            self.assertGreaterEqual(count, self.exact[word])
+            self.assertLessEqual(count, self.exact[word] + bound)
+
+    def test_frequent_words_are_tracked(self):
+        bound = self.tally.error_bound()
+        frequent = [w for w, c in self.exact.items() if c > bound]
+        self.assertTrue(frequent)
+        for word in frequent:
+            self.assertIn(word, self.tally.counts)
+
+    def test_top_words_match_exact_counts(self):
+        self.assertEqual([w for w, _ in self.exact.most_common(3)], [w for w, _ in self.tally.most_common(3)])
+
+
+class TestCountMinTopK(unittest.TestCase):
+
+    def test_estimates_are_never_too_low_and_top_words_match(self):
+        pages = zipf_pages()
+        exact = sum(pages, Counter())
+        tally = CountMinTopK(top=5, epsilon=0.001)
+        for page in pages:
+            tally.update(page)
+        for word, count in tally.most_common():
+            self.assertGreaterEqual(count, exact[word])
+        self.assertEqual([w for w, _ in exact.most_common(3)], [w for w, _ in tally.most_common(3)])
+
+
+class TestMakeTally(unittest.TestCase):
+
+    def test_exact_tally_is_a_counter(self):
+        self.assertIsInstance(make_tally('exact'), Counter)
+
+    def test_unknown_tally_raises(self):
+        with self.assertRaises(ValueError):
+            make_tally('guess')
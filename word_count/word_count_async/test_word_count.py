@@ -3,6 +3,11 @@ from .word_count import get_most_common_words
 from .word_count import get_wikipedia_page, parse_wikipedia_page
 from .word_count import gather_parsed_wikipedia_pages_by_title, get_wikipedia_pages_by_title
 from .word_count import WAIT_FOR_CONNECTION_CLOSE
+from .word_count import split_in_batches, get_wikipedia_pages_batch
+from .word_count import RateLimiter
+from .word_count import count_page_contents, parse_and_count_words, get_wikipedia_page_extract
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import aiohttp
 import asyncio
 from string import punctuation
@@ -144,3 +149,154 @@ class TestGetPagesByTitle(unittest.TestCase):
     def test_get_pages_returns_list_of_strings(self):
         self.assertEqual(len(self.parsed_pages),
                          len([p for p in self.parsed_pages if isinstance(p, str)]))
+
+
+class FakeResponse:
+    """Stand-in for an aiohttp response, returning the given json data"""
+
+    def __init__(self, data: dict):
+        self.status = 200
+        self.data = data
+
+    async def json(self) -> dict:
+        return self.data
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+class FakeSession:
+    """Stand-in for an aiohttp session that returns the given responses in order and keeps the params of each call"""
+
+    def __init__(self, responses: list):
+        self.responses = responses
+        self.calls = []
+
+    def get(self, url: str, params: dict=None) -> FakeResponse:
+        self.calls.append(dict(params))
+        return FakeResponse(self.responses[len(self.calls) - 1])
+
+
+class TestGetWikipediaPagesBatch(unittest.TestCase):
+
+    def setUp(self):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        self.loop = asyncio.get_event_loop()
+
+    def test_split_in_batches_drops_empty_and_duplicate_titles(self):
+        self.assertEqual([['a', 'b'], ['c']], split_in_batches(['a', '', 'b', 'a', 'c'], size=2))
+
+    def test_batch_follows_continue_and_maps_pages_to_titles(self):
+        session = FakeSession([
+            {'continue': {'rvcontinue': '2|123', 'continue': '||'},
+             'query': {'normalized': [{'from': 'monty_Python', 'to': 'Monty Python'}],
+                       'pages': {'1': {'title': 'Monty Python', 'revisions': [{'*': 'first'}]},
+                                 '2': {'title': 'Terry Gilliam'},
+                                 '-1': {'title': 'No such page', 'missing': ''}}}},
+            {'query': {'pages': {'2': {'title': 'Terry Gilliam', 'revisions': [{'*': 'second'}]}}}},
+        ])
+        titles = ['monty_Python', 'Terry Gilliam', 'No such page']
+        pages = self.loop.run_until_complete(get_wikipedia_pages_batch(session, titles))
+        self.assertEqual({'monty_Python': 'first', 'Terry Gilliam': 'second', 'No such page': ''}, pages)
+        self.assertEqual('monty_Python|Terry Gilliam|No such page', session.calls[0]['titles'])
+        self.assertEqual('2|123', session.calls[1]['rvcontinue'])
+
+    def tearDown(self):
+        self.loop.close()
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        self.loop = asyncio.get_event_loop()
+
+    async def run_requests(self, n: int, concurrency: int, rate: float) -> tuple:
+        """Run n fake requests through one limiter, return the max number running at once and the start times"""
+        limiter = RateLimiter(concurrency, rate)
+        running = []
+        max_running = 0
+        starts = []
+
+        async def fake_request():
+            nonlocal max_running
+            async with limiter:
+                starts.append(self.loop.time())
+                running.append(1)
+                max_running = max(max_running, len(running))
+                await asyncio.sleep(0.01)
+                running.pop()
+
+        await asyncio.gather(*(fake_request() for _ in range(n)))
+        return max_running, starts
+
+    def test_concurrency_is_shared_between_requests(self):
+        max_running, _ = self.loop.run_until_complete(self.run_requests(20, concurrency=3, rate=None))
+        self.assertEqual(3, max_running)
+
+    def test_requests_per_second_are_capped(self):
+        _, starts = self.loop.run_until_complete(self.run_requests(5, concurrency=5, rate=100))
+        # 5 requests at 100 per second take at least 4 intervals of 10 ms
+        self.assertGreaterEqual(max(starts) - min(starts), 0.039)
+
+    def test_request_cancelled_while_waiting_for_its_start_gives_back_its_permit(self):
+
+        async def cancel_waiting():
+            limiter = RateLimiter(2, rate=10)
+            async with limiter:
+                pass
+            # this one waits for the next start, 0.1 s later
+            waiting = asyncio.ensure_future(limiter.__aenter__())
+            await asyncio.sleep(0.01)
+            waiting.cancel()
+            await asyncio.gather(waiting, return_exceptions=True)
+            # both permits are free again
+            await asyncio.wait_for(asyncio.gather(limiter.semaphore.acquire(), limiter.semaphore.acquire()), 1)
+
+        self.loop.run_until_complete(cancel_waiting())
+
+    def tearDown(self):
+        self.loop.close()
+
+
+class TestCountPageContents(unittest.TestCase):
+
+    def setUp(self):
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        self.loop = asyncio.get_event_loop()
+        self.pages = {'Monty Python': "'''Monty Python''' were a [[comedy|Comedy]] group. Python!",
+                      'No such page': ''}
+
+    def test_count_page_contents_in_event_loop(self):
+        counts = self.loop.run_until_complete(count_page_contents(self.pages))
+        self.assertEqual(2, counts['Monty Python']['python'])
+        self.assertEqual(1, counts['Monty Python']['comedy'])
+        self.assertFalse(counts['No such page'])
+
+    def test_count_page_contents_in_worker_processes_gives_same_counts(self):
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            counts = self.loop.run_until_complete(count_page_contents(self.pages, executor))
+        self.assertEqual(self.loop.run_until_complete(count_page_contents(self.pages)), counts)
+
+    def test_count_page_contents_with_other_backend_in_worker_processes(self):
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            counts = self.loop.run_until_complete(
+                count_page_contents(self.pages, executor, fn=partial(parse_and_count_words, backend='regex')))
+        self.assertEqual(self.loop.run_until_complete(count_page_contents(self.pages)), counts)
+
+    def test_extract_of_missing_page_is_empty(self):
+        session = FakeSession([
+            {'query': {'pages': {'1': {'title': 'Monty Python', 'lastrevid': 7, 'extract': 'Monty Python were'}}}},
+            {'query': {'pages': {'-1': {'title': 'No such page', 'missing': ''}}}},
+        ])
+        revids = {}
+        extract = self.loop.run_until_complete(get_wikipedia_page_extract(session, 'Monty Python', revids=revids))
+        self.assertEqual('Monty Python were', extract)
+        self.assertEqual({'Monty Python': 7}, revids)
+        self.assertEqual('', self.loop.run_until_complete(get_wikipedia_page_extract(session, 'No such page')))
+
+    def tearDown(self):
+        self.loop.close()
@@ -0,0 +1,163 @@
+from collections import Counter
+import hashlib
+import heapq
+import math
+
+__all__ = ['SpaceSaving', 'CountMinTopK', 'make_tally', 'TALLIES', 'EPSILON', 'DELTA']
+
+EPSILON = 0.0001  # default error bound, as a fraction of the total number of words counted
+DELTA = 0.01  # default probability that a Count-Min estimate exceeds the error bound
+
+
+class SpaceSaving:
+    """Approximate word counts with a fixed number of counters (the Space-Saving algorithm).
+
+    At most capacity words are tracked. A new word takes the counter of the least counted word, inheriting its count
+    as (over)estimation error. Every count is at most N / capacity too high, where N is the total number of words
+    counted, and every word that occurs more than N / capacity times is guaranteed to be tracked.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        # heap of (count, word) to find the least counted word, may hold outdated entries that are skipped
+        self.heap = []
+
+    @classmethod
+    def from_error(cls, epsilon: float=EPSILON, top: int=10) -> 'SpaceSaving':
+        """Return a SpaceSaving with enough counters for counts that are at most epsilon * N too high"""
+        return cls(max(math.ceil(1 / epsilon), top))
+
+    def pop_least_counted(self) -> tuple:
+        """Remove the least counted word and return it with its count"""
+        while True:
+            count, word = heapq.heappop(self.heap)
+            if self.counts.get(word) == count:
+                del self.counts[word]
+                del self.errors[word]
+                return word, count
+
+    def add(self, word: str, count: int=1):
+        self.total += count
+        if word in self.counts:
+            self.counts[word] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[word] = count
+            self.errors[word] = 0
+        else:
+            _, min_count = self.pop_least_counted()
+            self.counts[word] = min_count + count
+            self.errors[word] = min_count
+        heapq.heappush(self.heap, (self.counts[word], word))
+        if len(self.heap) > 4 * self.capacity:
+            # drop the outdated entries
+            self.heap = [(c, w) for w, c in self.counts.items()]
+            heapq.heapify(self.heap)
+
+    def update(self, counts: dict):
+        """Add the counts of a dict of word: count, e.g. the Counter of a single page"""
+        for word, count in counts.items():
+            self.add(word, count)
+
+    def most_common(self, n: int=None) -> list:
+        """Return the n most common words and their (estimated) counts, like Counter.most_common"""
+        return Counter(self.counts).most_common(n)
+
+    def error_bound(self) -> float:
+        """Return the maximum overestimation of any count"""
+        return self.total / self.capacity
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+
+class CountMinSketch:
+    """Approximate counts of any number of words in a fixed width * depth table of counters.
+
+    An estimate is never too low, and it is at most epsilon * N too high with probability 1 - delta.
+    """
+
+    def __init__(self, epsilon: float=EPSILON, delta: float=DELTA):
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.table = [[0] * self.width for _ in range(self.depth)]
+
+    def indices(self, word: str):
+        # hash() of a str differs per process (PYTHONHASHSEED), use a stable hash so estimates can be reproduced:
+        # one 128 bit digest gives two hashes, each row combines them differently (double hashing)
+        digest = hashlib.blake2b(word.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((row, (h1 + row * h2) % self.width) for row in range(self.depth))
+
+    def add(self, word: str, count: int=1) -> int:
+        """Add count to the word and return its new estimated count"""
+        estimate = None
+        for row, col in self.indices(word):
+            self.table[row][col] += count
+            value = self.table[row][col]
+            estimate = value if estimate is None else min(estimate, value)
+        return estimate
+
+    def estimate(self, word: str) -> int:
+        return min(self.table[row][col] for row, col in self.indices(word))
+
+
+class CountMinTopK:
+    """Approximate top words: a Count-Min Sketch for the counts, plus the top words seen so far as candidates.
+
+    Memory is fixed by epsilon and delta (the sketch) and top (the candidates).
+    """
+
+    def __init__(self, top: int=10, epsilon: float=EPSILON, delta: float=DELTA):
+        self.top = top
+        self.sketch = CountMinSketch(epsilon, delta)
+        self.epsilon = epsilon
+        self.total = 0
+        self.candidates = {}
+        self.threshold = 0  # the lowest count among the candidates, once there are top of them
+
+    def add(self, word: str, count: int=1):
+        self.total += count
+        estimate = self.sketch.add(word, count)
+        if word in self.candidates or len(self.candidates) < self.top:
+            self.candidates[word] = estimate
+        elif estimate > self.threshold:
+            del self.candidates[min(self.candidates, key=self.candidates.get)]
+            self.candidates[word] = estimate
+        else:
+            return
+        if len(self.candidates) == self.top:
+            self.threshold = min(self.candidates.values())
+
+    def update(self, counts: dict):
+        """Add the counts of a dict of word: count, e.g. the Counter of a single page"""
+        for word, count in counts.items():
+            self.add(word, count)
+
+    def most_common(self, n: int=None) -> list:
+        """Return the n most common words and their (estimated) counts, like Counter.most_common"""
+        return Counter(self.candidates).most_common(n)
+
+    def error_bound(self) -> float:
+        """Return the maximum overestimation of any count (with probability 1 - delta)"""
+        return self.epsilon * self.total
+
+    def __len__(self) -> int:
+        return len(self.candidates) + self.sketch.width * self.sketch.depth
+
+
+TALLIES = ['exact', 'space-saving', 'count-min']
+
+
+def make_tally(name: str='exact', top: int=10, epsilon: float=EPSILON, delta: float=DELTA):
+    """Return an empty tally to merge word counts into: an exact Counter or one of the fixed memory approximations.
+    Each has update(counts) and most_common(n)."""
+    if name == 'exact':
+        return Counter()
+    if name == 'space-saving':
+        return SpaceSaving.from_error(epsilon, top)
+    if name == 'count-min':
+        return CountMinTopK(top, epsilon, delta)
+    raise ValueError(f"Unknown tally '{name}', choose one of {', '.join(TALLIES)}")
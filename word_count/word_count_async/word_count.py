@@ -1,34 +1,85 @@
-from typing import List
-import mwparserfromhell
+from typing import Callable, List
 import aiohttp
 import asyncio
 import time
 from collections import Counter
-from string import punctuation
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+import os
+from .backends import get_backend, to_text, DEFAULT_BACKEND
+from .counting import count_words, DEFAULT_COUNTER
+from .topk import make_tally, EPSILON
+from .cache import PageCache
 
-__all__ = ['get_most_common_words', 'API_URL']
+__all__ = ['get_most_common_words', 'get_most_common_words_in_generated_pages', 'API_URL']
 
-TRANSLATION_TABLE = str.maketrans('', '', punctuation)
 API_URL = "https://en.wikipedia.org/w/api.php"
 CONCURRENCY = 10  # asyncio.Semaphore defaults to 1
+RATE_LIMIT = 20  # maximum number of requests started per second, None for no limit
+WORKERS = os.cpu_count()  # number of processes parsing and counting pages, 0 to do it in the event loop
+MAX_TITLES = 50  # the maximum number of titles the API accepts in a single query
 # When closing event loop, wait x seconds for the underlying SSL connections to close
 # see https://aiohttp.readthedocs.io/en/stable/client_advanced.html#graceful-shutdown
 WAIT_FOR_CONNECTION_CLOSE = 0.250
 
 
-async def get_wikipedia_page(session: aiohttp.ClientSession, title: str) -> dict:
+class RateLimiter:
+    """Async context manager that limits the number of requests running at the same time and the number of requests
+    started per second. Share a single instance between all requests of a run.
+
+    Create it inside a coroutine, so it's bound to the running event loop.
+    """
+
+    def __init__(self, concurrency: int=CONCURRENCY, rate: float=RATE_LIMIT):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = 1 / rate if rate else 0
+        self.next_start = 0
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        if self.interval:
+            # reserve the next free start time, then wait for it
+            now = asyncio.get_event_loop().time()
+            start = max(now, self.next_start)
+            self.next_start = start + self.interval
+            if start > now:
+                try:
+                    await asyncio.sleep(start - now)
+                except BaseException:
+                    # cancelled while waiting: __aexit__ won't run, give the permit back here
+                    self.semaphore.release()
+                    raise
+        return self
+
+    async def __aexit__(self, *args):
+        self.semaphore.release()
+
+
+class NoLimit:
+    """Async context manager that doesn't limit anything, used when no RateLimiter is given"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+
+async def get_wikipedia_page(session: aiohttp.ClientSession, title: str, limiter: RateLimiter=None) -> dict:
     """This coroutine returns the response data for the given Wikipedia page title (json)"""
     params = {"action": "query", "prop": "revisions", "rvlimit": 1,
-              "rvprop": "content", "format": "json", "titles": title}
-    async with asyncio.Semaphore(CONCURRENCY), session.get(url=API_URL, params=params) as response:
+              "rvprop": "content|ids", "format": "json", "titles": title}
+    async with limiter or NoLimit(), session.get(url=API_URL, params=params) as response:
         assert response.status == 200
         data = await response.json()
     return data
 
 
-async def parse_wikipedia_page(session: aiohttp.ClientSession, title: str) -> str:
-    """Extract the text contents of the given wikipedia page"""
-    wmpage = await get_wikipedia_page(session, title)
+async def get_wikipedia_page_content(session: aiohttp.ClientSession, title: str, limiter: RateLimiter=None,
+                                     revids: dict=None) -> str:
+    """Return the wikitext contents of the given wikipedia page, or an empty string if there is no such page.
+    If a revids dict is given, the revision id of the page is stored in it under the title."""
+    wmpage = await get_wikipedia_page(session, title, limiter)
     pages = wmpage.get('query', {}).get('pages', {})
     # rvlimit is 1, so there'll be 1 page/revision
     (page_id, page) = pages.popitem() if pages else (-1, None)
@@ -38,56 +89,462 @@ async def parse_wikipedia_page(session: aiohttp.ClientSession, title: str) -> st
     rev = page.get('revisions', [])
     # each revision has a key '*' that contains the actual contents
     if rev:
-        page_content = rev[0].get('*', '')
+        if revids is not None:
+            revids[title] = rev[0].get('revid')
+        return rev[0].get('*', '')
     else:
         return ''
-    parsed_content = mwparserfromhell.parse(page_content)
-    return parsed_content.strip_code(collapse=False)
 
 
-async def gather_parsed_wikipedia_pages_by_title(titles: List[str]) -> List[dict]:
+async def get_wikipedia_page_html(session: aiohttp.ClientSession, title: str, limiter: RateLimiter=None,
+                                  revids: dict=None) -> str:
+    """Return the rendered html of the given wikipedia page (action=parse), or an empty string if there is no such
+    page. If a revids dict is given, the revision id of the page is stored in it under the title."""
+    params = {"action": "parse", "page": title, "prop": "text|revid", "redirects": 1, "disableeditsection": 1,
+              "disabletoc": 1, "format": "json"}
+    async with limiter or NoLimit(), session.get(url=API_URL, params=params) as response:
+        assert response.status == 200
+        data = await response.json()
+    if 'parse' not in data:
+        print(f"No page found with title '{title}'")
+        return ''
+    if revids is not None:
+        revids[title] = data['parse'].get('revid')
+    return data['parse'].get('text', {}).get('*', '')
+
+
+async def get_wikipedia_page_extract(session: aiohttp.ClientSession, title: str, limiter: RateLimiter=None,
+                                     revids: dict=None) -> str:
+    """Return the plain text extract of the given wikipedia page (prop=extracts), or an empty string if there is no
+    such page. The API only returns the extract of the whole page for one title at a time. If a revids dict is given,
+    the id of the latest revision of the page is stored in it under the title."""
+    params = {"action": "query", "prop": "extracts|info", "explaintext": 1, "exsectionformat": "plain",
+              "redirects": 1, "format": "json", "titles": title}
+    async with limiter or NoLimit(), session.get(url=API_URL, params=params) as response:
+        assert response.status == 200
+        data = await response.json()
+    pages = data.get('query', {}).get('pages', {})
+    (page_id, page) = pages.popitem() if pages else (-1, None)
+    if int(page_id) < 0:
+        print(f"No page found with title '{title}'")
+        return ''
+    if revids is not None:
+        revids[title] = page.get('lastrevid')
+    return page.get('extract', '')
+
+
+# the coroutine that fetches the page content a backend needs (see backends.SOURCES) for a single title
+FETCHERS = {
+    'wikitext': get_wikipedia_page_content,
+    'html': get_wikipedia_page_html,
+    'extract': get_wikipedia_page_extract,
+}
+
+
+async def parse_wikipedia_page(session: aiohttp.ClientSession, title: str, limiter: RateLimiter=None,
+                               backend: str=DEFAULT_BACKEND) -> str:
+    """Extract the text contents of the given wikipedia page with the backend with the given name (see
+    backends.BACKENDS)"""
+    source, _ = get_backend(backend)
+    page_content = await FETCHERS[source](session, title, limiter)
+    return to_text(page_content, backend)
+
+
+async def gather_parsed_wikipedia_pages_by_title(titles: List[str], concurrency: int=CONCURRENCY,
+                                                 rate: float=RATE_LIMIT, backend: str=DEFAULT_BACKEND) -> List[dict]:
     """This coroutine fetches results for every title in the list and returns the results as a list.
 
+    No more than concurrency requests run at the same time and no more than rate requests start per second.
     Sort order is preserved (see also the docs on asyncio.gather and https://github.com/python/asyncio/issues/432).
     """
+    limiter = RateLimiter(concurrency, rate)
     # print('start get')
     # start = time.time()
     # the session shouldn't be created outside of a coroutine so it needs to be here rather than in a constructor
     # see also https://github.com/aio-libs/aiohttp/issues/2473
     async with aiohttp.ClientSession(raise_for_status=True) as session:
         # create coroutines for fetching each url
-        coroutines = (parse_wikipedia_page(session=session, title=title) for title in titles)
+        coroutines = (parse_wikipedia_page(session=session, title=title, limiter=limiter, backend=backend)
+                      for title in titles)
         # gather the responses, add any exceptions to the list instead of raising
         responses = await asyncio.gather(*coroutines, return_exceptions=True)
     # print('gathering all pages took {:.2f} seconds'.format(time.time() - start))
     return responses
 
 
-def get_wikipedia_pages_by_title(titles: List[str]) -> List[str]:
-    """Set up event loop, run gatherer with the list of titles, close event loop"""
+def split_in_batches(titles: List[str], size: int=MAX_TITLES) -> List[List[str]]:
+    """Return the unique, non-empty titles split in batches of at most size titles"""
+    unique_titles = list(dict.fromkeys(t for t in titles if t))
+    return [unique_titles[i:i + size] for i in range(0, len(unique_titles), size)]
+
+
+async def get_wikipedia_pages_batch(session: aiohttp.ClientSession, titles: List[str],
+                                    limiter: RateLimiter=None, revids: dict=None) -> dict:
+    """This coroutine returns a dict of title: wikitext contents for the given titles, fetched in a single query.
+
+    The API may not return the contents of all pages at once, in which case the query is continued until it is
+    complete. Titles the API normalized are mapped back to the given titles, titles of pages that don't exist get an
+    empty string. If a revids dict is given, the revision id of each page found is stored in it under its title.
+    """
+    params = {"action": "query", "prop": "revisions", "rvprop": "content|ids", "format": "json",
+              "titles": '|'.join(titles)}
+    contents = {}
+    page_revids = {}
+    normalized = {}
+    while True:
+        async with limiter or NoLimit(), session.get(url=API_URL, params=params) as response:
+            assert response.status == 200
+            data = await response.json()
+        query = data.get('query', {})
+        normalized.update({n['from']: n['to'] for n in query.get('normalized', [])})
+        for page in query.get('pages', {}).values():
+            rev = page.get('revisions', [])
+            # each revision has a key '*' that contains the actual contents
+            if rev:
+                contents[page['title']] = rev[0].get('*', '')
+                page_revids[page['title']] = rev[0].get('revid')
+            else:
+                contents.setdefault(page['title'], '')
+        if 'continue' not in data:
+            break
+        params.update(data['continue'])
+    if revids is not None:
+        revids.update({title: page_revids[normalized.get(title, title)] for title in titles
+                       if normalized.get(title, title) in page_revids})
+    return {title: contents.get(normalized.get(title, title), '') for title in titles}
+
+
+async def get_latest_revids(session: aiohttp.ClientSession, titles: List[str], limiter: RateLimiter=None) -> dict:
+    """This coroutine returns a dict of title: id of the latest revision for the given titles that exist, without
+    fetching their contents"""
+    params = {"action": "query", "prop": "info", "format": "json", "titles": '|'.join(titles)}
+    async with limiter or NoLimit(), session.get(url=API_URL, params=params) as response:
+        assert response.status == 200
+        data = await response.json()
+    query = data.get('query', {})
+    normalized = {n['from']: n['to'] for n in query.get('normalized', [])}
+    latest = {page['title']: page['lastrevid'] for page in query.get('pages', {}).values() if 'lastrevid' in page}
+    return {title: latest[normalized.get(title, title)] for title in titles if normalized.get(title, title) in latest}
+
+
+async def gather_parsed_wikipedia_pages_batched(titles: List[str], concurrency: int=CONCURRENCY,
+                                                rate: float=RATE_LIMIT, backend: str=DEFAULT_BACKEND) -> List[str]:
+    """This coroutine fetches the titles in batches of MAX_TITLES and returns the text contents of each page as a
+    list, in the order of the titles. Pages that don't exist (or an empty title) result in an empty string.
+
+    Only the wikitext of multiple pages can be fetched at once, so the backend must have wikitext as its source.
+    """
+    if get_backend(backend)[0] != 'wikitext':
+        raise ValueError(f"Backend '{backend}' can't fetch pages in batches, it needs pages one by one")
+    limiter = RateLimiter(concurrency, rate)
+    async with aiohttp.ClientSession(raise_for_status=True) as session:
+        coroutines = (get_wikipedia_pages_batch(session=session, titles=batch, limiter=limiter)
+                      for batch in split_in_batches(titles))
+        batches = await asyncio.gather(*coroutines)
+    contents = {title: content for batch in batches for title, content in batch.items()}
+    return [to_text(contents.get(t, ''), backend) for t in titles]
+
+
+def get_wikipedia_pages_by_title(titles: List[str], batched: bool=False, concurrency: int=CONCURRENCY,
+                                 rate: float=RATE_LIMIT, backend: str=DEFAULT_BACKEND) -> List[str]:
+    """Set up event loop, run gatherer with the list of titles, close event loop
+
+    concurrency and rate limit the number of requests running at the same time and started per second for this run.
+    backend is the name of the backend that turns the pages into text, see backends.BACKENDS.
+    """
     # make sure the event loop is always a new one, because we can't reopen an already closed loop and also we don't
     # want to restart the interpreter between calls to parallel.my_method
     asyncio.set_event_loop(asyncio.new_event_loop())
     loop = asyncio.get_event_loop()
-    result = loop.run_until_complete(gather_parsed_wikipedia_pages_by_title(titles))
+    if batched:
+        result = loop.run_until_complete(gather_parsed_wikipedia_pages_batched(titles, concurrency, rate, backend))
+    else:
+        result = loop.run_until_complete(gather_parsed_wikipedia_pages_by_title(titles, concurrency, rate, backend))
     loop.run_until_complete(asyncio.sleep(WAIT_FOR_CONNECTION_CLOSE))
     loop.close()
     return result
 
 
-def count_words(text: str) -> Counter:
-    """Return a dictionary of word: #occurences as found in the text."""
-    trans = text.translate(TRANSLATION_TABLE)
-    cntr = Counter()
-    for word in trans.split():
-        cntr[word.lower()] += 1
+def parse_and_count_words(page_content: str, counter: str=DEFAULT_COUNTER, backend: str=DEFAULT_BACKEND) -> Counter:
+    """Return the word counts of the text contents of the given wikitext (or html or extract, depending on the
+    backend). Runs in a worker process."""
+    if not page_content:
+        return Counter()
+    return count_words(to_text(page_content, backend), counter)
+
+
+def parse_and_count_words_with_text(page_content: str, counter: str=DEFAULT_COUNTER,
+                                    backend: str=DEFAULT_BACKEND) -> tuple:
+    """Return the text contents of the given wikitext and its word counts, for the text to be cached"""
+    if not page_content:
+        return '', Counter()
+    text = to_text(page_content, backend)
+    return text, count_words(text, counter)
+
+
+async def count_page_contents(pages: dict, executor: Executor=None, counter: str=DEFAULT_COUNTER,
+                              fn: Callable=parse_and_count_words) -> dict:
+    """This coroutine parses and counts the words of each page in the dict of title: wikitext and returns a dict of
+    title: Counter. The work is done in the executor's worker processes, or in the event loop if there's none.
+
+    fn is called with the contents and counter name of each page, to parse and count differently (e.g. text from the
+    cache that doesn't need parsing)."""
+    if not executor:
+        return {title: fn(content, counter) for title, content in pages.items()}
+    loop = asyncio.get_event_loop()
+    counters = await asyncio.gather(*(loop.run_in_executor(executor, fn, content, counter)
+                                      for content in pages.values()))
+    return dict(zip(pages, counters))
+
+
+async def count_words_in_pages(titles: List[str], batched: bool=True, concurrency: int=CONCURRENCY,
+                               rate: float=RATE_LIMIT, workers: int=WORKERS, counter: str=DEFAULT_COUNTER,
+                               tally: str='exact', top: int=10, epsilon: float=EPSILON, cache: PageCache=None,
+                               revalidate: bool=False, backend: str=DEFAULT_BACKEND) -> Counter:
+    """This coroutine counts the words in the pages with the given titles and returns the merged counts.
+
+    Each page is handed to a pool of worker processes to be parsed and counted as soon as it comes in, while the other
+    pages are still being fetched, so fetching and parsing scale independently. The counts of each page are merged
+    into one Counter. This way only the pages being processed need to be in memory, rather than the text of all pages
+    at once. counter is the name of the word counter to use, see counting.COUNTERS.
+
+    With tally 'exact' the counts are merged into a Counter, which grows with the vocabulary. The approximations
+    'space-saving' and 'count-min' (see topk) use fixed memory for the top most common words, with counts that are at
+    most epsilon * the number of words counted too high.
+
+    With a cache, the stripped text of the pages found in it is counted without fetching or parsing them, and the
+    pages that are fetched are stored in it. The latest cached revision is used, unless revalidate is set: then the
+    latest revision ids are fetched first (a cheap query without contents) and only pages with a cached text for the
+    latest revision are taken from the cache.
+
+    backend is the name of the backend that turns the pages into text, see backends.BACKENDS. Backends that need the
+    page html or extract rather than its wikitext fetch the pages one by one, even when batched, and can't be used with
+    a cache: it holds the text of the default backend.
+    """
+    source, _ = get_backend(backend)
+    if cache and backend != DEFAULT_BACKEND:
+        raise ValueError(f"The cache holds text stripped by '{DEFAULT_BACKEND}', it can't be used with '{backend}'")
+    limiter = RateLimiter(concurrency, rate)
+    cntr = make_tally(tally, top, epsilon)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+
+    async def count_fetched_pages(pages: dict, revids: dict) -> dict:
+        if not cache:
+            return await count_page_contents(pages, executor, counter, partial(parse_and_count_words, backend=backend))
+        results = await count_page_contents(pages, executor, counter, parse_and_count_words_with_text)
+        for title, (text, _) in results.items():
+            if pages[title]:
+                cache.put(title, revids.get(title), pages[title], text)
+        return {title: page_cntr for title, (_, page_cntr) in results.items()}
+
+    async def fetch_batch_and_count(session: aiohttp.ClientSession, batch: List[str]) -> dict:
+        revids = {}
+        pages = await get_wikipedia_pages_batch(session=session, titles=batch, limiter=limiter, revids=revids)
+        return await count_fetched_pages(pages, revids)
+
+    async def fetch_page_and_count(session: aiohttp.ClientSession, title: str) -> dict:
+        revids = {}
+        page_content = await FETCHERS[source](session=session, title=title, limiter=limiter, revids=revids)
+        return await count_fetched_pages({title: page_content}, revids)
+
+    try:
+        async with aiohttp.ClientSession(raise_for_status=True) as session:
+            cached = {}
+            if cache:
+                latest_revids = None
+                if revalidate:
+                    batches = await asyncio.gather(*(get_latest_revids(session, batch, limiter)
+                                                     for batch in split_in_batches(titles)))
+                    latest_revids = {title: revid for batch in batches for title, revid in batch.items()}
+                cached = cache.get_texts(titles, latest_revids)
+            titles_to_fetch = [title for title in titles if title not in cached]
+            # the cached texts are counted (not parsed) alongside the pages that are fetched
+            coroutines = [count_page_contents(cached, executor, counter, count_words)]
+            if batched and source == 'wikitext':
+                # a title given multiple times is fetched once, but counted as many times as it was given
+                occurrences = Counter(titles)
+                coroutines += [fetch_batch_and_count(session, batch) for batch in split_in_batches(titles_to_fetch)]
+            else:
+                # every title is fetched and counted for each time it was given
+                occurrences = Counter(set(titles_to_fetch)) + Counter(title for title in titles if title in cached)
+                coroutines += [fetch_page_and_count(session, title) for title in titles_to_fetch]
+            for next_done in asyncio.as_completed(coroutines):
+                for title, page_cntr in (await next_done).items():
+                    for _ in range(occurrences[title]):
+                        cntr.update(page_cntr)
+    finally:
+        if executor:
+            executor.shutdown()
+    return cntr
+
+
+def get_most_common_words(titles: List[str], top: int=10, batched: bool=True, concurrency: int=CONCURRENCY,
+                          rate: float=RATE_LIMIT, workers: int=WORKERS, counter: str=DEFAULT_COUNTER,
+                          tally: str='exact', epsilon: float=EPSILON, cache: PageCache=None,
+                          revalidate: bool=False, backend: str=DEFAULT_BACKEND) -> list:
+    """Return a list of the most common words as found in the Wikipedia pages with the given titles
+
+    By default, the pages are fetched MAX_TITLES at a time rather than one request per title. No more than concurrency
+    requests run at the same time and no more than rate requests start per second. The pages are parsed by workers
+    processes and counted by the word counter with the given name (see counting.COUNTERS). Use an
+    approximate tally to rank the words in fixed memory and a cache to skip fetching and parsing pages that were
+    fetched before, see count_words_in_pages. backend picks how pages are turned into text, see backends.BACKENDS.
+    """
+    # make sure the event loop is always a new one, because we can't reopen an already closed loop
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    loop = asyncio.get_event_loop()
+    cntr = loop.run_until_complete(count_words_in_pages(titles, batched, concurrency, rate, workers,
+                                                          counter, tally, top, epsilon, cache, revalidate,
+                                                          backend))
+    loop.run_until_complete(asyncio.sleep(WAIT_FOR_CONNECTION_CLOSE))
+    loop.close()
+    return cntr.most_common(top)
+
+
+# default params of the generators that discover pages (in the article namespace), see
+# https://www.mediawiki.org/wiki/API:Query#Generators
+GENERATORS = {
+    'allpages': {'gapnamespace': 0, 'gapfilterredir': 'nonredirects', 'gaplimit': 'max'},
+    'categorymembers': {'gcmnamespace': 0, 'gcmtype': 'page', 'gcmlimit': 'max'},
+    'search': {'gsrnamespace': 0, 'gsrlimit': 'max'},
+}
+PARTITIONS = 8  # number of ranges of titles that are paged through at the same time
+QUEUE_SIZE = 100  # maximum number of fetched batches of pages waiting to be counted
+
+
+def partition_params(generator: str, partitions: int=PARTITIONS) -> List[tuple]:
+    """Return a list of (params, title to skip) that split what the generator lists into ranges of titles by their
+    first letter, so each range can be paged through independently.
+
+    allpages is split on title, categorymembers on sort key. Titles starting with anything else than A-Z end up in the
+    first or last range. The end of an allpages range is inclusive, so the title at the end is skipped to prevent it
+    from being counted twice. search results can only be paged through in order, so search isn't split.
+    """
+    keys = {'allpages': ('gapfrom', 'gapto'), 'categorymembers': ('gcmstartsortkeyprefix', 'gcmendsortkeyprefix')}
+    if generator not in keys or partitions < 2:
+        return [({}, None)]
+    start_key, end_key = keys[generator]
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    bounds = [None] + [letters[i * len(letters) // partitions] for i in range(1, partitions)] + [None]
+    ranges = []
+    for start, end in zip(bounds, bounds[1:]):
+        params = {}
+        if start:
+            params[start_key] = start
+        if end:
+            params[end_key] = end
+        ranges.append((params, end if generator == 'allpages' else None))
+    return ranges
+
+
+async def follow_continue(session: aiohttp.ClientSession, params: dict, queue: asyncio.Queue,
+                          limiter: RateLimiter=None, skip_title: str=None):
+    """This coroutine pages through a generator query (prop=revisions) and puts a dict of title: wikitext on the queue
+    for each response, until the query is complete.
+
+    The contents of the pages the generator lists in one response may come in over several responses, pages are put
+    on the queue once their contents are in.
+    """
+    params = dict(params)
+    while True:
+        async with limiter or NoLimit(), session.get(url=API_URL, params=params) as response:
+            assert response.status == 200
+            data = await response.json()
+        pages = {}
+        for page in data.get('query', {}).get('pages', {}).values():
+            rev = page.get('revisions', [])
+            # each revision has a key '*' that contains the actual contents
+            if rev and page['title'] != skip_title:
+                pages[page['title']] = rev[0].get('*', '')
+        if pages:
+            await queue.put(pages)
+        if 'continue' not in data:
+            break
+        params.update(data['continue'])
+
+
+async def count_words_in_generated_pages(generator: str, generator_params: dict=None, partitions: int=PARTITIONS,
+                                         max_pages: int=None, concurrency: int=CONCURRENCY, rate: float=RATE_LIMIT,
+                                         workers: int=WORKERS, counter: str=DEFAULT_COUNTER, tally: str='exact',
+                                         top: int=10, epsilon: float=EPSILON,
+                                         backend: str=DEFAULT_BACKEND) -> Counter:
+    """This coroutine counts the words in the pages listed by a generator (see GENERATORS) and returns the merged
+    counts, e.g. all pages in a category, without knowing their titles up front.
+
+    The generator lists the titles and the query returns their contents in the same responses. The ranges of titles
+    (see partition_params) are paged through at the same time and the fetched pages stream into the worker processes
+    to be parsed and counted while the next ones are fetched. When fetching is ahead of counting, it waits for the
+    counting to catch up. Stops after max_pages pages, if given. See count_words_in_pages for the other arguments.
+    """
+    if generator not in GENERATORS:
+        raise ValueError(f"Unknown generator '{generator}', choose one of {', '.join(GENERATORS)}")
+    if get_backend(backend)[0] != 'wikitext':
+        raise ValueError(f"Backend '{backend}' needs pages one by one, it can't count generated pages")
+    base_params = {"action": "query", "generator": generator, "prop": "revisions", "rvprop": "content",
+                   "format": "json", **GENERATORS[generator], **(generator_params or {})}
+    limiter = RateLimiter(concurrency, rate)
+    cntr = make_tally(tally, top, epsilon)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+    fn = partial(parse_and_count_words, backend=backend)
+    queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    pages_counted = 0
+    try:
+        async with aiohttp.ClientSession(raise_for_status=True) as session:
+
+            producer = asyncio.ensure_future(asyncio.gather(
+                *(follow_continue(session, {**base_params, **params}, queue, limiter, skip_title)
+                  for params, skip_title in partition_params(generator, partitions))))
+            counting = set()
+            try:
+                while max_pages is None or pages_counted < max_pages:
+                    if producer.done():
+                        if queue.empty():
+                            # raises if fetching failed
+                            producer.result()
+                            break
+                        pages = queue.get_nowait()
+                    else:
+                        # wait for the next pages, or for fetching to be done (or to fail)
+                        getter = asyncio.ensure_future(queue.get())
+                        await asyncio.wait({getter, producer}, return_when=asyncio.FIRST_COMPLETED)
+                        if not getter.done():
+                            getter.cancel()
+                            continue
+                        pages = getter.result()
+                    if max_pages is not None:
+                        pages = dict(list(pages.items())[:max_pages - pages_counted])
+                    pages_counted += len(pages)
+                    counting.add(asyncio.ensure_future(count_page_contents(pages, executor, counter, fn)))
+                    # merge the counts of the batches that are done, without waiting for the others
+                    done = {task for task in counting if task.done()}
+                    counting -= done
+                    for task in done:
+                        for page_cntr in task.result().values():
+                            cntr.update(page_cntr)
+                for next_done in asyncio.as_completed(counting):
+                    for page_cntr in (await next_done).values():
+                        cntr.update(page_cntr)
+            finally:
+                producer.cancel()
+    finally:
+        if executor:
+            executor.shutdown()
     return cntr
 
 
-def get_most_common_words(titles: List[str], top: int=10) -> list:
-    """Return a list of the most common words as found in the Wikipedia pages with the given titles"""
-    text = '\n'.join(get_wikipedia_pages_by_title(titles))
-    cntr = count_words(text)
+def get_most_common_words_in_generated_pages(generator: str, top: int=10, generator_params: dict=None,
+                                             partitions: int=PARTITIONS, max_pages: int=None, **kwargs) -> list:
+    """Return a list of the most common words as found in the Wikipedia pages listed by the generator, e.g.
+    get_most_common_words_in_generated_pages('categorymembers', 10, {'gcmtitle': 'Category:Monty Python films'}).
+    See count_words_in_generated_pages for the other arguments."""
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    loop = asyncio.get_event_loop()
+    start = time.time()
+    cntr = loop.run_until_complete(count_words_in_generated_pages(generator, generator_params, partitions, max_pages,
+                                                                  top=top, **kwargs))
+    print('gathering and counting all generated pages took {:.2f} seconds'.format(time.time() - start))
+    loop.run_until_complete(asyncio.sleep(WAIT_FOR_CONNECTION_CLOSE))
+    loop.close()
     return cntr.most_common(top)
 
 
@@ -1,7 +1,9 @@
 import requests
+from requests.adapters import HTTPAdapter
 import mwparserfromhell
 from collections import Counter
-from typing import List, Union
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Union
 import time
 
 __all__ = ['get_most_common_words']
@@ -9,13 +11,24 @@ __all__ = ['get_most_common_words']
 
 API_URL = "https://en.wikipedia.org/w/api.php"
 TRANSLATION_TABLE = str.maketrans('', '', '()/\\.,;:\'\"*&-')
+WORKERS = 10  # number of threads fetching pages at the same time
+MAX_TITLES = 50  # the maximum number of titles the API accepts in a single query
 
 
-def parse_wiki_page(title: str) -> Union[str, None]:
-    """Return the text contents of this Wikipedia page"""
+def get_session(workers: int=WORKERS) -> requests.Session:
+    """Return a session with a connection pool large enough to keep a connection open for every worker"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def fetch_wiki_page(title: str, session: requests.Session=None) -> str:
+    """Return the wikitext contents of this Wikipedia page, or an empty string if there is no such page"""
     params = {"action": "query", "prop": "revisions", "rvlimit": 1,
               "rvprop": "content", "format": "json", "titles": title}
-    r = requests.get(API_URL, params=params)
+    r = (session or requests).get(API_URL, params=params)
     if not r.status_code == 200:
         raise ValueError(f"Unable to fetch page '{title}', WikiMedia responded with a {r.status_code}")
     result = r.json()
@@ -28,33 +41,122 @@ def parse_wiki_page(title: str) -> Union[str, None]:
     rev = page.get('revisions', [])
     # each revision has a key '*' that contains the actual contents
     if rev:
-        page_content = rev[0].get('*', '')
+        return rev[0].get('*', '')
     else:
         return ''
+
+
+def split_in_batches(titles: List[str], size: int=MAX_TITLES) -> List[List[str]]:
+    """Return the unique, non-empty titles split in batches of at most size titles"""
+    unique_titles = list(dict.fromkeys(t for t in titles if t))
+    return [unique_titles[i:i + size] for i in range(0, len(unique_titles), size)]
+
+
+def fetch_wiki_pages(titles: List[str], session: requests.Session=None, revids: dict=None) -> dict:
+    """Return a dict of title: wikitext contents for the given titles, fetched in a single query
+
+    The API may not return the contents of all pages at once, in which case the query is continued until it is
+    complete. Titles the API normalized are mapped back to the given titles, titles of pages that don't exist get an
+    empty string. If a revids dict is given, the revision id of each page found is stored in it under its title.
+    """
+    params = {"action": "query", "prop": "revisions", "rvprop": "content|ids", "format": "json",
+              "titles": '|'.join(titles)}
+    contents = {}
+    page_revids = {}
+    normalized = {}
+    while True:
+        r = (session or requests).get(API_URL, params=params)
+        if not r.status_code == 200:
+            raise ValueError(f"Unable to fetch pages {titles}, WikiMedia responded with a {r.status_code}")
+        result = r.json()
+        query = result.get('query', {})
+        normalized.update({n['from']: n['to'] for n in query.get('normalized', [])})
+        for page in query.get('pages', {}).values():
+            rev = page.get('revisions', [])
+            # each revision has a key '*' that contains the actual contents
+            if rev:
+                contents[page['title']] = rev[0].get('*', '')
+                page_revids[page['title']] = rev[0].get('revid')
+            else:
+                contents.setdefault(page['title'], '')
+        if 'continue' not in result:
+            break
+        params.update(result['continue'])
+    if revids is not None:
+        revids.update({title: page_revids[normalized.get(title, title)] for title in titles
+                       if normalized.get(title, title) in page_revids})
+    return {title: contents.get(normalized.get(title, title), '') for title in titles}
+
+
+def strip_wikitext(page_content: str) -> str:
+    """Return the text contents of the given wikitext"""
+    if not page_content:
+        return ''
     parsed_content = mwparserfromhell.parse(page_content)
     return parsed_content.strip_code(collapse=False)
 
 
+def parse_wiki_page(title: str, session: requests.Session=None,
+                    strip: Callable[[str], str]=strip_wikitext) -> Union[str, None]:
+    """Return the text contents of this Wikipedia page, stripped from its wikitext by strip"""
+    page_content = fetch_wiki_page(title, session)
+    return strip(page_content) if page_content else ''
+
+
 def count_words(text: str) -> Counter:
     """Return a dictionary of word: #occurences as found in the text."""
-    trans = text.translate(TRANSLATION_TABLE)
-    cntr = Counter()
-    for word in trans.split():
-        cntr[word.lower()] += 1
-    return cntr
+    # lower the whole text once and let Counter count in C, rather than a Python loop over each word
+    return Counter(text.lower().translate(TRANSLATION_TABLE).split())
+
+
+def fetch_wiki_pages_with_revids(titles: List[str], session: requests.Session=None) -> tuple:
+    """Return a dict of title: wikitext contents and a dict of title: revision id for the given titles"""
+    revids = {}
+    return fetch_wiki_pages(titles, session, revids), revids
 
 
-def get_most_common_words(titles: List[str], top: int=10) -> list:
-    """Return a list of the most common words as found in the Wikipedia pages with the given titles"""
+def get_most_common_words(titles: List[str], top: int=10, workers: int=WORKERS, cache=None,
+                          strip: Callable[[str], str]=strip_wikitext) -> list:
+    """Return a list of the most common words as found in the Wikipedia pages with the given titles
+
+    Pages are fetched MAX_TITLES at a time by a pool of worker threads sharing one session (and thus its open
+    connections), while this thread parses and counts each page as soon as it comes in. This way fetching the next
+    pages overlaps with parsing and counting. The counts per page are merged into one Counter, so only one page's text
+    needs to be in memory at a time.
+
+    A cache (see word_count_async.cache.PageCache) skips fetching and parsing the pages found in it and stores the pages
+    that are fetched.
+
+    strip turns the wikitext of a page into text, e.g. the faster but approximate strip_regex from
+    word_count_async.backends. The cache holds text stripped by strip_wikitext, so it can't be used with another strip.
+    """
+    if cache and strip is not strip_wikitext:
+        raise ValueError("The cache holds text stripped by strip_wikitext, it can't be used with another strip")
     start = time.time()
-    text = ''
-    for title in titles:
-        wiki = parse_wiki_page(title)
-        if not wiki:
-            continue
-        text += wiki
-    print('gathering all pages took {:.2f} seconds'.format(time.time() - start))
-    cntr = count_words(text)
+    # a title given multiple times is fetched once, but counted as many times as it was given
+    occurrences = Counter(titles)
+    cntr = Counter()
+    cached = cache.get_texts(titles) if cache else {}
+    for title, wiki in cached.items():
+        page_cntr = count_words(wiki)
+        for _ in range(occurrences[title]):
+            cntr.update(page_cntr)
+    titles_to_fetch = [title for title in titles if title not in cached]
+    with get_session(workers) as session, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(fetch_wiki_pages_with_revids, batch, session)
+                   for batch in split_in_batches(titles_to_fetch)]
+        for future in as_completed(futures):
+            pages, revids = future.result()
+            for title, page_content in pages.items():
+                wiki = strip(page_content) if page_content else ''
+                if not wiki:
+                    continue
+                if cache:
+                    cache.put(title, revids.get(title), page_content, wiki)
+                page_cntr = count_words(wiki)
+                for _ in range(occurrences[title]):
+                    cntr.update(page_cntr)
+    print('gathering and counting all pages took {:.2f} seconds'.format(time.time() - start))
     return cntr.most_common(top)
 
 